@@ -0,0 +1,28 @@
+"""
+Настройки служебных endpoints для Backend онлайн школы S2S.
+
+Этот модуль содержит токен администратора, которым защищены
+служебные endpoints: список и выгрузка контактных форм и заявок,
+статистика пула соединений с БД и профилирование воркера.
+"""
+
+from typing import Optional
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class AdminSettings(BaseSettings):
+    """
+    Настройки доступа к служебным endpoints.
+
+    Attributes:
+        ADMIN_TOKEN: Токен администратора для заголовка X-Admin-Token
+            (не задан - все служебные endpoints выключены и отвечают 404)
+    """
+    ADMIN_TOKEN: Optional[str] = None
+
+    # Конфигурация для загрузки настроек из .env файла
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+
+
+admin_settings = AdminSettings()
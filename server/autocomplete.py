@@ -0,0 +1,265 @@
+"""
+Автодополнение названий курсов и имен преподавателей для Backend онлайн школы S2S.
+
+Этот модуль содержит префиксное дерево (trie) по словам названий курсов
+и имен преподавателей. В каждом узле заранее сохранены лучшие подсказки
+его поддерева, поэтому ответ на однословный запрос не требует обхода
+всех совпадений. Опечатки учитываются через ограниченное расстояние
+Левенштейна, которое считается построчно при обходе дерева.
+"""
+
+import heapq
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from server.schemas import Course, Suggestion, Teacher
+from server.search import normalize, stem
+
+
+_WORD_RE = re.compile(r"\w+")
+
+# Сколько лучших подсказок хранится в каждом узле дерева
+TOP_K = 10
+
+
+def max_edits(length: int) -> int:
+    """
+    Допустимое число опечаток для слова заданной длины.
+
+    Короткие префиксы ищутся точно, иначе «ма» совпадало бы почти
+    с любым словом.
+    """
+    if length < 4:
+        return 0
+    if length < 8:
+        return 1
+    return 2
+
+
+def _next_row(row: List[int], char: str, word: str) -> List[int]:
+    """
+    Вычисляет следующую строку динамики Левенштейна при добавлении буквы к пути.
+    """
+    new_row = [row[0] + 1]
+    for i, query_char in enumerate(word):
+        new_row.append(min(new_row[i] + 1, row[i + 1] + 1, row[i] + (query_char != char)))
+    return new_row
+
+
+class _Node:
+    __slots__ = ("children", "entries", "entry_set", "top", "count")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        # Подсказки, в которых слово заканчивается в этом узле
+        self.entries: List[int] = []
+        self.entry_set: frozenset = frozenset()
+        # TOP_K лучших подсказок поддерева (меньший номер - выше в выдаче)
+        self.top: List[int] = []
+        # Число подсказок в поддереве (с повторами), оценка стоимости его обхода
+        self.count = 0
+
+
+class AutocompleteIndex:
+    """
+    Префиксное дерево подсказок с учетом опечаток.
+
+    Подсказки нумеруются в порядке ранжирования (сначала популярные
+    курсы, затем остальные курсы, затем преподаватели), поэтому лучшие
+    подсказки поддерева - это просто наименьшие номера.
+
+    Первая буква слова должна совпадать точно: опечатки в ней редки,
+    а без этого ограничения обход захватывает почти все дерево.
+    """
+
+    def __init__(self, courses: Sequence[Course], teachers: Sequence[Teacher]):
+        self.suggestions: List[Suggestion] = []
+        self.entry_words: List[frozenset] = []
+        self.root = _Node()
+        # Подсказки по основам слов: дописанные слова запроса сравниваются
+        # без учета окончаний («подготовка» находит «подготовки»)
+        self.stems: Dict[str, frozenset] = {}
+
+        ranked_courses = sorted(courses, key=lambda c: not c.is_popular)
+        for course in ranked_courses:
+            self._add(Suggestion(type="course", id=course.id, text=course.title))
+        for teacher in teachers:
+            self._add(Suggestion(type="teacher", id=teacher.id, text=teacher.name))
+        self._fill_top(self.root)
+        self.stems = {key: frozenset(entries) for key, entries in self.stems.items()}
+
+    def _add(self, suggestion: Suggestion):
+        entry = len(self.suggestions)
+        self.suggestions.append(suggestion)
+        words = frozenset(_WORD_RE.findall(normalize(suggestion.text)))
+        self.entry_words.append(words)
+        for word in words:
+            node = self.root
+            for char in word:
+                node = node.children.setdefault(char, _Node())
+            node.entries.append(entry)
+            self.stems.setdefault(stem(word), []).append(entry)
+
+    def _fill_top(self, node: _Node) -> List[int]:
+        node.entry_set = frozenset(node.entries)
+        node.count = len(node.entries)
+        merged = set(node.entries)
+        for child in node.children.values():
+            merged.update(self._fill_top(child))
+            node.count += child.count
+        node.top = sorted(merged)[:TOP_K]
+        return node.top
+
+    def _fuzzy(self, word: str, edits: int, prefix: bool) -> Iterator[Tuple[str, _Node, int]]:
+        """
+        Находит узлы дерева на расстоянии не больше edits от слова.
+
+        Args:
+            word: Нормализованное слово запроса
+            edits: Допустимое число опечаток
+            prefix: Сравнивать слово с префиксами (True) или с целыми словами
+
+        Yields:
+            Tuple[str, _Node, int]: Путь до узла, узел и расстояние
+        """
+        if edits == 0:
+            # Без опечаток достаточно пройти по дереву буква за буквой
+            node = self._exact(word)
+            if node is not None and (prefix or node.entries):
+                yield word, node, 0
+            return
+        first = self.root.children.get(word[0])
+        if first is None:
+            return
+        stack = [(word[0], first, _next_row(list(range(len(word) + 1)), word[0], word))]
+        while stack:
+            path, node, row = stack.pop()
+            if row[-1] <= edits and (prefix or node.entries):
+                yield path, node, row[-1]
+            for char, child in node.children.items():
+                new_row = _next_row(row, char, word)
+                # Если все значения строки больше порога, глубже расстояние только растет
+                if min(new_row) <= edits:
+                    stack.append((path + char, child, new_row))
+
+    def suggest(self, query: str, limit: int = TOP_K) -> List[Suggestion]:
+        """
+        Возвращает подсказки для введенного текста.
+
+        Последнее слово запроса считается недописанным и сравнивается
+        с префиксами слов, остальные слова - с целыми словами. Сначала
+        ищутся точные совпадения, и только если их не хватает, запрос
+        повторяется с допуском опечаток.
+
+        Args:
+            query: Введенный пользователем текст
+            limit: Максимальное число подсказок (не больше TOP_K)
+
+        Returns:
+            List[Suggestion]: Подсказки, сначала с меньшим числом опечаток
+        """
+        words = _WORD_RE.findall(normalize(query))
+        if not words:
+            return []
+        limit = min(limit, TOP_K)
+        *complete, last = words
+
+        if not complete:
+            exact = self._exact(last)
+            if exact is not None and len(exact.top) >= limit:
+                # Точные совпадения всегда выше неточных, дальше искать незачем
+                entries = exact.top[:limit]
+            else:
+                entries = self._rank_prefix(last, limit)
+        else:
+            entries = self._match_words(complete, last, limit, fuzzy=False)
+            if len(entries) < limit:
+                seen = set(entries)
+                extra = self._match_words(complete, last, limit, fuzzy=True)
+                entries += [entry for entry in extra if entry not in seen][:limit - len(entries)]
+        return [self.suggestions[entry] for entry in entries]
+
+    def _exact(self, word: str) -> Optional[_Node]:
+        node = self.root
+        for char in word:
+            node = node.children.get(char)
+            if node is None:
+                return None
+        return node
+
+    def _rank_prefix(self, prefix: str, limit: int) -> List[int]:
+        best: Dict[int, int] = {}
+        for _, node, dist in self._fuzzy(prefix, max_edits(len(prefix)), prefix=True):
+            for entry in node.top:
+                if best.get(entry, dist + 1) > dist:
+                    best[entry] = dist
+        return sorted(best, key=lambda entry: (best[entry], entry))[:limit]
+
+    def _match_words(self, complete: List[str], last: str, limit: int, fuzzy: bool) -> List[int]:
+        """
+        Отбирает подсказки для многословного запроса.
+
+        Множества подсказок целых слов хранятся в узлах заранее, поэтому
+        их пересечение выполняется без перебора в Python. Недописанное
+        слово проверяется тем способом, который дешевле: если его поддерево
+        меньше пересечения, подсказки поддерева собираются и пересекаются,
+        иначе кандидаты перебираются по порядку ранжирования до limit штук.
+        """
+        word_sets = []
+        for word in complete:
+            entries = self._word_entries(word, fuzzy)
+            if not entries:
+                return []
+            word_sets.append(entries)
+
+        hits = self._outermost(self._fuzzy(last, max_edits(len(last)) if fuzzy else 0, prefix=True))
+        if not hits:
+            return []
+        word_sets.sort(key=len)
+        if sum(node.count for _, node in hits) <= len(word_sets[0]):
+            matched = self._subtree_entries(node for _, node in hits).intersection(*word_sets)
+            return heapq.nsmallest(limit, matched)
+
+        candidates = sorted(word_sets[0].intersection(*word_sets[1:]))
+        prefixes = tuple(path for path, _ in hits)
+        result = []
+        for entry in candidates:
+            if any(w.startswith(prefixes) for w in self.entry_words[entry]):
+                result.append(entry)
+                if len(result) == limit:
+                    break
+        return result
+
+    def _word_entries(self, word: str, fuzzy: bool) -> frozenset:
+        """
+        Находит подсказки, содержащие дописанное слово запроса.
+
+        Сначала слово ищется по основе; обход дерева с опечатками нужен,
+        только если такой основы в каталоге нет.
+        """
+        entries = self.stems.get(stem(word))
+        if entries is not None or not fuzzy:
+            return entries or frozenset()
+        nodes = [node for _, node, _ in self._fuzzy(word, max_edits(len(word)), prefix=False)]
+        return frozenset().union(*(node.entry_set for node in nodes))
+
+    @staticmethod
+    def _outermost(hits: Iterator[Tuple[str, _Node, int]]) -> List[Tuple[str, _Node]]:
+        """
+        Оставляет узлы, не вложенные в другие найденные узлы.
+        """
+        result: List[Tuple[str, _Node]] = []
+        for path, node, _ in sorted(hits, key=lambda hit: hit[0]):
+            if not result or not path.startswith(result[-1][0]):
+                result.append((path, node))
+        return result
+
+    @staticmethod
+    def _subtree_entries(nodes: Iterable[_Node]) -> set:
+        result = set()
+        stack = list(nodes)
+        while stack:
+            node = stack.pop()
+            result.update(node.entries)
+            stack.extend(node.children.values())
+        return result
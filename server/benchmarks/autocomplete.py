@@ -0,0 +1,58 @@
+"""
+Бенчмарк автодополнения для Backend онлайн школы S2S.
+
+Строит синтетический каталог, в scale раз больше courses.json
+и teachers.json, и измеряет задержку AutocompleteIndex.suggest
+на наборе запросов с опечатками и без.
+
+Запуск:
+    python -m server.benchmarks.autocomplete --scale 1000 --budget-ms 1
+"""
+
+import argparse
+import sys
+from time import perf_counter
+
+from server.autocomplete import AutocompleteIndex
+from server.benchmarks.common import add_report_arguments, finish, summarize, synthetic_catalog
+
+
+QUERIES = [
+    "матем", "математика", "инфрматика", "информ", "физ", "физика егэ",
+    "астраномия", "олимп", "подготовка к егэ по мат", "всош по инф",
+    "годовой курс", "леша", "леша ив", "сережа", "курс углубл", "огэ",
+]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=int, default=1000, help="Во сколько раз увеличить каталог")
+    parser.add_argument("--rounds", type=int, default=200, help="Сколько раз прогнать набор запросов")
+    parser.add_argument("--budget-ms", type=float, default=1.0, help="Допустимая задержка p99 (мс)")
+    add_report_arguments(parser)
+    args = parser.parse_args(argv)
+
+    courses, teachers = synthetic_catalog(args.scale)
+    started = perf_counter()
+    index = AutocompleteIndex(courses, teachers)
+    build = perf_counter() - started
+    print(f"Каталог: {len(courses)} курсов, {len(teachers)} преподавателей, построение {build:.2f} с")
+
+    timings = []
+    total = perf_counter()
+    for _ in range(args.rounds):
+        for query in QUERIES:
+            started = perf_counter()
+            index.suggest(query)
+            timings.append((perf_counter() - started) * 1000)
+
+    results = {"autocomplete.suggest": summarize(timings, perf_counter() - total)}
+    code = finish(args, {"benchmark": "autocomplete", "scale": args.scale}, results)
+    if results["autocomplete.suggest"]["p99_ms"] > args.budget_ms:
+        print(f"p99 превышает бюджет {args.budget_ms} мс")
+        return 1
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+"""
+Общие функции бенчмарков для Backend онлайн школы S2S.
+
+Этот модуль содержит синтетический каталог увеличенного размера,
+подсчет перцентилей и сравнение результатов с сохраненной базовой
+линией. Результаты всех бенчмарков записываются в одном формате:
+
+    {"meta": {...}, "results": {"имя": {"count": ..., "p50_ms": ...,
+     "p95_ms": ..., "p99_ms": ..., "max_ms": ..., "ops_per_sec": ...}}}
+"""
+
+import json
+import platform
+import random
+import sys
+from statistics import quantiles
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from uuid import uuid4
+
+from server.catalog import load_catalog
+from server.schemas import Course, Teacher
+
+
+_SYLLABLES = ["ка", "ро", "ми", "на", "те", "ло", "ва", "ди", "су", "ре", "по", "ли", "шко", "вер", "ган"]
+
+
+def _word(rng: random.Random) -> str:
+    return "".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 4)))
+
+
+def synthetic_catalog(scale: int, seed: int = 0) -> Tuple[List[Course], List[Teacher]]:
+    """
+    Размножает каталог в scale раз.
+
+    Каждая копия получает случайное слово в названии или фамилии,
+    чтобы словари индексов росли вместе с каталогом, а не только
+    число записей.
+    """
+    rng = random.Random(seed)
+    base = load_catalog()
+    courses, teachers = [], []
+    for _ in range(scale):
+        for course in base.courses:
+            courses.append(course.model_copy(update={"id": uuid4(), "title": f"{course.title} {_word(rng)}"}))
+        for teacher in base.teachers:
+            teachers.append(teacher.model_copy(update={"id": uuid4(), "name": f"{teacher.name} {_word(rng).title()}"}))
+    return courses, teachers
+
+
+def summarize(timings_ms: Sequence[float], elapsed: float) -> Dict[str, float]:
+    """
+    Считает перцентили задержки и пропускную способность.
+
+    Args:
+        timings_ms: Длительности операций в миллисекундах
+        elapsed: Общее время прогона в секундах (для ops_per_sec)
+
+    Returns:
+        Dict[str, float]: count, p50_ms, p95_ms, p99_ms, max_ms, ops_per_sec
+    """
+    if len(timings_ms) > 1:
+        cuts = quantiles(timings_ms, n=100, method="inclusive")
+        p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+    else:
+        p50 = p95 = p99 = timings_ms[0] if timings_ms else 0.0
+    return {
+        "count": len(timings_ms),
+        "p50_ms": round(p50, 4),
+        "p95_ms": round(p95, 4),
+        "p99_ms": round(p99, 4),
+        "max_ms": round(max(timings_ms, default=0.0), 4),
+        "ops_per_sec": round(len(timings_ms) / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+
+
+def environment() -> Dict[str, Any]:
+    """
+    Описание окружения прогона для сравнения результатов.
+    """
+    return {"python": sys.version.split()[0], "platform": platform.platform()}
+
+
+def print_results(results: Dict[str, Dict[str, float]]):
+    """
+    Печатает результаты таблицей.
+    """
+    width = max((len(name) for name in results), default=10)
+    print(f"{'':{width}}  {'count':>7} {'p50 мс':>9} {'p95 мс':>9} {'p99 мс':>9} {'оп/с':>10}")
+    for name, row in results.items():
+        print(
+            f"{name:{width}}  {row['count']:>7} {row['p50_ms']:>9.3f} {row['p95_ms']:>9.3f} "
+            f"{row['p99_ms']:>9.3f} {row['ops_per_sec']:>10.1f}"
+        )
+
+
+def write_report(path: Optional[str], meta: Dict[str, Any], results: Dict[str, Dict[str, float]]):
+    """
+    Записывает результаты в JSON (в stdout, если путь "-").
+    """
+    if not path:
+        return
+    text = json.dumps({"meta": meta, "results": results}, ensure_ascii=False, indent=2)
+    if path == "-":
+        print(text)
+        return
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text + "\n")
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline_path: str, tolerance: float) -> List[str]:
+    """
+    Сравнивает p99 с базовой линией из ранее записанного отчета.
+
+    Args:
+        results: Результаты текущего прогона
+        baseline_path: Путь к JSON отчету базовой линии
+        tolerance: Допустимый относительный рост p99 (0.2 - на 20%)
+
+    Returns:
+        List[str]: Описания регрессий (пустой список, если их нет)
+    """
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    regressions = []
+    for name, row in results.items():
+        base = baseline.get(name)
+        if base is None or base["p99_ms"] <= 0:
+            continue
+        if row["p99_ms"] > base["p99_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p99 {base['p99_ms']:.3f} -> {row['p99_ms']:.3f} мс")
+    return regressions
+
+
+def add_report_arguments(parser):
+    """
+    Добавляет общие параметры вывода и сравнения результатов.
+    """
+    parser.add_argument("--output", help="Записать результаты в JSON файл (- для stdout)")
+    parser.add_argument("--baseline", help="JSON отчет предыдущего прогона для сравнения")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Допустимый рост p99 относительно базовой линии")
+
+
+def finish(args, meta: Dict[str, Any], results: Dict[str, Dict[str, float]]) -> int:
+    """
+    Печатает и записывает результаты, сравнивает с базовой линией.
+
+    Returns:
+        int: Код выхода (1 при регрессии)
+    """
+    print_results(results)
+    write_report(args.output, {**environment(), **meta}, results)
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.tolerance)
+        for line in regressions:
+            print(f"Регрессия {line}")
+        if regressions:
+            return 1
+    return 0
@@ -0,0 +1,124 @@
+"""
+Микробенчмарки хранилища и сериализации для Backend онлайн школы S2S.
+
+Заполняет MemStorage каталогом, в scale раз больше courses.json
+и teachers.json, и users пользователями с заявками, после чего
+измеряет задержку методов хранилища и сериализации моделей.
+
+Запуск:
+    python -m server.benchmarks.storage --scale 100 --users 100000 --output storage.json
+    python -m server.benchmarks.storage --baseline storage.json  # сравнение с прошлым прогоном
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+from time import perf_counter
+from typing import Awaitable, Callable, Dict, List
+from uuid import UUID
+
+from server.benchmarks.common import add_report_arguments, finish, summarize, synthetic_catalog
+from server.catalog import COURSE_LIST_ADAPTER, Catalog
+from server.pagination import encode_cursor
+from server.schemas import InsertApplication, InsertUser, Page, User
+from server.storage import MemStorage
+
+
+async def _measure(operation: Callable[[int], Awaitable], rounds: int) -> Dict[str, float]:
+    timings: List[float] = []
+    total = perf_counter()
+    for i in range(rounds):
+        started = perf_counter()
+        await operation(i)
+        timings.append((perf_counter() - started) * 1000)
+    return summarize(timings, perf_counter() - total)
+
+
+def _sync(function: Callable[[int], object]) -> Callable[[int], Awaitable]:
+    async def operation(i: int):
+        function(i)
+    return operation
+
+
+async def run(scale: int, users: int, rounds: int) -> Dict[str, Dict[str, float]]:
+    """
+    Заполняет хранилище и прогоняет все операции.
+
+    Returns:
+        Dict[str, Dict[str, float]]: Результаты по операциям
+    """
+    rng = random.Random(0)
+    storage = MemStorage()
+    courses, teachers = synthetic_catalog(scale)
+    storage.swapCatalog(Catalog(courses, teachers))
+    storage.catalog.warm()
+
+    user_ids = []
+    for i in range(users):
+        user = await storage.createUser(InsertUser(username=f"user{i}", full_name=f"Ученик {i}"))
+        user_ids.append(str(user.id))
+        if i % 2 == 0:
+            await storage.createApplication(InsertApplication(user_id=user.id, course_id=rng.choice(courses).id))
+
+    course_ids = [str(c.id) for c in courses]
+    teacher_ids = [str(t.id) for t in teachers]
+    middle = await storage.getUser(user_ids[len(user_ids) // 2])
+    after = (middle.created_at, middle.id)
+    page = await storage.listUsers(None, 50)
+    subjects = list(storage.catalog.courses_by_subject)
+    batch_course_ids = [c.id for c in rng.sample(courses, min(100, len(courses)))]
+    batch_user_ids = [UUID(uid) for uid in rng.sample(user_ids, min(100, len(user_ids)))]
+
+    operations = {
+        "getCourse": lambda i: storage.getCourse(course_ids[i % len(course_ids)]),
+        "getTeacher": lambda i: storage.getTeacher(teacher_ids[i % len(teacher_ids)]),
+        "getCoursesByIds_100": lambda i: storage.getCoursesByIds(batch_course_ids),
+        "getCoursesPayload": lambda i: storage.getCoursesPayload(),
+        "getCoursesBySubjectPayload": lambda i: storage.getCoursesBySubjectPayload(subjects[i % len(subjects)]),
+        "queryCourses": lambda i: storage.queryCourses([subjects[i % len(subjects)]], [], 10, None, None, 20000, "price"),
+        "searchCatalog": lambda i: storage.searchCatalog("подготовка к егэ по физике"),
+        "getSuggestions": lambda i: storage.getSuggestions("матем"),
+        "getUser": lambda i: storage.getUser(user_ids[i % len(user_ids)]),
+        "getUsersByIds_100": lambda i: storage.getUsersByIds(batch_user_ids),
+        "getUserByUsername": lambda i: storage.getUserByUsername(f"user{i % users}"),
+        "listUsers": lambda i: storage.listUsers(after, 51),
+        "listApplications": lambda i: storage.listApplications(None, 51),
+        "createUser": lambda i: storage.createUser(InsertUser(username=f"bench{i}", full_name=None)),
+        "createApplication": lambda i: storage.createApplication(
+            InsertApplication(user_id=user_ids[i % len(user_ids)], course_id=course_ids[i % len(course_ids)])
+        ),
+        "createApplications_100": lambda i: storage.createApplications([
+            InsertApplication(user_id=uid, course_id=cid) for uid, cid in zip(batch_user_ids, batch_course_ids)
+        ]),
+        # Сериализация без кэша закодированных ответов
+        "serialize.course": _sync(lambda i: courses[i % len(courses)].model_dump_json()),
+        "serialize.courses_page_50": _sync(lambda i: COURSE_LIST_ADAPTER.dump_json(courses[:50])),
+        "serialize.user_page_50": _sync(
+            lambda i: Page[User](items=page, next_cursor=encode_cursor(after)).model_dump_json()
+        ),
+        "serialize.course_list_full": _sync(lambda i: COURSE_LIST_ADAPTER.dump_json(courses)),
+    }
+    results = {}
+    for name, operation in operations.items():
+        # Полный каталог кодируется долго, для него достаточно меньшего числа повторов
+        count = max(rounds // 100, 5) if name == "serialize.course_list_full" else rounds
+        results[name] = await _measure(operation, count)
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=int, default=100, help="Во сколько раз увеличить каталог")
+    parser.add_argument("--users", type=int, default=100000, help="Число пользователей в хранилище")
+    parser.add_argument("--rounds", type=int, default=2000, help="Число повторов каждой операции")
+    add_report_arguments(parser)
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(run(args.scale, args.users, args.rounds))
+    meta = {"benchmark": "storage", "scale": args.scale, "users": args.users, "rounds": args.rounds}
+    return finish(args, meta, results)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+"""
+Снимок каталога курсов и преподавателей для Backend онлайн школы S2S.
+
+Этот модуль содержит класс Catalog - неизменяемый снимок каталога вместе
+со всеми индексами и кэшем закодированных ответов - и функцию
+load_catalog, которая читает и валидирует JSON файлы. Хранилище держит
+ссылку на текущий снимок, поэтому новый каталог подменяет старый
+одним присваиванием, а запрос, уже получивший снимок, видит его целиком.
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from pydantic import TypeAdapter
+
+from server.autocomplete import AutocompleteIndex
+from server.course_query import CourseQueryIndex
+from server.responses import CachedPayload, compress_payload, encode_payload
+from server.schemas import Course, Landing, Teacher
+from server.search import SearchIndex
+
+
+# Константы для путей к файлам данных
+DATA_DIR = Path(__file__).parent
+COURSES_FILE = DATA_DIR / "courses.json"
+TEACHERS_FILE = DATA_DIR / "teachers.json"
+
+# Адаптеры для однократной сериализации списков каталога
+COURSE_LIST_ADAPTER = TypeAdapter(List[Course])
+TEACHER_LIST_ADAPTER = TypeAdapter(List[Teacher])
+LANDING_ADAPTER = TypeAdapter(Landing)
+
+# Общий ответ для неизвестных категорий и предметов (не засоряет кэш)
+EMPTY_LIST_PAYLOAD = encode_payload(COURSE_LIST_ADAPTER, [])
+
+# Отпечаток файлов каталога: (mtime_ns, size) каждого файла
+Signature = Tuple[Tuple[int, int], ...]
+
+
+def file_signature(*paths: Path) -> Signature:
+    """
+    Возвращает отпечаток файлов для обнаружения изменений.
+
+    Отсутствующий файл дает отпечаток (0, 0).
+    """
+    result = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            result.append((stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            result.append((0, 0))
+    return tuple(result)
+
+
+class Catalog:
+    """
+    Неизменяемый снимок каталога с индексами.
+
+    Индексы и закодированные ответы относятся к конкретному снимку,
+    поэтому при перезагрузке каталога они строятся заново вместе с ним,
+    а не инвалидируются по отдельности.
+
+    Attributes:
+        courses: Список курсов
+        teachers: Список преподавателей
+        signature: Отпечаток файлов, из которых загружен снимок
+    """
+
+    def __init__(self, courses: Sequence[Course], teachers: Sequence[Teacher],
+                 signature: Optional[Signature] = None):
+        self.courses: List[Course] = list(courses)
+        self.teachers: List[Teacher] = list(teachers)
+        self.signature = signature
+
+        # Индексы для поиска за O(1)
+        self.courses_by_id: Dict[UUID, Course] = {c.id: c for c in self.courses}
+        self.teachers_by_id: Dict[UUID, Teacher] = {t.id: t for t in self.teachers}
+        self.courses_by_category: Dict[str, List[Course]] = {}
+        self.courses_by_subject: Dict[str, List[Course]] = {}
+        for course in self.courses:
+            self.courses_by_category.setdefault(course.category, []).append(course)
+            self.courses_by_subject.setdefault(course.subject, []).append(course)
+
+        self.course_query_index = CourseQueryIndex(self.courses)
+        self.search_index = SearchIndex(self.courses, self.teachers)
+        self.autocomplete_index = AutocompleteIndex(self.courses, self.teachers)
+
+        # Кэш закодированных ответов каталога
+        self.response_cache: Dict[str, CachedPayload] = {}
+
+    def cached_payload(self, key: str, adapter: TypeAdapter, data) -> CachedPayload:
+        """
+        Возвращает закодированный ответ из кэша, кодируя его при первом обращении.
+
+        Args:
+            key: Ключ кэша
+            adapter: TypeAdapter модели ответа
+            data: Данные для кодирования при промахе кэша
+
+        Returns:
+            CachedPayload: Тело ответа и его ETag
+        """
+        payload = self.response_cache.get(key)
+        if payload is None:
+            payload = encode_payload(adapter, data)
+            self.response_cache[key] = payload
+        return payload
+
+    def courses_payload(self) -> CachedPayload:
+        return self.cached_payload("courses", COURSE_LIST_ADAPTER, self.courses)
+
+    def teachers_payload(self) -> CachedPayload:
+        return self.cached_payload("teachers", TEACHER_LIST_ADAPTER, self.teachers)
+
+    def category_payload(self, category: str) -> CachedPayload:
+        courses = self.courses_by_category.get(category)
+        if not courses:
+            return EMPTY_LIST_PAYLOAD
+        return self.cached_payload(f"courses:category:{category}", COURSE_LIST_ADAPTER, courses)
+
+    def subject_payload(self, subject: str) -> CachedPayload:
+        courses = self.courses_by_subject.get(subject)
+        if not courses:
+            return EMPTY_LIST_PAYLOAD
+        return self.cached_payload(f"courses:subject:{subject}", COURSE_LIST_ADAPTER, courses)
+
+    def landing_payload(self) -> CachedPayload:
+        """
+        Возвращает данные главной страницы, закодированные и сжатые один раз на снимок.
+        """
+        payload = self.response_cache.get("landing")
+        if payload is None:
+            landing = Landing(
+                courses=self.courses,
+                teachers=self.teachers,
+                popular_course_ids=[c.id for c in self.courses if c.is_popular],
+                course_ids_by_subject={
+                    subject: [c.id for c in courses] for subject, courses in self.courses_by_subject.items()
+                },
+            )
+            payload = compress_payload(encode_payload(LANDING_ADAPTER, landing))
+            self.response_cache["landing"] = payload
+        return payload
+
+    def warm(self):
+        """
+        Заранее кодирует основные ответы каталога.
+
+        Вызывается перед подменой снимка, чтобы первые запросы
+        к новому каталогу не платили за сериализацию.
+        """
+        self.courses_payload()
+        self.teachers_payload()
+        self.landing_payload()
+        for category in self.courses_by_category:
+            self.category_payload(category)
+        for subject in self.courses_by_subject:
+            self.subject_payload(subject)
+
+
+def load_catalog(courses_file: Path = COURSES_FILE, teachers_file: Path = TEACHERS_FILE) -> Catalog:
+    """
+    Читает и валидирует файлы каталога.
+
+    Отпечаток файлов снимается до чтения, поэтому изменение, сделанное
+    во время загрузки, будет замечено при следующей проверке.
+
+    Args:
+        courses_file: Путь к courses.json
+        teachers_file: Путь к teachers.json
+
+    Returns:
+        Catalog: Новый снимок каталога
+
+    Raises:
+        OSError: Если файл не удалось прочитать
+        ValueError: Если файл содержит некорректный JSON или данные
+            не проходят валидацию (pydantic.ValidationError)
+    """
+    signature = file_signature(courses_file, teachers_file)
+
+    # Загрузка курсов из JSON
+    with open(courses_file, encoding="utf-8") as f:
+        courses_raw = json.load(f)
+    courses = [Course.model_validate(c) for c in courses_raw]
+
+    # Загрузка учителей из JSON
+    with open(teachers_file, encoding="utf-8") as f:
+        teachers_raw = json.load(f)
+    teachers = [Teacher.model_validate(t) for t in teachers_raw]
+
+    for name, items in (("courses", courses), ("teachers", teachers)):
+        if len({item.id for item in items}) != len(items):
+            raise ValueError(f"Повторяющиеся id в {name}")
+
+    return Catalog(courses, teachers, signature)
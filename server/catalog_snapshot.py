@@ -0,0 +1,128 @@
+"""
+Бинарный снимок каталога для Backend онлайн школы S2S.
+
+Этот модуль содержит сборку и загрузку готового снимка каталога.
+При сборке JSON файлы один раз проходят полную валидацию, а готовый
+Catalog вместе с индексами сохраняется через pickle. При старте снимок
+используется без повторной валидации, если его хэш версии совпадает
+с хэшем текущих JSON файлов и кода моделей и индексов; иначе каталог
+загружается из JSON как обычно.
+
+Снимок - локальный артефакт сборки, который читает только само
+приложение; загружать pickle из недоверенных источников нельзя.
+
+Сборка и замер времени запуска:
+    python -m server.catalog_snapshot build
+    python -m server.catalog_snapshot measure
+"""
+
+import argparse
+import hashlib
+import logging
+import os
+import pickle
+import sys
+from pathlib import Path
+from time import perf_counter
+
+from server import autocomplete, catalog, course_query, schemas, search
+from server.catalog import COURSES_FILE, DATA_DIR, TEACHERS_FILE, Catalog, file_signature, load_catalog
+
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FILE = DATA_DIR / "catalog.snapshot"
+
+# Меняется при изменении формата файла снимка
+FORMAT_VERSION = 1
+
+# Модули, от кода которых зависит содержимое снимка
+_CODE_MODULES = (schemas, catalog, search, autocomplete, course_query)
+
+
+def catalog_version(courses_file: Path = COURSES_FILE, teachers_file: Path = TEACHERS_FILE) -> str:
+    """
+    Вычисляет хэш версии каталога.
+
+    В хэш входят содержимое JSON файлов и исходный код моделей
+    и индексов, поэтому снимок устаревает и при изменении данных,
+    и при изменении кода, который их строит.
+
+    Returns:
+        str: Хэш версии (sha256)
+    """
+    digest = hashlib.sha256(f"catalog-snapshot:{FORMAT_VERSION}".encode())
+    for path in (courses_file, teachers_file, *(Path(m.__file__) for m in _CODE_MODULES)):
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def build_snapshot(snapshot_file: Path = SNAPSHOT_FILE, courses_file: Path = COURSES_FILE,
+                   teachers_file: Path = TEACHERS_FILE) -> str:
+    """
+    Валидирует каталог и записывает бинарный снимок.
+
+    Файл сначала пишется во временный и атомарно подменяет старый.
+
+    Returns:
+        str: Хэш версии записанного снимка
+    """
+    version = catalog_version(courses_file, teachers_file)
+    built = load_catalog(courses_file, teachers_file)
+    tmp_path = snapshot_file.with_suffix(".tmp")
+    with open(tmp_path, "wb") as f:
+        pickle.dump((version, built), f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, snapshot_file)
+    return version
+
+
+def load_startup_catalog(snapshot_file: Path = SNAPSHOT_FILE, courses_file: Path = COURSES_FILE,
+                         teachers_file: Path = TEACHERS_FILE) -> Catalog:
+    """
+    Загружает каталог при старте приложения.
+
+    Если снимок есть и его хэш версии совпадает с текущими файлами,
+    каталог берется из снимка без валидации и построения индексов.
+    В остальных случаях (снимка нет, он устарел или поврежден)
+    каталог загружается из JSON с полной валидацией.
+
+    Returns:
+        Catalog: Снимок каталога
+    """
+    if snapshot_file.exists():
+        signature = file_signature(courses_file, teachers_file)
+        try:
+            with open(snapshot_file, "rb") as f:
+                version, snapshot = pickle.load(f)
+            if version == catalog_version(courses_file, teachers_file):
+                snapshot.signature = signature
+                return snapshot
+            logger.info("Снимок каталога устарел, загрузка из JSON")
+        except Exception:
+            logger.warning("Снимок каталога поврежден, загрузка из JSON", exc_info=True)
+    return load_catalog(courses_file, teachers_file)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["build", "measure"])
+    parser.add_argument("--rounds", type=int, default=20, help="Число повторов для measure")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        version = build_snapshot()
+        print(f"Снимок записан в {SNAPSHOT_FILE} ({SNAPSHOT_FILE.stat().st_size} байт), версия {version[:12]}")
+        return 0
+
+    if not SNAPSHOT_FILE.exists():
+        build_snapshot()
+    for name, loader in (("JSON + валидация", load_catalog), ("снимок", load_startup_catalog)):
+        started = perf_counter()
+        for _ in range(args.rounds):
+            loader()
+        print(f"{name}: {(perf_counter() - started) / args.rounds * 1000:.2f} мс")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
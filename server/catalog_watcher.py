@@ -0,0 +1,130 @@
+"""
+Перезагрузка каталога без перезапуска для Backend онлайн школы S2S.
+
+Этот модуль содержит фоновый цикл, который следит за courses.json
+и teachers.json по времени изменения и размеру файлов. Измененные
+файлы читаются, валидируются и индексируются в отдельном потоке,
+после чего новый снимок каталога подменяет старый в хранилище.
+Некорректный файл отклоняется, и приложение продолжает работать
+со старым каталогом.
+"""
+
+import asyncio
+import logging
+from pathlib import Path
+from typing import Optional
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from server.catalog import COURSES_FILE, TEACHERS_FILE, Catalog, Signature, file_signature, load_catalog
+from server.storage import BaseStorage, get_storage
+
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogSettings(BaseSettings):
+    """
+    Настройки перезагрузки каталога.
+
+    Attributes:
+        CATALOG_RELOAD: Следить ли за файлами каталога
+        CATALOG_RELOAD_INTERVAL: Интервал проверки файлов (сек)
+    """
+    CATALOG_RELOAD: bool = True
+    CATALOG_RELOAD_INTERVAL: float = 2.0
+
+    # Конфигурация для загрузки настроек из .env файла
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+
+
+def _build(courses_file: Path, teachers_file: Path) -> Catalog:
+    catalog = load_catalog(courses_file, teachers_file)
+    catalog.warm()
+    return catalog
+
+
+class CatalogWatcher:
+    """
+    Фоновый цикл перезагрузки каталога.
+
+    Используется опрос времени изменения файлов, а не inotify: он
+    работает на любой ОС и в контейнерах со смонтированными томами,
+    а проверка раз в пару секунд стоит два вызова stat.
+    """
+
+    def __init__(self, target: Optional[BaseStorage], settings: CatalogSettings,
+                 courses_file: Path = COURSES_FILE, teachers_file: Path = TEACHERS_FILE):
+        self._storage = target
+        self.settings = settings
+        self.courses_file = courses_file
+        self.teachers_file = teachers_file
+        # Отпечаток файлов, которые уже не прошли проверку (не перечитываются до нового изменения)
+        self._rejected: Optional[Signature] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def storage(self) -> BaseStorage:
+        """Хранилище, в котором подменяется каталог (по умолчанию хранилище приложения)."""
+        return self._storage if self._storage is not None else get_storage()
+
+    async def start(self):
+        """
+        Запускает фоновую проверку файлов, если она включена в настройках.
+        """
+        if not self.settings.CATALOG_RELOAD or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._run(), name="catalog-watcher")
+
+    async def stop(self):
+        """
+        Останавливает фоновую проверку файлов.
+        """
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def check_once(self) -> bool:
+        """
+        Проверяет файлы и перезагружает каталог, если они изменились.
+
+        Returns:
+            bool: Был ли подменен каталог
+        """
+        signature = file_signature(self.courses_file, self.teachers_file)
+        if signature == self.storage.catalog.signature or signature == self._rejected:
+            return False
+        try:
+            # Разбор, валидация и построение индексов не блокируют event loop
+            catalog = await asyncio.to_thread(_build, self.courses_file, self.teachers_file)
+        except Exception:
+            self._rejected = signature
+            logger.exception("Каталог не перезагружен, продолжаем со старой версией")
+            return False
+        self.storage.swapCatalog(catalog)
+        self._rejected = None
+        logger.info(
+            "Каталог перезагружен: %d курсов, %d преподавателей",
+            len(catalog.courses), len(catalog.teachers),
+        )
+        return True
+
+    async def _run(self):
+        """
+        Цикл фоновой задачи: раз в CATALOG_RELOAD_INTERVAL секунд проверяет файлы.
+        """
+        while True:
+            await asyncio.sleep(self.settings.CATALOG_RELOAD_INTERVAL)
+            try:
+                await self.check_once()
+            except Exception:
+                logger.exception("Ошибка проверки файлов каталога")
+
+
+# Единственный экземпляр цикла перезагрузки каталога
+catalog_watcher = CatalogWatcher(None, CatalogSettings())
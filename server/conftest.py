@@ -0,0 +1,25 @@
+"""
+Общие настройки тестов для Backend онлайн школы S2S.
+
+Тесты не требуют внешней базы данных: если DATABASE_URL не задан,
+используется временная база SQLite. Переменная задается до импорта
+тестовых модулей, потому что настройки читаются при импорте. Схема
+создается один раз до всех тестов, поэтому любой тестовый файл
+можно запускать отдельно.
+"""
+
+import os
+import tempfile
+
+import pytest
+
+if not os.getenv("DATABASE_URL"):
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='s2s-test-')}/test.db"
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database_schema():
+    from server import models  # noqa: F401 - регистрирует таблицы в Base.metadata
+    from server.database import Base, get_engine
+
+    Base.metadata.create_all(bind=get_engine())
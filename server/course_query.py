@@ -0,0 +1,175 @@
+"""
+Фильтрация, сортировка и фасеты курсов для Backend онлайн школы S2S.
+
+Этот модуль содержит битмап-индексы по курсам. Каждый курс - это бит
+в целом числе Python, поэтому фильтр по любой комбинации предмета,
+категории, класса и популярности сводится к нескольким операциям
+AND/OR над числами. Диапазон цены берется из префиксных битмапов
+по отсортированному массиву цен, а количество курсов в фасете -
+это число единичных битов.
+"""
+
+import re
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Optional, Sequence
+
+from server.schemas import Course, CourseFacets, CourseQueryResult
+
+
+# Порядки сортировки: поле и направление
+SORT_KEYS = {
+    "price": ("current_price", False),
+    "-price": ("current_price", True),
+    "lessons": ("lessons", False),
+    "-lessons": ("lessons", True),
+}
+
+_GRADES_RE = re.compile(r"(\d+)(?:\s*[–—-]\s*(\d+))?")
+
+
+def parse_grades(grades: str) -> range:
+    """
+    Разбирает строку классов курса («9 класс», «7–11 классы»).
+
+    Returns:
+        range: Классы курса; пустой диапазон, если строку не удалось разобрать
+    """
+    match = _GRADES_RE.search(grades)
+    if not match:
+        return range(0)
+    low = int(match.group(1))
+    high = int(match.group(2) or low)
+    return range(low, high + 1)
+
+
+def _bits(mask: int) -> List[int]:
+    """
+    Возвращает номера единичных битов маски по возрастанию.
+    """
+    positions = []
+    while mask:
+        low = mask & -mask
+        positions.append(low.bit_length() - 1)
+        mask ^= low
+    return positions
+
+
+class CourseQueryIndex:
+    """
+    Битмап-индексы по курсам каталога.
+
+    Индексы строятся один раз при загрузке каталога. Стоимость запроса
+    зависит от числа фильтров и найденных курсов, а не от размера каталога.
+    """
+
+    def __init__(self, courses: Sequence[Course]):
+        self.courses = list(courses)
+        self.all = (1 << len(self.courses)) - 1
+        self.by_subject: Dict[str, int] = {}
+        self.by_category: Dict[str, int] = {}
+        self.by_grade: Dict[int, int] = {}
+        self.popular = 0
+
+        for i, course in enumerate(self.courses):
+            bit = 1 << i
+            self.by_subject[course.subject] = self.by_subject.get(course.subject, 0) | bit
+            self.by_category[course.category] = self.by_category.get(course.category, 0) | bit
+            for grade in parse_grades(course.grades):
+                self.by_grade[grade] = self.by_grade.get(grade, 0) | bit
+            if course.is_popular:
+                self.popular |= bit
+
+        # Цены по возрастанию и префиксные битмапы: prices_prefix[j] -
+        # курсы с j наименьшими ценами
+        by_price = sorted(range(len(self.courses)), key=lambda i: self.courses[i].current_price)
+        self.prices = [self.courses[i].current_price for i in by_price]
+        self.prices_prefix = [0]
+        for i in by_price:
+            self.prices_prefix.append(self.prices_prefix[-1] | (1 << i))
+
+        # Ранг курса в каждом порядке сортировки (стабильно по порядку каталога)
+        self.ranks: Dict[str, List[int]] = {}
+        for name, (field, _) in SORT_KEYS.items():
+            if field in self.ranks:
+                continue
+            order = sorted(range(len(self.courses)), key=lambda i: getattr(self.courses[i], field))
+            rank = [0] * len(self.courses)
+            for position, i in enumerate(order):
+                rank[i] = position
+            self.ranks[field] = rank
+
+    def _any_of(self, index: Dict, values: Optional[Sequence]) -> int:
+        if not values:
+            return self.all
+        mask = 0
+        for value in values:
+            mask |= index.get(value, 0)
+        return mask
+
+    def _price_range(self, min_price: Optional[float], max_price: Optional[float]) -> int:
+        low = bisect_left(self.prices, min_price) if min_price is not None else 0
+        high = bisect_right(self.prices, max_price) if max_price is not None else len(self.prices)
+        if low >= high:
+            return 0
+        return self.prices_prefix[high] & ~self.prices_prefix[low]
+
+    def query(
+        self,
+        subjects: Optional[Sequence[str]] = None,
+        categories: Optional[Sequence[str]] = None,
+        grade: Optional[int] = None,
+        popular: Optional[bool] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        sort: Optional[str] = None,
+    ) -> CourseQueryResult:
+        """
+        Находит курсы по комбинации фильтров.
+
+        Значения одного фильтра объединяются через ИЛИ, разные фильтры -
+        через И. Счетчики фасета предмета считаются со всеми фильтрами,
+        кроме фильтра по предмету (аналогично для категории), чтобы
+        клиент видел, сколько курсов даст выбор другого значения.
+
+        Args:
+            subjects: Предметы
+            categories: Категории
+            grade: Класс ученика
+            popular: Только популярные (True) или только непопулярные (False)
+            min_price: Минимальная текущая цена
+            max_price: Максимальная текущая цена
+            sort: Порядок сортировки из SORT_KEYS (по умолчанию порядок каталога)
+
+        Returns:
+            CourseQueryResult: Курсы, их число и фасеты
+        """
+        subject_mask = self._any_of(self.by_subject, subjects)
+        category_mask = self._any_of(self.by_category, categories)
+        rest = self._price_range(min_price, max_price)
+        if grade is not None:
+            rest &= self.by_grade.get(grade, 0)
+        if popular is not None:
+            rest &= self.popular if popular else self.all & ~self.popular
+
+        mask = subject_mask & category_mask & rest
+        positions = _bits(mask)
+        if sort is not None:
+            field, reverse = SORT_KEYS[sort]
+            rank = self.ranks[field]
+            positions.sort(key=rank.__getitem__, reverse=reverse)
+
+        facets = CourseFacets(
+            subject={
+                name: count for name, bits in self.by_subject.items()
+                if (count := (bits & category_mask & rest).bit_count())
+            },
+            category={
+                name: count for name, bits in self.by_category.items()
+                if (count := (bits & subject_mask & rest).bit_count())
+            },
+        )
+        return CourseQueryResult(
+            items=[self.courses[i] for i in positions],
+            total=len(positions),
+            facets=facets,
+        )
@@ -2,21 +2,68 @@
 CRUD операции для базы данных Backend онлайн школы S2S.
 
 Этот модуль содержит функции для создания, чтения, обновления
-и удаления записей в базе данных. В текущей версии используется
-только для работы с контактными формами.
+и удаления записей в базе данных. Используется для работы
+с контактными формами и очередью email уведомлений (outbox).
 """
 
-from sqlalchemy.orm import Session
-from server.models import ContactFormDB
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from sqlalchemy import and_, insert, or_, select, true, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from server.metrics import DB_COMMIT_SECONDS
+from server.models import ContactFormDB, EmailOutboxDB, utcnow
+from server.pagination import Keyset
 from server.schemas import InsertContactForm
 
 
-def create_contact_form(db: Session, form_data: InsertContactForm) -> ContactFormDB:
+def after_key(model, after: Optional[Keyset]):
+    """
+    Условие keyset пагинации: (created_at, id) строго больше ключа курсора.
+
+    Args:
+        model: SQLAlchemy модель со столбцами created_at и id
+        after: Ключ последней записи предыдущей страницы или None
+
+    Returns:
+        Условие WHERE (истинное, если курсора нет)
+    """
+    if after is None:
+        return true()
+    created_at, record_id = after
+    return or_(
+        model.created_at > created_at,
+        and_(model.created_at == created_at, model.id > record_id),
+    )
+
+
+def _outbox_row(contact_form_id: UUID, form: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Формирует запись outbox для уведомления о контактной форме.
+    """
+    return {
+        "contact_form_id": contact_form_id,
+        "payload": {
+            "full_name": form["full_name"],
+            "phone": form["phone"],
+            "email": form["email"],
+            "agreed_to_terms": form["agreed_to_terms"],
+        },
+    }
+
+
+async def create_contact_form(db: AsyncSession, form_data: InsertContactForm) -> ContactFormDB:
     """
     Создает новую запись контактной формы в базе данных.
     
+    Вставка выполняется одним запросом INSERT ... RETURNING, поэтому
+    сгенерированные поля (id, created_at) возвращаются без
+    дополнительного SELECT. В той же транзакции создается запись
+    outbox для email уведомления.
+    
     Args:
-        db: SQLAlchemy сессия базы данных
+        db: Асинхронная SQLAlchemy сессия базы данных
         form_data: Данные контактной формы из Pydantic модели
         
     Returns:
@@ -26,23 +73,179 @@ def create_contact_form(db: Session, form_data: InsertContactForm) -> ContactFor
         SQLAlchemyError: При ошибках работы с базой данных
         
     Example:
-        contact = create_contact_form(db, form_data)
+        contact = await create_contact_form(db, form_data)
         print(f"Создана контактная форма с ID: {contact.id}")
     """
-    # Создаем новый объект ContactFormDB из данных формы
-    contact = ContactFormDB(
-        full_name=form_data.full_name,
-        phone=form_data.phone,
-        email=form_data.email,
-        agreed_to_terms=form_data.agreed_to_terms,
+    # Вставляем запись и сразу получаем сгенерированные поля
+    stmt = (
+        insert(ContactFormDB)
+        .values(
+            full_name=form_data.full_name,
+            phone=form_data.phone,
+            email=form_data.email,
+            agreed_to_terms=form_data.agreed_to_terms,
+        )
+        .returning(ContactFormDB)
     )
+    result = await db.execute(stmt)
+    contact = result.scalar_one()
     
-    # Добавляем запись в сессию и сохраняем в базе данных
-    db.add(contact)
-    db.commit()
+    # Уведомление попадает в outbox в той же транзакции
+    await db.execute(insert(EmailOutboxDB).values(**_outbox_row(contact.id, form_data.model_dump())))
     
-    # Обновляем объект для получения сгенерированных полей (например, id)
-    db.refresh(contact)
+    # Сохраняем изменения в базе данных
+    with DB_COMMIT_SECONDS.time("contact_form"):
+        await db.commit()
     
     return contact
 
+
+async def create_contact_forms(db: AsyncSession, rows: List[Dict[str, Any]]) -> None:
+    """
+    Вставляет несколько контактных форм одной транзакцией.
+    
+    Строки передаются вместе с заранее сгенерированными id, поэтому
+    SQLAlchemy собирает их в многострочный INSERT без RETURNING.
+    Записи outbox для уведомлений вставляются в той же транзакции.
+    
+    Args:
+        db: Асинхронная SQLAlchemy сессия базы данных
+        rows: Значения столбцов ContactFormDB для каждой формы
+        
+    Raises:
+        SQLAlchemyError: При ошибках работы с базой данных
+    """
+    if not rows:
+        return
+    await db.execute(insert(ContactFormDB), rows)
+    await db.execute(insert(EmailOutboxDB), [_outbox_row(row["id"], row) for row in rows])
+    with DB_COMMIT_SECONDS.time("contact_form_batch"):
+        await db.commit()
+
+
+async def list_contact_forms(db: AsyncSession, after: Optional[Keyset], limit: int) -> List[ContactFormDB]:
+    """
+    Получает страницу контактных форм в порядке создания.
+    
+    Args:
+        db: Асинхронная SQLAlchemy сессия базы данных
+        after: Ключ (created_at, id) последней формы предыдущей страницы
+        limit: Максимальное число форм
+        
+    Returns:
+        List[ContactFormDB]: Контактные формы после ключа
+    """
+    stmt = (
+        select(ContactFormDB)
+        .where(after_key(ContactFormDB, after))
+        .order_by(ContactFormDB.created_at, ContactFormDB.id)
+        .limit(limit)
+    )
+    return list((await db.execute(stmt)).scalars().all())
+
+
+async def claim_outbox_batch(
+    db: AsyncSession, limit: int, lease_seconds: float, max_attempts: int
+) -> List[EmailOutboxDB]:
+    """
+    Забирает пачку готовых к отправке записей outbox.
+    
+    Записи выбираются с FOR UPDATE SKIP LOCKED и переводятся в статус
+    processing с арендой на lease_seconds, поэтому несколько воркеров
+    могут разбирать outbox параллельно без повторной отправки. Если
+    воркер упал, не закончив отправку, запись снова станет доступна
+    после окончания аренды. Записи с истекшей арендой, исчерпавшие
+    max_attempts попыток, помечаются failed и больше не забираются.
+    
+    Args:
+        db: Асинхронная SQLAlchemy сессия базы данных
+        limit: Максимальный размер пачки
+        lease_seconds: Длительность аренды записи в секундах
+        max_attempts: Максимальное число попыток отправки
+        
+    Returns:
+        List[EmailOutboxDB]: Забранные записи
+    """
+    now = utcnow()
+    await db.execute(
+        update(EmailOutboxDB)
+        .where(
+            EmailOutboxDB.status == "processing",
+            EmailOutboxDB.available_at <= now,
+            EmailOutboxDB.attempts >= max_attempts,
+        )
+        .values(status="failed", last_error="Аренда истекла, попытки исчерпаны")
+        .execution_options(synchronize_session=False)
+    )
+    ready = (
+        select(EmailOutboxDB.id)
+        .where(
+            EmailOutboxDB.status.in_(("pending", "processing")),
+            EmailOutboxDB.available_at <= now,
+            EmailOutboxDB.attempts < max_attempts,
+        )
+        .order_by(EmailOutboxDB.available_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    stmt = (
+        update(EmailOutboxDB)
+        .where(EmailOutboxDB.id.in_(ready.scalar_subquery()))
+        .values(
+            status="processing",
+            attempts=EmailOutboxDB.attempts + 1,
+            available_at=now + timedelta(seconds=lease_seconds),
+        )
+        .returning(EmailOutboxDB)
+        .execution_options(synchronize_session=False)
+    )
+    result = await db.execute(stmt)
+    rows = list(result.scalars().all())
+    with DB_COMMIT_SECONDS.time("outbox_claim"):
+        await db.commit()
+    return rows
+
+
+async def mark_outbox_sent(db: AsyncSession, ids: List[UUID]) -> None:
+    """
+    Помечает записи outbox как отправленные.
+    
+    Args:
+        db: Асинхронная SQLAlchemy сессия базы данных
+        ids: ID отправленных записей
+    """
+    if not ids:
+        return
+    await db.execute(
+        update(EmailOutboxDB)
+        .where(EmailOutboxDB.id.in_(ids))
+        .values(status="sent", sent_at=utcnow(), last_error=None)
+        .execution_options(synchronize_session=False)
+    )
+    with DB_COMMIT_SECONDS.time("outbox_sent"):
+        await db.commit()
+
+
+async def mark_outbox_failed(db: AsyncSession, outbox_id: UUID, error: str, retry_at: Optional[datetime]) -> None:
+    """
+    Записывает ошибку отправки и планирует повтор.
+    
+    Args:
+        db: Асинхронная SQLAlchemy сессия базы данных
+        outbox_id: ID записи outbox
+        error: Текст ошибки
+        retry_at: Время следующей попытки или None, если попытки исчерпаны
+    """
+    values: Dict[str, Any] = {"last_error": error[:1000]}
+    if retry_at is None:
+        values["status"] = "failed"
+    else:
+        values.update(status="pending", available_at=retry_at)
+    await db.execute(
+        update(EmailOutboxDB)
+        .where(EmailOutboxDB.id == outbox_id)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    with DB_COMMIT_SECONDS.time("outbox_failed"):
+        await db.commit()
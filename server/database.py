@@ -2,13 +2,23 @@
 Конфигурация базы данных для Backend онлайн школы S2S.
 
 Этот модуль содержит настройки подключения к PostgreSQL базе данных
-и создает SQLAlchemy engine и session factory.
+и лениво создает синхронный и асинхронный SQLAlchemy engine и session
+factory при первом обращении.
 """
 
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import TimeoutError as SATimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from threading import Lock
+from time import perf_counter
+from typing import Any, AsyncIterator, Dict
 import os
 
 
@@ -18,16 +28,283 @@ load_dotenv()
 # Получаем URL базы данных из переменных окружения
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-# Создаем SQLAlchemy engine для подключения к базе данных
-engine = create_engine(DATABASE_URL)
 
-# Создаем фабрику сессий для работы с базой данных
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+class DatabaseSettings(BaseSettings):
+    """
+    Настройки пула соединений с базой данных.
+    
+    Значения загружаются из переменных окружения или .env файла
+    и применяются к синхронному и асинхронному engine. Пул создается
+    в каждом процессе uvicorn отдельно, поэтому общее число соединений
+    равно (DB_POOL_SIZE + DB_MAX_OVERFLOW) * число воркеров.
+    
+    Attributes:
+        DB_POOL_SIZE: Число постоянно открытых соединений в пуле
+        DB_MAX_OVERFLOW: Сколько соединений можно открыть сверх DB_POOL_SIZE
+        DB_POOL_TIMEOUT: Сколько секунд ждать свободное соединение
+        DB_POOL_RECYCLE: Через сколько секунд пересоздавать соединение (-1 - никогда)
+        DB_POOL_PRE_PING: Проверять соединение перед выдачей из пула
+        CONTACT_FORM_WRITE_BEHIND: Копить контактные формы в памяти и вставлять пачками
+        CONTACT_FORM_BATCH_SIZE: Размер пачки, при котором буфер сбрасывается сразу
+        CONTACT_FORM_FLUSH_INTERVAL: Максимальное время (сек) хранения формы в буфере
+    """
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    CONTACT_FORM_WRITE_BEHIND: bool = False
+    CONTACT_FORM_BATCH_SIZE: int = 100
+    CONTACT_FORM_FLUSH_INTERVAL: float = 0.5
+
+    # Конфигурация для загрузки настроек из .env файла
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+
+
+# Создаем экземпляр настроек базы данных
+db_settings = DatabaseSettings()
+
+
+def engine_options(url: str) -> Dict[str, Any]:
+    """
+    Формирует параметры пула соединений для create_engine.
+    
+    SQLite (используется в тестах) работает со своими пулами, которые
+    не принимают размер пула и overflow, поэтому для него передаются
+    только общие параметры.
+    
+    Args:
+        url: URL базы данных
+        
+    Returns:
+        Dict[str, Any]: Именованные аргументы для create_engine
+    """
+    options: Dict[str, Any] = {
+        "pool_pre_ping": db_settings.DB_POOL_PRE_PING,
+        "pool_recycle": db_settings.DB_POOL_RECYCLE,
+    }
+    if make_url(url).get_backend_name() != "sqlite":
+        options.update(
+            pool_size=db_settings.DB_POOL_SIZE,
+            max_overflow=db_settings.DB_MAX_OVERFLOW,
+            pool_timeout=db_settings.DB_POOL_TIMEOUT,
+        )
+    return options
+
+
+class PoolMetrics:
+    """
+    Счетчики использования пула соединений одного engine.
+    
+    Число выдач и новых соединений собирается через события пула,
+    а время ожидания соединения замеряется в get_db/async_session.
+    
+    Attributes:
+        checkouts: Сколько раз соединение выдавалось из пула
+        connects: Сколько физических соединений было открыто
+        timeouts: Сколько раз ожидание соединения завершилось таймаутом
+        wait_total: Суммарное время ожидания соединения в секундах
+        wait_max: Максимальное время ожидания соединения в секундах
+    """
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.checkouts = 0
+        self.connects = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.waits = 0
+        self._lock = Lock()
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "connect", self._on_connect)
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self._lock:
+            self.checkouts += 1
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.connects += 1
+
+    def record_wait(self, seconds: float, timed_out: bool = False):
+        """
+        Учитывает время ожидания соединения из пула.
+        
+        Args:
+            seconds: Сколько секунд заняло получение соединения
+            timed_out: Завершилось ли ожидание таймаутом
+        """
+        with self._lock:
+            self.waits += 1
+            self.wait_total += seconds
+            if seconds > self.wait_max:
+                self.wait_max = seconds
+            if timed_out:
+                self.timeouts += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Возвращает текущее состояние пула и накопленные счетчики.
+        
+        Returns:
+            Dict[str, Any]: Статистика пула соединений
+        """
+        pool = self.engine.pool
+        stats: Dict[str, Any] = {"pool_class": type(pool).__name__}
+        # Размер, overflow и занятые соединения есть только у QueuePool
+        if hasattr(pool, "checkedout"):
+            stats.update(
+                size=pool.size(),
+                checked_in=pool.checkedin(),
+                checked_out=pool.checkedout(),
+                overflow=max(pool.overflow(), 0),
+                max_overflow=getattr(pool, "_max_overflow", 0),
+            )
+        with self._lock:
+            stats.update(
+                checkouts=self.checkouts,
+                connects=self.connects,
+                timeouts=self.timeouts,
+                wait_count=self.waits,
+                wait_total_seconds=round(self.wait_total, 6),
+                wait_max_seconds=round(self.wait_max, 6),
+                wait_avg_seconds=round(self.wait_total / self.waits, 6) if self.waits else 0.0,
+            )
+        return stats
+
+    def saturation(self) -> float:
+        """
+        Доля занятых соединений от максимума пула (size + max_overflow).
+        
+        Returns:
+            float: От 0 до 1; 0 для пулов без ограничения размера
+        """
+        pool = self.engine.pool
+        if not hasattr(pool, "checkedout"):
+            return 0.0
+        capacity = pool.size() + max(getattr(pool, "_max_overflow", 0), 0)
+        return pool.checkedout() / capacity if capacity > 0 else 0.0
+
+
+# Асинхронные драйверы для синхронных диалектов из DATABASE_URL
+ASYNC_DRIVERS = {
+    "postgresql": "asyncpg",
+    "sqlite": "aiosqlite",
+}
+
+
+def to_async_url(url: str) -> str:
+    """
+    Преобразует URL базы данных в URL с асинхронным драйвером.
+
+    Например, postgresql:// и postgresql+psycopg2:// превращаются
+    в postgresql+asyncpg://, а sqlite:// в sqlite+aiosqlite://.
+
+    Args:
+        url: Исходный URL базы данных
+
+    Returns:
+        str: URL с асинхронным драйвером
+    """
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None:
+        return url
+    return parsed.set(drivername=f"{parsed.get_backend_name()}+{driver}").render_as_string(hide_password=False)
+
+
+# Метрики пулов созданных engine: "sync" и "async"
+_pool_metrics: Dict[str, PoolMetrics] = {}
+
+
+def _database_url() -> str:
+    """
+    Возвращает DATABASE_URL.
+
+    Raises:
+        RuntimeError: Если DATABASE_URL не задан
+    """
+    if not DATABASE_URL:
+        raise RuntimeError("DATABASE_URL не задан")
+    return DATABASE_URL
+
+
+@lru_cache(maxsize=None)
+def get_engine() -> Engine:
+    """
+    Возвращает синхронный engine, создавая его при первом обращении.
+
+    Engine создается лениво, чтобы импорт модулей приложения
+    не требовал настроенной базы данных.
+    """
+    url = _database_url()
+    engine = create_engine(url, **engine_options(url))
+    _pool_metrics["sync"] = PoolMetrics(engine)
+    return engine
+
+
+@lru_cache(maxsize=None)
+def get_session_factory() -> sessionmaker:
+    """
+    Возвращает фабрику синхронных сессий.
+    """
+    return sessionmaker(autocommit=False, autoflush=False, bind=get_engine())
+
+
+@lru_cache(maxsize=None)
+def get_async_engine() -> AsyncEngine:
+    """
+    Возвращает асинхронный engine, создавая его при первом обращении.
+
+    URL можно задать явно через ASYNC_DATABASE_URL, иначе он выводится
+    из DATABASE_URL. Асинхронный engine не блокирует event loop.
+    """
+    url = os.getenv("ASYNC_DATABASE_URL") or to_async_url(_database_url())
+    engine = create_async_engine(url, **engine_options(url))
+    _pool_metrics["async"] = PoolMetrics(engine.sync_engine)
+    return engine
+
+
+@lru_cache(maxsize=None)
+def get_async_session_factory() -> async_sessionmaker:
+    """
+    Возвращает фабрику асинхронных сессий.
+
+    expire_on_commit=False позволяет читать атрибуты объектов
+    после commit без повторного запроса.
+    """
+    return async_sessionmaker(get_async_engine(), expire_on_commit=False, autoflush=False)
+
 
 # Базовый класс для всех моделей SQLAlchemy
 Base = declarative_base()
 
 
+def get_pool_stats() -> Dict[str, Any]:
+    """
+    Возвращает статистику пулов соединений текущего процесса.
+    
+    Пулы, которые еще не создавались, в ответ не попадают.
+    
+    Returns:
+        Dict[str, Any]: PID воркера, настройки и статистика пулов
+    """
+    return {
+        "pid": os.getpid(),
+        "settings": db_settings.model_dump(),
+        **{name: metrics.snapshot() for name, metrics in _pool_metrics.items()},
+    }
+
+
+def async_pool_saturation() -> float:
+    """
+    Возвращает загрузку пула асинхронного engine (0, если он еще не создан).
+    """
+    metrics = _pool_metrics.get("async")
+    return metrics.saturation() if metrics is not None else 0.0
+
+
 def get_db():
     """
     Генератор для получения сессии базы данных.
@@ -44,8 +321,55 @@ def get_db():
             # Использование сессии базы данных
             pass
     """
-    db = SessionLocal()
+    db = get_session_factory()()
+    metrics = _pool_metrics["sync"]
     try:
+        # Сразу берем соединение, чтобы замерить ожидание свободного места в пуле
+        started = perf_counter()
+        try:
+            db.connection()
+        except SATimeoutError:
+            metrics.record_wait(perf_counter() - started, timed_out=True)
+            raise
+        metrics.record_wait(perf_counter() - started)
         yield db
     finally:
         db.close()
+
+
+@asynccontextmanager
+async def async_session() -> AsyncIterator[AsyncSession]:
+    """
+    Открывает асинхронную сессию с замером ожидания соединения.
+    
+    Используется там, где сессия нужна вне dependency FastAPI,
+    например в фоновых задачах.
+    
+    Yields:
+        AsyncSession: Асинхронная SQLAlchemy сессия
+    """
+    async with get_async_session_factory()() as db:
+        metrics = _pool_metrics["async"]
+        # Сразу берем соединение, чтобы замерить ожидание свободного места в пуле
+        started = perf_counter()
+        try:
+            await db.connection()
+        except SATimeoutError:
+            metrics.record_wait(perf_counter() - started, timed_out=True)
+            raise
+        metrics.record_wait(perf_counter() - started)
+        yield db
+
+
+async def init_db():
+    """
+    Создает таблицы, которых еще нет в базе данных.
+
+    Вызывается при старте приложения (в lifespan), а не при импорте,
+    и заодно проверяет, что база данных доступна.
+    """
+    # Модели регистрируются в Base.metadata при импорте модуля
+    import server.models  # noqa: F401
+
+    async with get_async_engine().begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
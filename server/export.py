@@ -0,0 +1,160 @@
+"""
+Потоковая выгрузка данных для Backend онлайн школы S2S.
+
+Этот модуль содержит генераторы, которые читают контактные формы
+и заявки порциями и сразу кодируют их в NDJSON или CSV. Ответ отдается
+через StreamingResponse, поэтому потребление памяти не зависит от числа
+строк, а первые байты уходят клиенту сразу после чтения первой порции.
+"""
+
+import csv
+import io
+import json
+import re
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Sequence
+from uuid import UUID
+
+from sqlalchemy import select
+
+from server.database import async_session
+from server.models import ContactFormDB
+from server.storage import BaseStorage
+
+
+# Размер порции чтения из базы данных и хранилища
+EXPORT_CHUNK_SIZE = 500
+
+CONTACT_FORM_FIELDS = ["id", "full_name", "phone", "email", "agreed_to_terms", "created_at"]
+APPLICATION_FIELDS = ["id", "user_id", "course_id", "created_at"]
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+# Символы, с которых таблицы начинают формулу
+_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+# Телефоны и числа (+7 900 123-45-67, -5) формулой не являются и не экранируются
+_PLAIN_NUMBER = re.compile(r"[+-]?[\d\s()-]+")
+
+
+def _json_value(value: Any) -> Any:
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _csv_value(value: Any) -> Any:
+    """
+    Готовит значение для CSV.
+
+    Строки, которые табличный редактор воспримет как формулу,
+    экранируются апострофом (защита от CSV injection). Значения
+    с + или - в начале, состоящие только из цифр, пробелов, скобок
+    и дефисов (телефоны, числа), остаются без изменений.
+    """
+    value = _json_value(value)
+    if isinstance(value, str) and value.startswith(_FORMULA_PREFIXES):
+        if value[0] in "+-" and _PLAIN_NUMBER.fullmatch(value):
+            return value
+        return "'" + value
+    return value
+
+
+def encode_ndjson(rows: Sequence[Dict[str, Any]]) -> bytes:
+    """
+    Кодирует порцию строк в NDJSON (одна JSON запись на строку).
+    """
+    return "".join(
+        json.dumps({k: _json_value(v) for k, v in row.items()}, ensure_ascii=False) + "\n"
+        for row in rows
+    ).encode("utf-8")
+
+
+def encode_csv(rows: Sequence[Dict[str, Any]], fields: List[str], header: bool) -> bytes:
+    """
+    Кодирует порцию строк в CSV.
+
+    Первая порция начинается с BOM и заголовка, чтобы Excel
+    правильно открыл кириллицу.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        buffer.write("\ufeff")
+        writer.writerow(fields)
+    for row in rows:
+        writer.writerow([_csv_value(row[field]) for field in fields])
+    return buffer.getvalue().encode("utf-8")
+
+
+async def encode_stream(chunks: AsyncIterator[List[Dict[str, Any]]], fmt: str, fields: List[str]) -> AsyncIterator[bytes]:
+    """
+    Кодирует поток порций строк в выбранный формат.
+
+    Args:
+        chunks: Асинхронный поток порций строк
+        fmt: Формат выгрузки (ndjson или csv)
+        fields: Порядок столбцов для CSV
+
+    Yields:
+        bytes: Закодированные порции
+    """
+    first = True
+    async for rows in chunks:
+        if fmt == "csv":
+            yield encode_csv(rows, fields, header=first)
+        else:
+            yield encode_ndjson(rows)
+        first = False
+    if first and fmt == "csv":
+        # Пустая выгрузка все равно содержит заголовок
+        yield encode_csv([], fields, header=True)
+
+
+async def contact_form_chunks() -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Читает контактные формы из базы данных порциями.
+
+    Используется серверный курсор (stream + yield_per), поэтому
+    в памяти одновременно находится не больше одной порции.
+
+    Yields:
+        List[Dict[str, Any]]: Порция контактных форм
+    """
+    stmt = (
+        select(*(getattr(ContactFormDB, field) for field in CONTACT_FORM_FIELDS))
+        .order_by(ContactFormDB.created_at, ContactFormDB.id)
+        .execution_options(yield_per=EXPORT_CHUNK_SIZE)
+    )
+    async with async_session() as db:
+        result = await db.stream(stmt)
+        async for partition in result.mappings().partitions():
+            yield [dict(row) for row in partition]
+
+
+async def application_chunks(storage: BaseStorage) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Читает заявки из хранилища порциями через keyset пагинацию.
+
+    Обход по ключу (created_at, id) не копирует все заявки разом
+    и не ломается, если во время выгрузки создаются новые заявки.
+
+    Args:
+        storage: Хранилище данных
+
+    Yields:
+        List[Dict[str, Any]]: Порция заявок
+    """
+    after = None
+    while True:
+        applications = await storage.listApplications(after, EXPORT_CHUNK_SIZE)
+        if not applications:
+            return
+        yield [application.model_dump() for application in applications]
+        last = applications[-1]
+        after = (last.created_at, last.id)
@@ -0,0 +1,476 @@
+"""
+Идемпотентность POST запросов для Backend онлайн школы S2S.
+
+Этот модуль содержит ASGI middleware, которое защищает создание
+контактных форм и заявок от повторной отправки. Ответ на запрос
+с заголовком Idempotency-Key сохраняется, и повтор с тем же ключом
+получает сохраненный ответ без повторной вставки в базу данных
+и без повторного письма. Запросы без ключа с тем же телом, пришедшие
+в течение короткого окна, распознаются по хэшу тела.
+
+Ключи хранятся в памяти процесса (LRU с ограничением размера и TTL)
+или, при IDEMPOTENCY_BACKEND=sql, в таблице idempotency_keys,
+общей для всех воркеров.
+"""
+
+import hashlib
+import json
+import logging
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import timedelta
+from functools import lru_cache
+from time import monotonic
+from typing import Optional
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from server.database import async_session
+from server.models import IdempotencyKeyDB, utcnow
+
+
+logger = logging.getLogger(__name__)
+
+# Маршруты, для которых действует идемпотентность (только POST)
+IDEMPOTENT_PATHS = frozenset({"/api/contact_form", "/api/applications", "/api/applications/bulk"})
+
+# Временные отказы (таймаут, слишком ранний запрос, лимит частоты): повтор может пройти
+TRANSIENT_STATUSES = frozenset({408, 425, 429})
+
+# Максимальная длина Idempotency-Key
+MAX_KEY_LENGTH = 255
+
+# Максимальный размер тела, которое читается в память для хэша (байт).
+# Маршруты принимают небольшой JSON; пакет из MAX_BATCH_SIZE заявок занимает около 50 КиБ
+MAX_BODY_SIZE = 256 * 1024
+
+# Как часто (раз в сколько сохраненных ответов) удалять просроченные ключи из БД
+SQL_PURGE_EVERY = 1000
+
+
+class IdempotencySettings(BaseSettings):
+    """
+    Настройки идемпотентности.
+
+    Attributes:
+        IDEMPOTENCY_BACKEND: Где хранить ключи: memory (в процессе) или sql (общая БД)
+        IDEMPOTENCY_TTL: Сколько секунд хранится ответ на запрос с Idempotency-Key
+        IDEMPOTENCY_CACHE_SIZE: Максимальное число ключей в памяти
+        IDEMPOTENCY_DEDUPE_WINDOW: Окно (сек) распознавания одинаковых запросов без ключа (0 - выключено)
+        IDEMPOTENCY_LOCK_TIMEOUT: Через сколько секунд незавершенный запрос перестает блокировать ключ
+    """
+    IDEMPOTENCY_BACKEND: str = "memory"
+    IDEMPOTENCY_TTL: float = 86400.0
+    IDEMPOTENCY_CACHE_SIZE: int = 10000
+    IDEMPOTENCY_DEDUPE_WINDOW: float = 10.0
+    IDEMPOTENCY_LOCK_TIMEOUT: float = 60.0
+
+    # Конфигурация для загрузки настроек из .env файла
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+
+
+@dataclass(frozen=True)
+class StoredResponse:
+    """
+    Сохраненный ответ на запрос.
+
+    Attributes:
+        status_code: HTTP статус
+        content_type: Content-Type ответа
+        body: Тело ответа
+    """
+    status_code: int
+    content_type: Optional[str]
+    body: bytes
+
+
+class IdempotencyInProgressError(Exception):
+    """
+    Исключение, если запрос с тем же ключом еще выполняется.
+    """
+
+
+class IdempotencyKeyReusedError(Exception):
+    """
+    Исключение, если ключ уже использован с другим телом запроса.
+    """
+
+
+class BaseIdempotencyStore(ABC):
+    """
+    Интерфейс хранилища ключей идемпотентности.
+
+    Запрос сначала занимает ключ (begin). Если ключ свободен, запрос
+    выполняется и его ответ сохраняется (complete); при ошибке сервера
+    ключ освобождается (release), чтобы клиент мог повторить запрос.
+    """
+
+    def __init__(self, settings: IdempotencySettings):
+        self.settings = settings
+
+    @abstractmethod
+    async def begin(self, key: str, fingerprint: str) -> Optional[StoredResponse]:
+        """
+        Занимает ключ или возвращает сохраненный ответ.
+
+        Args:
+            key: Ключ идемпотентности
+            fingerprint: Хэш тела запроса
+
+        Returns:
+            Optional[StoredResponse]: Сохраненный ответ или None, если ключ занят этим запросом
+
+        Raises:
+            IdempotencyInProgressError: Если запрос с этим ключом еще выполняется
+            IdempotencyKeyReusedError: Если ключ использован с другим телом
+        """
+
+    @abstractmethod
+    async def complete(self, key: str, response: StoredResponse, ttl: float):
+        """
+        Сохраняет ответ на ttl секунд.
+        """
+
+    @abstractmethod
+    async def release(self, key: str):
+        """
+        Освобождает ключ незавершенного запроса.
+        """
+
+
+@dataclass
+class _Entry:
+    fingerprint: str
+    response: Optional[StoredResponse]
+    expires_at: float
+
+
+class MemoryIdempotencyStore(BaseIdempotencyStore):
+    """
+    Хранилище ключей в памяти процесса.
+
+    Ключи лежат в OrderedDict в порядке последнего обращения; при
+    превышении IDEMPOTENCY_CACHE_SIZE вытесняются самые старые,
+    просроченные ключи удаляются при обращении к ним. Все операции
+    выполняются в потоке event loop без ожиданий, поэтому блокировки
+    не нужны.
+    """
+
+    def __init__(self, settings: IdempotencySettings):
+        super().__init__(settings)
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def begin(self, key: str, fingerprint: str) -> Optional[StoredResponse]:
+        now = monotonic()
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at <= now:
+            del self._entries[key]
+            entry = None
+        if entry is None:
+            self._put(key, _Entry(fingerprint, None, now + self.settings.IDEMPOTENCY_LOCK_TIMEOUT))
+            return None
+        self._entries.move_to_end(key)
+        return _resolve(entry.fingerprint, entry.response, fingerprint)
+
+    async def complete(self, key: str, response: StoredResponse, ttl: float):
+        entry = self._entries.get(key)
+        fingerprint = entry.fingerprint if entry is not None else ""
+        self._put(key, _Entry(fingerprint, response, monotonic() + ttl))
+
+    async def release(self, key: str):
+        entry = self._entries.get(key)
+        if entry is not None and entry.response is None:
+            del self._entries[key]
+
+    def _put(self, key: str, entry: _Entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.settings.IDEMPOTENCY_CACHE_SIZE:
+            self._entries.popitem(last=False)
+
+
+class SqlIdempotencyStore(BaseIdempotencyStore):
+    """
+    Хранилище ключей в таблице idempotency_keys.
+
+    Ключ занимается вставкой строки с первичным ключом, поэтому из
+    нескольких одновременных запросов с одним ключом (в том числе
+    в разных воркерах) выполняется только один. Просроченные ключи
+    удаляются раз в SQL_PURGE_EVERY сохраненных ответов.
+    """
+
+    def __init__(self, settings: IdempotencySettings):
+        super().__init__(settings)
+        self._completed = 0
+
+    async def begin(self, key: str, fingerprint: str) -> Optional[StoredResponse]:
+        now = utcnow()
+        async with async_session() as db:
+            # Просроченный ключ освобождается перед попыткой занять его
+            await db.execute(
+                delete(IdempotencyKeyDB).where(IdempotencyKeyDB.key == key, IdempotencyKeyDB.expires_at <= now)
+            )
+            try:
+                await db.execute(insert(IdempotencyKeyDB).values(
+                    key=key,
+                    fingerprint=fingerprint,
+                    expires_at=now + timedelta(seconds=self.settings.IDEMPOTENCY_LOCK_TIMEOUT),
+                ))
+                await db.commit()
+                return None
+            except IntegrityError:
+                await db.rollback()
+            row = (await db.execute(
+                select(IdempotencyKeyDB).where(IdempotencyKeyDB.key == key)
+            )).scalar_one_or_none()
+        if row is None:
+            # Ключ освободили между вставкой и чтением
+            raise IdempotencyInProgressError(key)
+        response = None
+        if row.status_code is not None:
+            response = StoredResponse(row.status_code, row.content_type, row.body or b"")
+        return _resolve(row.fingerprint, response, fingerprint)
+
+    async def complete(self, key: str, response: StoredResponse, ttl: float):
+        async with async_session() as db:
+            await db.execute(
+                update(IdempotencyKeyDB)
+                .where(IdempotencyKeyDB.key == key)
+                .values(
+                    status_code=response.status_code,
+                    content_type=response.content_type,
+                    body=response.body,
+                    expires_at=utcnow() + timedelta(seconds=ttl),
+                )
+            )
+            await db.commit()
+        self._completed += 1
+        if self._completed % SQL_PURGE_EVERY == 0:
+            await self.purge_expired()
+
+    async def release(self, key: str):
+        async with async_session() as db:
+            await db.execute(
+                delete(IdempotencyKeyDB).where(IdempotencyKeyDB.key == key, IdempotencyKeyDB.status_code.is_(None))
+            )
+            await db.commit()
+
+    async def purge_expired(self) -> int:
+        """
+        Удаляет просроченные ключи.
+
+        Returns:
+            int: Число удаленных ключей
+        """
+        async with async_session() as db:
+            result = await db.execute(delete(IdempotencyKeyDB).where(IdempotencyKeyDB.expires_at <= utcnow()))
+            await db.commit()
+        return result.rowcount
+
+
+def _resolve(stored_fingerprint: str, response: Optional[StoredResponse], fingerprint: str) -> StoredResponse:
+    """
+    Проверяет занятый ключ и возвращает сохраненный ответ.
+    """
+    if stored_fingerprint != fingerprint:
+        raise IdempotencyKeyReusedError()
+    if response is None:
+        raise IdempotencyInProgressError()
+    return response
+
+
+def create_idempotency_store(settings: IdempotencySettings) -> BaseIdempotencyStore:
+    """
+    Создает хранилище ключей по настройке IDEMPOTENCY_BACKEND.
+
+    Raises:
+        ValueError: Если указано неизвестное хранилище
+    """
+    if settings.IDEMPOTENCY_BACKEND == "memory":
+        return MemoryIdempotencyStore(settings)
+    if settings.IDEMPOTENCY_BACKEND == "sql":
+        return SqlIdempotencyStore(settings)
+    raise ValueError(f"Неизвестное хранилище ключей идемпотентности: {settings.IDEMPOTENCY_BACKEND}")
+
+
+@lru_cache(maxsize=None)
+def get_idempotency_store() -> BaseIdempotencyStore:
+    """
+    Возвращает хранилище ключей приложения, создавая его при первом обращении.
+    """
+    return create_idempotency_store(IdempotencySettings())
+
+
+def _json_response(status_code: int, detail: str) -> StoredResponse:
+    return StoredResponse(status_code, "application/json", json.dumps({"detail": detail}).encode())
+
+
+class IdempotencyMiddleware:
+    """
+    ASGI middleware идемпотентности POST запросов к IDEMPOTENT_PATHS.
+
+    Тело запроса читается целиком до обработчика (оно нужно для хэша)
+    и передается обработчику без изменений; тело больше MAX_BODY_SIZE
+    отклоняется с 413 до чтения остатка. Повтор получает
+    сохраненный ответ с заголовком Idempotent-Replayed: true.
+    Одновременный повтор, пока первый запрос еще выполняется,
+    получает 409, а тот же ключ с другим телом - 422. Ключи
+    действуют отдельно для каждого клиента (IP и User-Agent), поэтому
+    чужой ключ не позволяет получить сохраненный ответ другого
+    клиента с его персональными данными. Ответы 5xx
+    и временные отказы (TRANSIENT_STATUSES, например 429 лимита
+    частоты) не сохраняются, чтобы запрос можно было повторить.
+    """
+
+    def __init__(self, app, store: Optional[BaseIdempotencyStore] = None):
+        self.app = app
+        self._store = store
+
+    @property
+    def store(self) -> BaseIdempotencyStore:
+        """Хранилище ключей (по умолчанию хранилище приложения)."""
+        return self._store if self._store is not None else get_idempotency_store()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in IDEMPOTENT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        too_large = _json_response(413, "Request body is too large")
+        content_length = _header(scope, b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > MAX_BODY_SIZE:
+            await _send_stored(send, too_large, False)
+            return
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                await self.app(scope, receive, send)
+                return
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > MAX_BODY_SIZE:
+                await _send_stored(send, too_large, False)
+                return
+            chunks.append(chunk)
+            if not message.get("more_body", False):
+                break
+        body = b"".join(chunks)
+        digest = hashlib.sha256(body)
+        if scope.get("query_string"):
+            # Параметры меняют смысл запроса (например, mode пакета заявок)
+            digest.update(b"?" + scope["query_string"])
+        fingerprint = digest.hexdigest()
+
+        store = self.store
+        settings = store.settings
+        header = _header(scope, b"idempotency-key")
+        if header is not None:
+            if not header or len(header) > MAX_KEY_LENGTH:
+                await _send_stored(send, _json_response(400, "Invalid Idempotency-Key"), False)
+                return
+            key, ttl = f"{scope['path']}:{_client_id(scope)}:key:{header}", settings.IDEMPOTENCY_TTL
+        elif settings.IDEMPOTENCY_DEDUPE_WINDOW > 0:
+            key, ttl = f"{scope['path']}:{_client_id(scope)}:body:{fingerprint}", settings.IDEMPOTENCY_DEDUPE_WINDOW
+        else:
+            await self.app(scope, _replay_body(body, receive), send)
+            return
+
+        try:
+            stored = await store.begin(key, fingerprint)
+        except IdempotencyInProgressError:
+            await _send_stored(send, _json_response(409, "Request with this Idempotency-Key is in progress"), False)
+            return
+        except IdempotencyKeyReusedError:
+            await _send_stored(
+                send, _json_response(422, "Idempotency-Key was used with a different request body"), False,
+            )
+            return
+        except Exception:
+            # Недоступное хранилище ключей не должно останавливать прием форм
+            logger.exception("Ошибка хранилища ключей идемпотентности, запрос выполняется без проверки")
+            await self.app(scope, _replay_body(body, receive), send)
+            return
+        if stored is not None:
+            await _send_stored(send, stored, True)
+            return
+
+        status_code = 500
+        content_type = None
+        response_chunks = []
+
+        async def send_wrapper(message):
+            nonlocal status_code, content_type
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                content_type = _header(message, b"content-type")
+            elif message["type"] == "http.response.body":
+                response_chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, _replay_body(body, receive), send_wrapper)
+        except BaseException:
+            await store.release(key)
+            raise
+        try:
+            if status_code >= 500 or status_code in TRANSIENT_STATUSES:
+                await store.release(key)
+            else:
+                await store.complete(key, StoredResponse(status_code, content_type, b"".join(response_chunks)), ttl)
+        except Exception:
+            logger.exception("Не удалось сохранить ответ для ключа идемпотентности")
+
+
+def _client_id(scope) -> str:
+    """
+    Отпечаток клиента для ключа: хэш IP и User-Agent.
+
+    IP берется из scope["client"]; за прокси uvicorn нужно запускать
+    с --proxy-headers.
+    """
+    client = scope.get("client")
+    ip = client[0] if client else "unknown"
+    user_agent = _header(scope, b"user-agent") or ""
+    return hashlib.sha256(f"{ip}\0{user_agent}".encode()).hexdigest()[:32]
+
+
+def _header(scope_or_message, name: bytes) -> Optional[str]:
+    for header_name, value in scope_or_message.get("headers", ()):
+        if header_name.lower() == name:
+            return value.decode("latin-1")
+    return None
+
+
+def _replay_body(body: bytes, receive):
+    """
+    Возвращает receive, который отдает уже прочитанное тело, а затем
+    передает управление исходному receive (например, для disconnect).
+    """
+    sent = False
+
+    async def replay():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return await receive()
+
+    return replay
+
+
+async def _send_stored(send, response: StoredResponse, replayed: bool):
+    headers = [(b"content-length", str(len(response.body)).encode())]
+    if response.content_type:
+        headers.append((b"content-type", response.content_type.encode("latin-1")))
+    if replayed:
+        headers.append((b"idempotent-replayed", b"true"))
+    await send({"type": "http.response.start", "status": response.status_code, "headers": headers})
+    await send({"type": "http.response.body", "body": response.body})
@@ -2,10 +2,12 @@
 Конфигурация email сервера для Backend онлайн школы S2S.
 
 Этот модуль содержит настройки для подключения к SMTP серверу
-и отправки email уведомлений через FastAPI Mail.
+и отправки email уведомлений диспетчером почты на aiosmtplib
+(server/mail_dispatcher.py).
 """
 
-from fastapi_mail import ConnectionConfig
+from functools import lru_cache
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -24,6 +26,20 @@ class MailSettings(BaseSettings):
         MAIL_PORT: Порт SMTP сервера
         MAIL_STARTTLS: Использовать STARTTLS (по умолчанию False)
         MAIL_SSL_TLS: Использовать SSL/TLS (по умолчанию True)
+        MAIL_TIMEOUT: Таймаут SMTP операций в секундах
+        MAIL_CONCURRENCY: Число параллельных SMTP соединений диспетчера
+        MAIL_QUEUE_SIZE: Максимальный размер очереди писем
+        MAIL_MAX_RETRIES: Число повторных попыток отправки письма
+        MAIL_RETRY_BACKOFF: Начальная задержка (сек) перед повтором, удваивается
+        MAIL_KEEPALIVE: Через сколько секунд простоя проверять соединение NOOP
+        MAIL_DIGEST_THRESHOLD: Размер очереди, начиная с которого заявки
+            объединяются в одно письмо-дайджест (0 - не объединять)
+        MAIL_DIGEST_MAX: Максимальное число заявок в одном дайджесте
+        MAIL_OUTBOX_BATCH_SIZE: Сколько записей outbox забирать за раз
+        MAIL_OUTBOX_POLL_INTERVAL: Интервал (сек) опроса outbox
+        MAIL_OUTBOX_LEASE: Время (сек), на которое запись закрепляется за воркером
+        MAIL_OUTBOX_MAX_ATTEMPTS: Число попыток, после которого запись помечается failed
+        MAIL_OUTBOX_RETRY_DELAY: Начальная задержка (сек) повтора, удваивается
     """
     MAIL_USERNAME: str
     MAIL_PASSWORD: str
@@ -32,22 +48,34 @@ class MailSettings(BaseSettings):
     MAIL_PORT: int
     MAIL_STARTTLS: bool = False
     MAIL_SSL_TLS: bool = True
+    MAIL_TIMEOUT: float = 30.0
+    MAIL_CONCURRENCY: int = 2
+    MAIL_QUEUE_SIZE: int = 1000
+    MAIL_MAX_RETRIES: int = 3
+    MAIL_RETRY_BACKOFF: float = 1.0
+    MAIL_KEEPALIVE: float = 60.0
+    MAIL_DIGEST_THRESHOLD: int = 20
+    MAIL_DIGEST_MAX: int = 50
+    MAIL_OUTBOX_BATCH_SIZE: int = 50
+    MAIL_OUTBOX_POLL_INTERVAL: float = 1.0
+    MAIL_OUTBOX_LEASE: float = 300.0
+    MAIL_OUTBOX_MAX_ATTEMPTS: int = 10
+    MAIL_OUTBOX_RETRY_DELAY: float = 60.0
 
     # Конфигурация для загрузки настроек из .env файла
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
 
-# Создаем экземпляр настроек email
-mail_settings = MailSettings()
-
-# Создаем конфигурацию подключения для FastAPI Mail
-conf = ConnectionConfig(
-    MAIL_USERNAME=mail_settings.MAIL_USERNAME,
-    MAIL_PASSWORD=mail_settings.MAIL_PASSWORD,
-    MAIL_FROM=mail_settings.MAIL_FROM,
-    MAIL_SERVER=mail_settings.MAIL_SERVER,
-    MAIL_PORT=mail_settings.MAIL_PORT,
-    MAIL_STARTTLS=mail_settings.MAIL_STARTTLS,
-    MAIL_SSL_TLS=mail_settings.MAIL_SSL_TLS,
-    USE_CREDENTIALS=True,  # Использовать аутентификацию
-)
+@lru_cache(maxsize=None)
+def get_mail_settings() -> MailSettings:
+    """
+    Возвращает настройки email, загружая их при первом обращении.
+
+    Настройки читаются лениво, чтобы импорт приложения (тесты,
+    утилиты командной строки) не требовал настроенного SMTP.
+
+    Raises:
+        pydantic.ValidationError: Если обязательные переменные не заданы
+    """
+    return MailSettings()
+
@@ -0,0 +1,287 @@
+"""
+Асинхронный диспетчер email уведомлений для Backend онлайн школы S2S.
+
+Этот модуль содержит очередь отправки писем с ограниченным размером
+и пулом воркеров, каждый из которых держит постоянное SMTP соединение.
+Это избавляет от TLS рукопожатия на каждое письмо и сглаживает
+всплески заявок, которые иначе упираются в лимиты почтового сервера.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from email.message import EmailMessage
+from time import monotonic
+from typing import List, Optional
+
+import aiosmtplib
+
+from server.mail_config import MailSettings, get_mail_settings
+from server.metrics import EMAIL_SEND_SECONDS, EMAIL_SENT_TOTAL, REGISTRY, Gauge
+from server.schemas import InsertContactForm
+
+
+logger = logging.getLogger(__name__)
+
+MAIL_QUEUE_SIZE = Gauge("mail_queue_size", "Число писем в очереди диспетчера")
+
+
+def build_contact_form_message(forms: List[InsertContactForm], sender: str) -> EmailMessage:
+    """
+    Формирует письмо о новых контактных формах.
+
+    Для одной формы письмо совпадает с прежним уведомлением,
+    для нескольких формируется дайджест со всеми заявками.
+
+    Args:
+        forms: Контактные формы для уведомления
+        sender: Адрес отправителя (он же адрес администратора)
+
+    Returns:
+        EmailMessage: Готовое к отправке письмо
+    """
+    entries = [
+        f"Имя: {form.full_name}\nТелефон: {form.phone}\nEmail: {form.email}"
+        for form in forms
+    ]
+    message = EmailMessage()
+    if len(forms) == 1:
+        message["Subject"] = "Новая заявка на курс!"
+    else:
+        message["Subject"] = f"Новые заявки на курс: {len(forms)}"
+    message["From"] = sender
+    message["To"] = sender  # Отправляем на адрес администратора
+    message.set_content("\n\n".join(entries))
+    return message
+
+
+@dataclass
+class MailJob:
+    """
+    Контактная форма в очереди отправки.
+
+    Attributes:
+        form: Данные контактной формы
+        future: Завершается после доставки письма или окончательной ошибки
+    """
+    form: InsertContactForm
+    future: asyncio.Future = field(repr=False)
+
+
+class SMTPConnection:
+    """
+    Постоянное SMTP соединение одного воркера.
+
+    Соединение открывается при первой отправке и переиспользуется.
+    Если оно простаивало дольше keepalive секунд, перед отправкой
+    выполняется NOOP, и при разрыве соединение открывается заново.
+    """
+
+    def __init__(self, settings: MailSettings):
+        self.settings = settings
+        self._smtp: Optional[aiosmtplib.SMTP] = None
+        self._last_used = 0.0
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        smtp = aiosmtplib.SMTP(
+            hostname=self.settings.MAIL_SERVER,
+            port=self.settings.MAIL_PORT,
+            use_tls=self.settings.MAIL_SSL_TLS,
+            start_tls=self.settings.MAIL_STARTTLS,
+            timeout=self.settings.MAIL_TIMEOUT,
+        )
+        await smtp.connect()
+        # Локальные отладочные SMTP серверы обычно не поддерживают AUTH
+        if self.settings.MAIL_USERNAME and smtp.supports_extension("auth"):
+            await smtp.login(self.settings.MAIL_USERNAME, self.settings.MAIL_PASSWORD)
+        return smtp
+
+    async def _ensure_connected(self) -> aiosmtplib.SMTP:
+        smtp = self._smtp
+        if smtp is not None and smtp.is_connected:
+            if monotonic() - self._last_used < self.settings.MAIL_KEEPALIVE:
+                return smtp
+            try:
+                await smtp.noop()
+                return smtp
+            except aiosmtplib.SMTPException:
+                await self.close()
+        self._smtp = await self._connect()
+        return self._smtp
+
+    async def send(self, message: EmailMessage):
+        """
+        Отправляет письмо через постоянное соединение.
+
+        При ошибке соединение закрывается, чтобы следующая
+        попытка открыла новое.
+        """
+        smtp = await self._ensure_connected()
+        try:
+            await smtp.send_message(message)
+        except Exception:
+            await self.close()
+            raise
+        self._last_used = monotonic()
+
+    async def close(self):
+        """
+        Закрывает соединение, если оно открыто.
+        """
+        smtp, self._smtp = self._smtp, None
+        if smtp is None or not smtp.is_connected:
+            return
+        try:
+            await smtp.quit()
+        except Exception:
+            smtp.close()
+
+
+class MailDispatcher:
+    """
+    Диспетчер отправки email уведомлений о контактных формах.
+
+    Письма складываются в ограниченную очередь и отправляются
+    concurrency воркерами. Неудачная отправка повторяется с
+    экспоненциальной задержкой. Если очередь выросла до
+    digest_threshold, воркер забирает сразу несколько заявок
+    и отправляет их одним письмом-дайджестом.
+
+    Если настройки не переданы, они загружаются при первом обращении
+    (обычно при старте в lifespan).
+    """
+
+    def __init__(self, settings: Optional[MailSettings] = None):
+        self._settings = settings
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+
+    @property
+    def settings(self) -> MailSettings:
+        """Настройки email."""
+        if self._settings is None:
+            self._settings = get_mail_settings()
+        return self._settings
+
+    @property
+    def running(self) -> bool:
+        """Запущены ли воркеры диспетчера."""
+        return bool(self._workers)
+
+    @property
+    def queue_size(self) -> int:
+        """Число писем, ожидающих отправки."""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def start(self):
+        """
+        Создает очередь и запускает воркеры отправки.
+        """
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.settings.MAIL_QUEUE_SIZE)
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"mail-dispatcher-{i}")
+            for i in range(max(self.settings.MAIL_CONCURRENCY, 1))
+        ]
+
+    async def stop(self, timeout: float = 10.0):
+        """
+        Дожидается отправки оставшихся писем и останавливает воркеры.
+
+        Args:
+            timeout: Сколько секунд ждать опустошения очереди
+        """
+        if not self.running:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Не отправлено писем при остановке: %d", self._queue.qsize())
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def submit(self, form: InsertContactForm) -> asyncio.Future:
+        """
+        Ставит уведомление о контактной форме в очередь.
+
+        Если очередь заполнена, ожидает освобождения места.
+
+        Args:
+            form: Данные контактной формы
+
+        Returns:
+            asyncio.Future: Завершается после доставки письма
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(MailJob(form=form, future=future))
+        return future
+
+    def _take_batch(self, first: MailJob) -> List[MailJob]:
+        """
+        Забирает из очереди заявки для дайджеста, если очередь достаточно велика.
+        """
+        batch = [first]
+        threshold = self.settings.MAIL_DIGEST_THRESHOLD
+        if threshold <= 0 or self._queue.qsize() + 1 < threshold:
+            return batch
+        while len(batch) < self.settings.MAIL_DIGEST_MAX:
+            try:
+                batch.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return batch
+
+    async def _send_with_retry(self, connection: SMTPConnection, message: EmailMessage):
+        """
+        Отправляет письмо, повторяя попытки с экспоненциальной задержкой.
+        """
+        attempt = 0
+        while True:
+            try:
+                with EMAIL_SEND_SECONDS.time("smtp"):
+                    await connection.send(message)
+                EMAIL_SENT_TOTAL.labels("smtp", "ok").inc()
+                return
+            except Exception as e:
+                EMAIL_SENT_TOTAL.labels("smtp", "error").inc()
+                if attempt >= self.settings.MAIL_MAX_RETRIES:
+                    raise
+                delay = self.settings.MAIL_RETRY_BACKOFF * (2 ** attempt)
+                attempt += 1
+                logger.warning("Ошибка отправки почты (попытка %d): %s; повтор через %.1f с", attempt, e, delay)
+                await asyncio.sleep(delay)
+
+    async def _worker(self):
+        """
+        Цикл воркера: забирает заявки из очереди и отправляет письма.
+        """
+        connection = SMTPConnection(self.settings)
+        try:
+            while True:
+                batch = self._take_batch(await self._queue.get())
+                message = build_contact_form_message([job.form for job in batch], self.settings.MAIL_FROM)
+                try:
+                    await self._send_with_retry(connection, message)
+                except Exception as e:
+                    logger.error("Письмо не отправлено (%d заявок): %s", len(batch), e)
+                    for job in batch:
+                        if not job.future.done():
+                            job.future.set_exception(e)
+                else:
+                    for job in batch:
+                        if not job.future.done():
+                            job.future.set_result(None)
+                finally:
+                    for _ in batch:
+                        self._queue.task_done()
+        finally:
+            await connection.close()
+
+
+# Единственный экземпляр диспетчера для всего приложения
+mail_dispatcher = MailDispatcher()
+
+REGISTRY.add_collector(lambda: MAIL_QUEUE_SIZE.set(mail_dispatcher.queue_size))
@@ -2,28 +2,109 @@
 FastAPI приложение для Backend онлайн школы S2S.
 
 Этот модуль содержит основное FastAPI приложение с настройкой CORS
-и подключением всех API маршрутов.
+и метрик, подключением всех API маршрутов и запуском фоновых задач.
 """
 
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from time import perf_counter
+
 from fastapi import FastAPI
 
-from server.database import Base, engine
+from server.catalog_watcher import catalog_watcher
+from server.database import db_settings, init_db
+from server.idempotency import IdempotencyMiddleware
+from server.mail_dispatcher import mail_dispatcher
+from server.metrics import MetricsMiddleware
+from server.profiling import ProfilingMiddleware, loop_lag_monitor
+from server.rate_limit import RateLimitMiddleware
+from server.outbox import outbox_drainer
+from server.readiness import readiness
 from server.routes import router
+from server.storage import get_storage
+from server.write_behind import contact_form_buffer
 from fastapi.middleware.cors import CORSMiddleware
 
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Инициализирует ресурсы приложения при старте и освобождает их при выключении.
+    
+    Каталог, схема базы данных и настройки почты создаются здесь,
+    а не при импорте модулей, поэтому импорт приложения быстрый и не
+    требует базы данных и SMTP. Проверка готовности проходит только
+    после того, как все компоненты инициализированы.
+    
+    При остановке буфер контактных форм сбрасывается в базу данных,
+    а диспетчер почты дожидается отправки писем из очереди, чтобы
+    принятые формы не потерялись. Неотправленные уведомления
+    остаются в outbox до следующего запуска.
+    """
+    started = perf_counter()
+    # Загрузка каталога и кодирование ответов не блокируют event loop
+    storage = await asyncio.to_thread(get_storage)
+    await asyncio.to_thread(storage.catalog.warm)
+    readiness.mark("catalog")
+
+    await init_db()
+    readiness.mark("database")
+
+    await mail_dispatcher.start()
+    await outbox_drainer.start()
+    readiness.mark("mail")
+
+    if db_settings.CONTACT_FORM_WRITE_BEHIND:
+        await contact_form_buffer.start()
+    await catalog_watcher.start()
+    await loop_lag_monitor.start()
+    logger.info("Приложение готово за %.3f с", perf_counter() - started)
+    try:
+        yield
+    finally:
+        readiness.reset()
+        # Каждый компонент останавливается, даже если предыдущий упал,
+        # иначе журнал хранилища не получит последний fsync
+        error = None
+        for stop in (
+            loop_lag_monitor.stop,
+            catalog_watcher.stop,
+            contact_form_buffer.stop,
+            outbox_drainer.stop,
+            mail_dispatcher.stop,
+            storage.close,
+        ):
+            try:
+                await stop()
+            except Exception as exc:
+                logger.exception("Ошибка остановки %s", stop.__qualname__)
+                if error is None:
+                    error = exc
+        if error is not None:
+            raise error
+
+
 # Создание экземпляра FastAPI приложения
 app = FastAPI(
     title="Backend онлайн школы S2S",
     description="API для управления курсами, преподавателями и пользователями",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
-# Создаёт все модели
-Base.metadata.create_all(bind=engine)
-
 # Подключение API маршрутов
 app.include_router(router)
 
+# Повтор POST запроса с тем же Idempotency-Key получает сохраненный ответ
+app.add_middleware(IdempotencyMiddleware)
+
+# Лимиты и сброс нагрузки проверяются до чтения тела формы и до идемпотентности
+app.add_middleware(RateLimitMiddleware)
+
 # Настройка CORS для разрешения запросов с клиентского приложения
 origins = [
     "http://localhost:5000",  # Основной порт приложения
@@ -37,3 +118,9 @@ app.add_middleware(
     allow_headers=["*"],  # Разрешаем все заголовки
 )
 
+# Подсчет запросов для профилирования по числу запросов
+app.add_middleware(ProfilingMiddleware)
+
+# Метрики запросов (добавляется последним, чтобы замерять и работу CORS)
+app.add_middleware(MetricsMiddleware)
+
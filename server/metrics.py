@@ -0,0 +1,356 @@
+"""
+Метрики Prometheus для Backend онлайн школы S2S.
+
+Этот модуль содержит легковесные счетчики, gauge и гистограммы,
+их вывод в текстовом формате Prometheus и ASGI middleware, которое
+замеряет время обработки запросов по шаблону маршрута, число ответов
+по статус-кодам и число запросов в обработке.
+
+Запись значения стоит одного захвата блокировки и нескольких
+арифметических операций, поэтому сбор метрик можно держать
+включенным в продакшене. Метрики собираются отдельно в каждом
+воркере uvicorn.
+"""
+
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from threading import Lock
+from time import perf_counter
+from typing import Callable, Dict, List, Sequence, Tuple
+
+
+# Границы гистограмм времени (сек): от 1 мс до 10 с
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Content-Type текстового формата Prometheus
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Метка маршрута для запросов, не совпавших ни с одним маршрутом
+UNMATCHED_ROUTE = "unmatched"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class _Timer:
+    """
+    Контекстный менеджер, записывающий длительность блока в гистограмму.
+    """
+
+    __slots__ = ("_child", "_started")
+
+    def __init__(self, child: "_HistogramChild"):
+        self._child = child
+
+    def __enter__(self):
+        self._started = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._child.observe(perf_counter() - self._started)
+        return False
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def dec(self, amount: float = 1.0):
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "_lock")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        # Последняя ячейка - значения больше всех границ (+Inf)
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self._lock = Lock()
+
+    def observe(self, value: float):
+        index = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def time(self) -> _Timer:
+        return _Timer(self)
+
+
+class _Metric(ABC):
+    """
+    Семейство метрик с одинаковым именем и набором меток.
+
+    Значения для каждого сочетания меток создаются при первом обращении
+    через labels(). У метрики без меток методы значения можно вызывать
+    напрямую.
+    """
+
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 registry: "Registry" = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = Lock()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    @abstractmethod
+    def _new_child(self):
+        """Создает значение метрики для нового сочетания меток."""
+
+    def labels(self, *values):
+        """
+        Возвращает значение метрики для сочетания меток.
+
+        Raises:
+            ValueError: Если число значений не совпадает с числом меток
+        """
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name}: ожидались метки {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(tuple(str(v) for v in values), self._new_child())
+            # Ключ с исходными значениями ускоряет следующие обращения (например, int статус)
+            self._children.setdefault(values, child)
+        return child
+
+    def _samples(self) -> List[Tuple[Tuple[str, ...], object]]:
+        with self._lock:
+            items = list(self._children.items())
+        seen = set()
+        result = []
+        for key, child in items:
+            if id(child) in seen:
+                continue
+            seen.add(id(child))
+            result.append((tuple(str(v) for v in key), child))
+        return sorted(result, key=lambda item: item[0])
+
+    def render(self, lines: List[str]):
+        lines.append(f"# HELP {self.name} {_escape(self.documentation)}")
+        lines.append(f"# TYPE {self.name} {self.type}")
+        for values, child in self._samples():
+            self._render_child(lines, values, child)
+
+    def _render_child(self, lines: List[str], values: Tuple[str, ...], child):
+        lines.append(f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}")
+
+
+class Counter(_Metric):
+    """
+    Монотонно растущий счетчик (имя принято заканчивать на _total).
+    """
+
+    type = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+
+class Gauge(_Metric):
+    """
+    Значение, которое может расти и уменьшаться.
+    """
+
+    type = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self.labels().dec(amount)
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+
+class Histogram(_Metric):
+    """
+    Гистограмма с фиксированными границами корзин.
+    """
+
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, registry: "Registry" = None):
+        self.bounds = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.bounds)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def time(self, *values) -> _Timer:
+        """
+        Замеряет длительность блока with для сочетания меток.
+
+        Example:
+            with DB_COMMIT_SECONDS.time("contact_form"):
+                await db.commit()
+        """
+        return _Timer(self.labels(*values))
+
+    def _render_child(self, lines: List[str], values: Tuple[str, ...], child: _HistogramChild):
+        with child._lock:
+            counts = list(child.counts)
+            total = child.sum
+        names = self.labelnames + ("le",)
+        cumulative = 0
+        for bound, count in zip(self.bounds + (float("inf"),), counts):
+            cumulative += count
+            labels = _format_labels(names, values + (_format_value(bound),))
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, values)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+
+
+class Registry:
+    """
+    Набор метрик, выводимых на /metrics.
+
+    Сборщики (collectors) вызываются перед выводом и обновляют
+    значения, которые дешевле прочитать в момент сбора, чем
+    поддерживать при каждом изменении (например, размер очереди).
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: _Metric):
+        """
+        Raises:
+            ValueError: Если метрика с таким именем уже есть
+        """
+        if metric.name in self._metrics:
+            raise ValueError(f"Метрика {metric.name} уже зарегистрирована")
+        self._metrics[metric.name] = metric
+
+    def add_collector(self, collector: Callable[[], None]):
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """
+        Возвращает все метрики в текстовом формате Prometheus.
+        """
+        for collector in self._collectors:
+            collector()
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            metric.render(lines)
+        return "\n".join(lines) + "\n"
+
+
+# Реестр метрик приложения
+REGISTRY = Registry()
+
+# HTTP запросы
+HTTP_REQUESTS_TOTAL = Counter(
+    "http_requests_total", "Число HTTP запросов", ("method", "route", "status"),
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Время обработки HTTP запроса", ("method", "route"),
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "Число HTTP запросов в обработке",
+)
+
+# Хранилище, база данных и почта
+STORAGE_SECONDS = Histogram(
+    "storage_operation_duration_seconds", "Время операции хранилища", ("operation",),
+)
+DB_COMMIT_SECONDS = Histogram(
+    "db_commit_duration_seconds", "Время фиксации транзакции", ("operation",),
+)
+EMAIL_SEND_SECONDS = Histogram(
+    "email_send_duration_seconds", "Время отправки письма", ("transport",),
+)
+EMAIL_SENT_TOTAL = Counter(
+    "email_sent_total", "Число попыток отправки писем", ("transport", "result"),
+)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware, собирающее метрики HTTP запросов.
+
+    Запросы группируются по шаблону маршрута (/api/users/{user_id}),
+    а не по фактическому пути, чтобы число рядов не зависело от
+    идентификаторов в URL. Запросы, не совпавшие ни с одним маршрутом,
+    попадают в ряд unmatched.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_flight = HTTP_REQUESTS_IN_FLIGHT.labels()
+        in_flight.inc()
+        started = perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = perf_counter() - started
+            in_flight.dec()
+            # Router записывает совпавший маршрут в scope
+            route = scope.get("route")
+            template = getattr(route, "path", None) or UNMATCHED_ROUTE
+            method = scope["method"]
+            HTTP_REQUEST_SECONDS.labels(method, template).observe(elapsed)
+            HTTP_REQUESTS_TOTAL.labels(method, template, status_code).inc()
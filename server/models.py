@@ -2,10 +2,16 @@
 SQLAlchemy модели базы данных для Backend онлайн школы S2S.
 
 Этот модуль содержит SQLAlchemy модели для работы с базой данных.
-В текущей версии используется только модель ContactFormDB для контактных форм.
+Содержит модель ContactFormDB для контактных форм, модель EmailOutboxDB
+для очереди email уведомлений, модели UserDB и ApplicationDB,
+которые используются хранилищем SqlStorage, модель IdempotencyKeyDB
+для ключей идемпотентности и модель RateLimitBucketDB для общего
+между воркерами ограничения частоты запросов.
 """
 
-from sqlalchemy import Column, String, Boolean
+from datetime import datetime, timezone
+
+from sqlalchemy import Column, String, Boolean, Integer, Float, Index, JSON, ForeignKey, LargeBinary
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 from sqlalchemy.types import DateTime
@@ -13,6 +19,11 @@ import uuid
 from server.database import Base
 
 
+def utcnow() -> datetime:
+    """Текущее время в UTC для значений по умолчанию на стороне Python."""
+    return datetime.now(timezone.utc)
+
+
 class ContactFormDB(Base):
     """
     Модель базы данных для контактных форм.
@@ -29,6 +40,10 @@ class ContactFormDB(Base):
         created_at: Дата и время создания записи (автоматически)
     """
     __tablename__ = "contact_forms"
+    __table_args__ = (
+        # Индекс для keyset пагинации по (created_at, id)
+        Index("ix_contact_forms_created_at_id", "created_at", "id"),
+    )
 
     # Уникальный идентификатор записи
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
@@ -41,5 +56,138 @@ class ContactFormDB(Base):
     # Согласие с условиями
     agreed_to_terms = Column(Boolean, nullable=False)
     
-    # Временная метка создания записи
+    # Временная метка создания записи; значение задается на стороне Python,
+    # чтобы оно совпадало по формату с ключом курсора пагинации
+    created_at = Column(DateTime(timezone=True), default=utcnow, server_default=func.now())
+
+
+class EmailOutboxDB(Base):
+    """
+    Модель базы данных для очереди email уведомлений (outbox).
+    
+    Запись создается в той же транзакции, что и контактная форма,
+    поэтому уведомление не теряется при перезапуске воркера или
+    ошибке SMTP. Фоновый цикл забирает записи пачками и отправляет письма.
+    
+    Attributes:
+        id: Уникальный идентификатор записи (UUID)
+        contact_form_id: ID контактной формы, о которой уведомление
+        payload: Данные формы для письма (full_name, phone, email)
+        status: pending - ждет отправки, processing - забрана воркером,
+            sent - отправлена, failed - исчерпаны попытки
+        attempts: Число попыток отправки
+        available_at: Когда запись можно забрать (время повтора или
+            окончание аренды для processing)
+        last_error: Текст последней ошибки отправки
+        created_at: Дата и время создания записи
+        sent_at: Дата и время успешной отправки
+    """
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        # Индекс для выборки готовых к отправке записей
+        Index("ix_email_outbox_status_available_at", "status", "available_at"),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    contact_form_id = Column(UUID(as_uuid=True), nullable=True)
+    payload = Column(JSON, nullable=False)
+    status = Column(String, nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    available_at = Column(DateTime(timezone=True), nullable=False, default=utcnow)
+    last_error = Column(String, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class UserDB(Base):
+    """
+    Модель базы данных для пользователей (SqlStorage).
+    
+    Attributes:
+        id: Уникальный идентификатор пользователя (UUID)
+        username: Имя пользователя (уникальный индекс)
+        full_name: Полное имя пользователя
+        created_at: Дата и время создания записи
+    """
+    __tablename__ = "users"
+    __table_args__ = (
+        # Индекс для keyset пагинации по (created_at, id)
+        Index("ix_users_created_at_id", "created_at", "id"),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    username = Column(String, nullable=False, unique=True, index=True)
+    full_name = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, default=utcnow)
+
+
+class ApplicationDB(Base):
+    """
+    Модель базы данных для заявок на курсы (SqlStorage).
+    
+    Курсы хранятся в JSON файлах, поэтому course_id не является
+    внешним ключом; существование курса проверяется в API.
+    
+    Attributes:
+        id: Уникальный идентификатор заявки (UUID)
+        user_id: ID пользователя, подавшего заявку
+        course_id: ID курса, на который подана заявка
+        created_at: Дата и время создания заявки
+    """
+    __tablename__ = "applications"
+    __table_args__ = (
+        # Индекс для keyset пагинации по (created_at, id)
+        Index("ix_applications_created_at_id", "created_at", "id"),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
+    course_id = Column(UUID(as_uuid=True), nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, default=utcnow)
+
+
+class IdempotencyKeyDB(Base):
+    """
+    Модель базы данных для ключей идемпотентности.
+    
+    Используется при IDEMPOTENCY_BACKEND=sql, чтобы повтор запроса
+    с тем же Idempotency-Key распознавался любым воркером.
+    
+    Attributes:
+        key: Маршрут и ключ идемпотентности (или хэш тела запроса)
+        fingerprint: Хэш тела запроса, с которым ключ использован впервые
+        status_code: Статус сохраненного ответа (None - запрос еще выполняется)
+        content_type: Content-Type сохраненного ответа
+        body: Тело сохраненного ответа
+        expires_at: Когда ключ можно использовать заново
+        created_at: Дата и время создания записи
+    """
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String, primary_key=True)
+    fingerprint = Column(String, nullable=False)
+    status_code = Column(Integer, nullable=True)
+    content_type = Column(String, nullable=True)
+    body = Column(LargeBinary, nullable=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, default=utcnow)
+
+
+class RateLimitBucketDB(Base):
+    """
+    Модель базы данных для token bucket ограничения частоты запросов.
+    
+    Используется при RATE_LIMIT_BACKEND=sql, чтобы лимит был общим
+    для всех воркеров. Время хранится в секундах Unix, чтобы
+    пополнение корзины считалось одинаково в любой СУБД.
+    
+    Attributes:
+        key: Тип и значение ключа (ip:..., email:...)
+        tokens: Число токенов в корзине на момент updated_at
+        updated_at: Время последнего обращения (секунды Unix)
+    """
+    __tablename__ = "rate_limit_buckets"
+
+    key = Column(String, primary_key=True)
+    tokens = Column(Float, nullable=False)
+    updated_at = Column(Float, nullable=False, index=True)
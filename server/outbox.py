@@ -0,0 +1,155 @@
+"""
+Разбор очереди email уведомлений (outbox) для Backend онлайн школы S2S.
+
+Этот модуль содержит фоновый цикл, который забирает записи outbox
+пачками, отправляет письма через диспетчер почты и отмечает
+результат в базе данных. Записи переживают перезапуск воркера,
+а блокировки SKIP LOCKED позволяют нескольким воркерам разбирать
+outbox параллельно без повторной отправки.
+"""
+
+import asyncio
+import logging
+from datetime import timedelta
+from typing import Optional
+
+from server.crud import claim_outbox_batch, mark_outbox_failed, mark_outbox_sent
+from server.database import async_session
+from server.mail_config import MailSettings, get_mail_settings
+from server.mail_dispatcher import MailDispatcher, mail_dispatcher
+from server.models import utcnow
+from server.schemas import InsertContactForm
+
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxDrainer:
+    """
+    Фоновый цикл отправки уведомлений из outbox.
+
+    Цикл просыпается раз в MAIL_OUTBOX_POLL_INTERVAL секунд или сразу
+    после notify() и разбирает outbox, пока в нем есть готовые записи.
+    """
+
+    def __init__(self, settings: Optional[MailSettings], dispatcher: MailDispatcher):
+        self._settings = settings
+        self.dispatcher = dispatcher
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def settings(self) -> MailSettings:
+        """Настройки email (загружаются при первом обращении, если не переданы)."""
+        if self._settings is None:
+            self._settings = get_mail_settings()
+        return self._settings
+
+    @property
+    def running(self) -> bool:
+        """Запущен ли фоновый цикл."""
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        """
+        Запускает фоновый цикл разбора outbox.
+        """
+        if self.running:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="email-outbox-drainer")
+
+    async def stop(self):
+        """
+        Останавливает фоновый цикл.
+
+        Недоставленные записи остаются в outbox и будут отправлены
+        после перезапуска (или другим воркером после окончания аренды).
+        """
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def notify(self):
+        """
+        Будит цикл, чтобы новая запись outbox ушла без ожидания опроса.
+        """
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def drain_once(self) -> int:
+        """
+        Забирает и обрабатывает одну пачку записей outbox.
+
+        Returns:
+            int: Число обработанных записей
+        """
+        async with async_session() as db:
+            rows = await claim_outbox_batch(
+                db,
+                self.settings.MAIL_OUTBOX_BATCH_SIZE,
+                self.settings.MAIL_OUTBOX_LEASE,
+                self.settings.MAIL_OUTBOX_MAX_ATTEMPTS,
+            )
+        if not rows:
+            return 0
+
+        # Все письма пачки ставятся в очередь сразу, чтобы диспетчер мог собрать дайджест.
+        # Ошибка одной записи не прерывает пачку: иначе записи, уже поставленные
+        # в очередь, остались бы в processing и ушли бы повторно после аренды
+        queued, futures, rejected, failed = [], [], [], []
+        for row in rows:
+            try:
+                form = InsertContactForm.model_validate(row.payload)
+            except ValueError as exc:
+                logger.error("Некорректная запись outbox %s: %s", row.id, exc)
+                rejected.append((row, exc))
+                continue
+            try:
+                futures.append(await self.dispatcher.submit(form))
+            except Exception as exc:
+                logger.exception("Ошибка постановки письма outbox %s в очередь", row.id)
+                failed.append((row, exc))
+                continue
+            queued.append(row)
+        results = await asyncio.gather(*futures, return_exceptions=True)
+        failed.extend((row, result) for row, result in zip(queued, results) if isinstance(result, BaseException))
+
+        sent = [row.id for row, result in zip(queued, results) if not isinstance(result, BaseException)]
+        async with async_session() as db:
+            await mark_outbox_sent(db, sent)
+            # Некорректные данные не исправятся повтором
+            for row, error in rejected:
+                await mark_outbox_failed(db, row.id, str(error), None)
+            for row, error in failed:
+                retry_at = None
+                if row.attempts < self.settings.MAIL_OUTBOX_MAX_ATTEMPTS:
+                    delay = self.settings.MAIL_OUTBOX_RETRY_DELAY * (2 ** (row.attempts - 1))
+                    retry_at = utcnow() + timedelta(seconds=delay)
+                await mark_outbox_failed(db, row.id, str(error), retry_at)
+        return len(rows)
+
+    async def _run(self):
+        """
+        Цикл фоновой задачи: ждет сигнала или таймаута и разбирает outbox.
+        """
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.settings.MAIL_OUTBOX_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                while await self.drain_once():
+                    pass
+            except Exception:
+                logger.exception("Ошибка разбора outbox")
+
+
+# Единственный экземпляр цикла разбора outbox
+outbox_drainer = OutboxDrainer(None, mail_dispatcher)
@@ -0,0 +1,115 @@
+"""
+Keyset пагинация для Backend онлайн школы S2S.
+
+Этот модуль содержит кодирование курсоров и индекс для постраничного
+обхода записей в памяти. Записи упорядочены по (created_at, id), а курсор
+хранит ключ последней выданной записи, поэтому стоимость получения
+страницы не зависит от ее номера.
+"""
+
+import base64
+from bisect import bisect_right, insort
+from datetime import datetime
+from typing import Callable, List, Optional, Sequence, Tuple, TypeVar
+from uuid import UUID
+
+
+# Ключ сортировки записи: время создания и id для однозначного порядка
+Keyset = Tuple[datetime, UUID]
+
+T = TypeVar("T")
+
+
+def encode_cursor(key: Keyset) -> str:
+    """
+    Кодирует ключ записи в непрозрачный курсор.
+
+    Args:
+        key: Время создания и id последней записи страницы
+
+    Returns:
+        str: Курсор в формате base64url
+    """
+    created_at, record_id = key
+    raw = f"{created_at.isoformat()}|{record_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Keyset:
+    """
+    Декодирует курсор обратно в ключ записи.
+
+    Args:
+        cursor: Курсор, полученный из encode_cursor
+
+    Returns:
+        Keyset: Время создания и id записи
+
+    Raises:
+        ValueError: Если курсор поврежден
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, record_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), UUID(record_id)
+    except Exception as e:
+        raise ValueError("Некорректный курсор") from e
+
+
+def make_page(items: Sequence[T], limit: int, key: Callable[[T], Keyset]) -> Tuple[List[T], Optional[str]]:
+    """
+    Формирует страницу из выборки размером limit + 1.
+
+    Лишняя запись показывает, что есть следующая страница, и в ответ
+    не попадает.
+
+    Args:
+        items: Записи после курсора, не больше limit + 1
+        limit: Размер страницы
+        key: Функция получения ключа записи
+
+    Returns:
+        Tuple[List[T], Optional[str]]: Записи страницы и курсор следующей страницы
+    """
+    page = list(items[:limit])
+    next_cursor = encode_cursor(key(page[-1])) if len(items) > limit and page else None
+    return page, next_cursor
+
+
+class KeysetIndex:
+    """
+    Отсортированный индекс ключей записей в памяти.
+
+    Записи обычно создаются в порядке времени, поэтому вставка почти
+    всегда происходит в конец списка. Поиск позиции курсора выполняется
+    бинарным поиском за O(log n).
+    """
+
+    def __init__(self):
+        self._keys: List[Keyset] = []
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, key: Keyset):
+        """
+        Добавляет ключ записи в индекс.
+        """
+        if not self._keys or key > self._keys[-1]:
+            self._keys.append(key)
+        else:
+            insort(self._keys, key)
+
+    def after(self, cursor: Optional[Keyset], limit: int) -> List[Keyset]:
+        """
+        Возвращает до limit ключей, следующих за курсором.
+
+        Args:
+            cursor: Ключ последней записи предыдущей страницы или None
+            limit: Максимальное число ключей
+
+        Returns:
+            List[Keyset]: Ключи записей по возрастанию
+        """
+        start = bisect_right(self._keys, cursor) if cursor is not None else 0
+        return self._keys[start:start + limit]
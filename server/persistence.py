@@ -0,0 +1,255 @@
+"""
+Журнал и снимки состояния MemStorage для Backend онлайн школы S2S.
+
+Этот модуль содержит класс StorageJournal, который дописывает каждое
+создание пользователя, заявки или контактной формы в журнал (JSON Lines),
+периодически сохраняет компактный снимок всего состояния и при старте
+восстанавливает данные из снимка и хвоста журнала.
+
+Запись строки в журнал дешевая и выполняется в event loop, а fsync
+и запись снимка - блокирующие операции, которые владелец журнала
+выполняет в отдельном потоке (asyncio.to_thread).
+"""
+
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+# Допустимые политики fsync
+FSYNC_POLICIES = ("always", "interval", "never")
+
+SNAPSHOT_NAME = "snapshot.jsonl"
+LOG_NAME = "journal.jsonl"
+# Журнал, отложенный на время записи снимка (удаляется, когда снимок на диске)
+ROTATED_LOG_NAME = "journal.rotated.jsonl"
+
+
+class StorageJournal:
+    """
+    Журнал операций и снимки состояния для хранилища в памяти.
+
+    Политика fsync определяет баланс между надежностью и задержкой записи:
+    always - fsync после каждой записи (ничего не теряется при сбое питания),
+    interval - fsync не реже раза в fsync_interval секунд,
+    never - сброс на диск остается на усмотрение ОС.
+    append только записывает строку; fsync по политике вызывает
+    владелец журнала через sync.
+
+    Снимок делается в два шага: rotate откладывает текущий журнал
+    (его записи войдут в снимок), а snapshot записывает снимок
+    и удаляет отложенный журнал. Между шагами новые записи идут
+    в новый журнал, поэтому snapshot можно выполнять в отдельном потоке.
+
+    Записи идентифицируются по id, поэтому повторное применение одной
+    записи при восстановлении безопасно.
+
+    Attributes:
+        directory: Каталог с файлами снимка и журнала
+        fsync: Политика fsync
+        fsync_interval: Интервал fsync для политики interval (сек)
+        snapshot_every: Число записей в журнале, после которого нужен снимок
+        appended: Число записей в журнале с момента последнего снимка
+    """
+
+    def __init__(self, directory: Path, fsync: str = "interval", fsync_interval: float = 1.0,
+                 snapshot_every: int = 10000):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Неизвестная политика fsync: {fsync}")
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.snapshot_every = snapshot_every
+        self.appended = 0
+        self._log = None
+        self._unsynced = False
+        # Защищает файл журнала от закрытия во время fsync в другом потоке
+        self._lock = threading.Lock()
+
+    @property
+    def snapshot_path(self) -> Path:
+        return self.directory / SNAPSHOT_NAME
+
+    @property
+    def log_path(self) -> Path:
+        return self.directory / LOG_NAME
+
+    @property
+    def rotated_log_path(self) -> Path:
+        return self.directory / ROTATED_LOG_NAME
+
+    @property
+    def unsynced(self) -> bool:
+        """Есть ли записи, еще не сброшенные на диск fsync."""
+        return self._unsynced
+
+    @staticmethod
+    def _read_records(path: Path) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Читает записи из файла JSON Lines.
+
+        Недописанная последняя строка (сбой во время записи) пропускается.
+        """
+        if not path.exists():
+            return
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning("Пропущена поврежденная запись в %s", path)
+                    continue
+                yield record["k"], record["d"]
+
+    def replay(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Возвращает записи снимка и хвоста журнала в порядке применения.
+
+        После завершения итерации в лог пишется время восстановления.
+
+        Yields:
+            Tuple[str, Dict[str, Any]]: Тип записи и ее данные
+        """
+        started = perf_counter()
+        count = 0
+        for kind, data in self._read_records(self.snapshot_path):
+            count += 1
+            yield kind, data
+        # Отложенный журнал остается, если запись снимка прервалась
+        for path in (self.rotated_log_path, self.log_path):
+            for kind, data in self._read_records(path):
+                count += 1
+                self.appended += 1
+                yield kind, data
+        logger.info(
+            "Состояние хранилища восстановлено из %s: %d записей за %.3f с",
+            self.directory, count, perf_counter() - started,
+        )
+
+    def _open_log(self):
+        if self._log is None:
+            self._log = open(self.log_path, "a", encoding="utf-8")
+        return self._log
+
+    def append(self, kind: str, data: Dict[str, Any]):
+        """
+        Дописывает запись в журнал (без fsync).
+
+        Args:
+            kind: Тип записи (user, application, contact_form)
+            data: JSON-совместимые данные записи
+        """
+        self.append_many(kind, [data])
+
+    def append_many(self, kind: str, items: List[Dict[str, Any]]):
+        """
+        Дописывает пачку записей одного типа одной записью в файл (без fsync).
+
+        Args:
+            kind: Тип записей (user, application, contact_form)
+            items: JSON-совместимые данные записей
+        """
+        log = self._open_log()
+        log.write("".join(
+            json.dumps({"k": kind, "d": data}, ensure_ascii=False, separators=(",", ":")) + "\n" for data in items
+        ))
+        log.flush()
+        self.appended += len(items)
+        self._unsynced = True
+
+    def sync(self):
+        """
+        Сбрасывает записанные строки журнала на диск (fsync).
+
+        Блокирующий вызов: из event loop его нужно выполнять через
+        asyncio.to_thread. Возвращается только после fsync, который
+        начался позже всех уже записанных строк.
+        """
+        with self._lock:
+            if self._log is None or not self._unsynced:
+                return
+            self._unsynced = False
+            os.fsync(self._log.fileno())
+
+    @property
+    def needs_snapshot(self) -> bool:
+        """Накопилось ли в журнале достаточно записей для нового снимка."""
+        return self.appended >= self.snapshot_every
+
+    def rotate(self):
+        """
+        Откладывает текущий журнал перед записью снимка.
+
+        Вызывается в момент, когда снято состояние для снимка: все
+        записи отложенного журнала войдут в снимок, а новые записи
+        пойдут в новый журнал. Если отложенный журнал остался от
+        прерванного снимка, текущий журнал дописывается к нему.
+        Несброшенные записи сбрасываются на диск до закрытия журнала.
+        """
+        with self._lock:
+            if self._log is not None:
+                # Несброшенный хвост уходит в отложенный журнал уже на диске
+                if self._unsynced:
+                    os.fsync(self._log.fileno())
+                self._log.close()
+                self._log = None
+            self._unsynced = False
+        if self.log_path.exists():
+            if self.rotated_log_path.exists():
+                with open(self.rotated_log_path, "ab") as rotated, open(self.log_path, "rb") as log:
+                    rotated.write(log.read())
+                    rotated.flush()
+                    os.fsync(rotated.fileno())
+                os.remove(self.log_path)
+            else:
+                os.replace(self.log_path, self.rotated_log_path)
+        self.appended = 0
+
+    def snapshot(self, records: Iterable[Tuple[str, Dict[str, Any]]]):
+        """
+        Записывает компактный снимок состояния и удаляет отложенный журнал.
+
+        Снимок сначала пишется во временный файл и атомарно подменяет
+        старый, поэтому при сбое остается либо старый, либо новый снимок.
+        Блокирующий вызов: из event loop его нужно выполнять через
+        asyncio.to_thread.
+
+        Args:
+            records: Записи хранилища на момент вызова rotate
+        """
+        started = perf_counter()
+        tmp_path = self.snapshot_path.with_suffix(".tmp")
+        count = 0
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for kind, data in records:
+                f.write(json.dumps({"k": kind, "d": data}, ensure_ascii=False, separators=(",", ":")) + "\n")
+                count += 1
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+
+        # Отложенный журнал удаляется только после того, как новый снимок на диске
+        if self.rotated_log_path.exists():
+            os.remove(self.rotated_log_path)
+        logger.info("Снимок хранилища записан: %d записей за %.3f с", count, perf_counter() - started)
+
+    def close(self):
+        """
+        Сбрасывает журнал на диск и закрывает файл.
+        """
+        with self._lock:
+            if self._log is None:
+                return
+            self._log.flush()
+            if self.fsync != "never":
+                os.fsync(self._log.fileno())
+            self._log.close()
+            self._log = None
+            self._unsynced = False
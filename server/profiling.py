@@ -0,0 +1,266 @@
+"""
+Профилирование работающего воркера для Backend онлайн школы S2S.
+
+Этот модуль содержит:
+- StackSampler - семплирующий профилировщик, который по команде
+  администратора снимает стеки потоков на заданное время или до
+  завершения заданного числа запросов и отдает их в collapsed формате
+  (строки "кадр;кадр;кадр число"), который понимают flamegraph.pl,
+  speedscope и inferno;
+- LoopLagMonitor - монитор задержки event loop, который пишет в лог
+  каждую блокировку loop дольше порога вместе со стеком кода,
+  заблокировавшего loop.
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import traceback
+from collections import Counter
+from time import perf_counter
+from typing import Optional
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from server.metrics import Histogram
+
+
+logger = logging.getLogger(__name__)
+
+EVENT_LOOP_LAG_SECONDS = Histogram(
+    "event_loop_lag_seconds", "Задержка срабатывания таймера event loop",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+
+
+class ProfilingSettings(BaseSettings):
+    """
+    Настройки профилирования.
+
+    Attributes:
+        PROFILE_SAMPLE_INTERVAL: Интервал снятия стеков (сек)
+        PROFILE_MAX_SECONDS: Максимальная длительность профилирования (сек)
+        LOOP_LAG_THRESHOLD: Порог блокировки event loop для записи в лог (сек, 0 - монитор выключен)
+    """
+    PROFILE_SAMPLE_INTERVAL: float = 0.005
+    PROFILE_MAX_SECONDS: float = 60.0
+    LOOP_LAG_THRESHOLD: float = 0.1
+
+    # Конфигурация для загрузки настроек из .env файла
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _collapse(frame) -> str:
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.reverse()
+    return ";".join(labels)
+
+
+class ProfilerBusyError(Exception):
+    """
+    Исключение при попытке запустить второй сеанс профилирования.
+    """
+
+
+class StackSampler:
+    """
+    Семплирующий профилировщик.
+
+    Отдельный поток раз в PROFILE_SAMPLE_INTERVAL секунд снимает стеки
+    через sys._current_frames(), не вмешиваясь в выполнение кода, поэтому
+    профиль можно снимать на нагруженном воркере. По умолчанию снимается
+    только поток event loop: в нем выполняются обработчики запросов,
+    валидация Pydantic и ожидание базы данных. Время простоя loop
+    попадает в стеки select/epoll.
+    """
+
+    def __init__(self, settings: ProfilingSettings):
+        self.settings = settings
+        self._done: Optional[asyncio.Event] = None
+        self._remaining: Optional[int] = None
+
+    @property
+    def active(self) -> bool:
+        """Идет ли сеанс профилирования."""
+        return self._done is not None
+
+    def request_done(self):
+        """
+        Отмечает завершение запроса (вызывается middleware в потоке loop).
+        """
+        if self._remaining is None:
+            return
+        self._remaining -= 1
+        if self._remaining <= 0:
+            self._done.set()
+
+    async def profile(self, seconds: float, requests: Optional[int] = None, all_threads: bool = False) -> str:
+        """
+        Снимает профиль и возвращает его в collapsed формате.
+
+        Профилирование идет seconds секунд или, если задано requests,
+        до завершения requests запросов (но не дольше seconds).
+
+        Args:
+            seconds: Длительность профилирования
+            requests: Число запросов, после которого профилирование завершается
+            all_threads: Снимать стеки всех потоков, а не только event loop
+
+        Returns:
+            str: Строки "кадр;кадр;кадр число" по убыванию числа семплов
+
+        Raises:
+            ProfilerBusyError: Если профилирование уже идет
+        """
+        if self.active:
+            raise ProfilerBusyError("Профилирование уже запущено")
+        self._done = asyncio.Event()
+        self._remaining = requests
+        stop = threading.Event()
+        counts: Counter = Counter()
+        target = None if all_threads else threading.get_ident()
+        thread = threading.Thread(
+            target=self._sample, args=(stop, counts, target), name="stack-sampler", daemon=True,
+        )
+        thread.start()
+        try:
+            await asyncio.wait_for(self._done.wait(), timeout=min(seconds, self.settings.PROFILE_MAX_SECONDS))
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            stop.set()
+            await asyncio.to_thread(thread.join)
+            self._done = None
+            self._remaining = None
+        return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
+
+    def _sample(self, stop: threading.Event, counts: Counter, target: Optional[int]):
+        """
+        Цикл потока семплирования.
+        """
+        own = threading.get_ident()
+        names = {}
+        while not stop.wait(self.settings.PROFILE_SAMPLE_INTERVAL):
+            for ident, frame in sys._current_frames().items():
+                if ident == own or (target is not None and ident != target):
+                    continue
+                name = names.get(ident)
+                if name is None:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                    name = names.get(ident, str(ident))
+                counts[f"{name};{_collapse(frame)}"] += 1
+
+
+class LoopLagMonitor:
+    """
+    Монитор блокировок event loop.
+
+    Задача в loop раз в половину порога засыпает и отмечает время
+    пробуждения; опоздание пробуждения - это время, на которое loop
+    был занят другим кодом. Отдельный сторожевой поток проверяет
+    отметки и, если loop не отвечает дольше порога, пишет в лог стек
+    потока loop в этот момент - то есть код, который его блокирует.
+    """
+
+    def __init__(self, settings: ProfilingSettings):
+        self.settings = settings
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._beat = 0.0
+
+    async def start(self):
+        """
+        Запускает монитор, если порог задан.
+        """
+        if self.settings.LOOP_LAG_THRESHOLD <= 0 or self._task is not None:
+            return
+        self._beat = perf_counter()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._heartbeat(), name="loop-lag-monitor")
+        self._watchdog = threading.Thread(
+            target=self._watch, args=(threading.get_ident(),), name="loop-lag-watchdog", daemon=True,
+        )
+        self._watchdog.start()
+
+    async def stop(self):
+        """
+        Останавливает монитор.
+        """
+        if self._task is None:
+            return
+        self._stop.set()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        await asyncio.to_thread(self._watchdog.join)
+        self._task = None
+        self._watchdog = None
+
+    async def _heartbeat(self):
+        """
+        Цикл задачи: замеряет опоздание пробуждения loop.
+        """
+        threshold = self.settings.LOOP_LAG_THRESHOLD
+        interval = threshold / 2
+        while True:
+            expected = perf_counter() + interval
+            await asyncio.sleep(interval)
+            now = perf_counter()
+            self._beat = now
+            lag = max(now - expected, 0.0)
+            EVENT_LOOP_LAG_SECONDS.observe(lag)
+            if lag > threshold:
+                logger.warning("Event loop был заблокирован на %.3f с", lag)
+
+    def _watch(self, loop_thread: int):
+        """
+        Цикл сторожевого потока: пишет стек loop, если он не отвечает.
+        """
+        threshold = self.settings.LOOP_LAG_THRESHOLD
+        interval = threshold / 2
+        reported = 0.0
+        while not self._stop.wait(interval):
+            beat = self._beat
+            stalled = perf_counter() - beat
+            if stalled <= threshold + interval or beat == reported:
+                continue
+            reported = beat
+            frame = sys._current_frames().get(loop_thread)
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else ""
+            logger.warning("Event loop не отвечает %.3f с, выполняется:\n%s", stalled, stack)
+
+
+# Настройки и единственные экземпляры профилировщика и монитора
+profiling_settings = ProfilingSettings()
+stack_sampler = StackSampler(profiling_settings)
+loop_lag_monitor = LoopLagMonitor(profiling_settings)
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware, считающее завершенные запросы для сеанса профилирования.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            if scope["type"] == "http" and stack_sampler.active:
+                stack_sampler.request_done()
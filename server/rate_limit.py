@@ -0,0 +1,325 @@
+"""
+Ограничение частоты запросов и сброс нагрузки для Backend онлайн школы S2S.
+
+Этот модуль защищает отправку форм (контактной формы и заявок) от
+ботов и перегрузки:
+- token bucket по IP клиента проверяется в ASGI middleware до чтения
+  и разбора тела запроса; token bucket по email проверяется в
+  обработчике после валидации формы;
+- при насыщении пула соединений с базой данных, очереди писем или
+  числа одновременных отправок форм middleware сразу отвечает 503,
+  не тратя время на разбор тела, транзакцию и SMTP.
+
+Корзины хранятся в памяти процесса (ограниченный по размеру LRU)
+или, при RATE_LIMIT_BACKEND=sql, в таблице rate_limit_buckets,
+общей для всех воркеров.
+"""
+
+import logging
+import math
+from collections import OrderedDict
+from functools import lru_cache
+from time import monotonic, time
+from typing import List, Optional
+
+from fastapi import HTTPException
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+
+from server.database import async_pool_saturation, async_session
+from server.mail_dispatcher import mail_dispatcher
+from server.metrics import Counter
+from server.models import RateLimitBucketDB
+
+
+logger = logging.getLogger(__name__)
+
+# Маршруты отправки форм, к которым применяются лимиты (только POST)
+RATE_LIMITED_PATHS = frozenset({"/api/contact_form", "/api/applications", "/api/applications/bulk"})
+
+# Как часто (раз в сколько обращений) удалять из БД корзины, которые успели заполниться
+SQL_PURGE_EVERY = 1000
+
+REJECTED_TOTAL = Counter(
+    "rate_limit_rejected_total", "Число запросов, отклоненных лимитами и сбросом нагрузки", ("reason",),
+)
+
+
+class RateLimitSettings(BaseSettings):
+    """
+    Настройки ограничения частоты запросов и сброса нагрузки.
+
+    Attributes:
+        RATE_LIMIT_ENABLED: Включены ли лимиты и сброс нагрузки
+        RATE_LIMIT_BACKEND: Где хранить корзины: memory (в процессе) или sql (общая БД)
+        RATE_LIMIT_IP_RATE: Пополнение корзины IP (запросов в секунду)
+        RATE_LIMIT_IP_BURST: Емкость корзины IP
+        RATE_LIMIT_EMAIL_RATE: Пополнение корзины email (запросов в секунду)
+        RATE_LIMIT_EMAIL_BURST: Емкость корзины email
+        RATE_LIMIT_MAX_KEYS: Максимальное число корзин каждого типа в памяти
+        SHED_DB_POOL_SATURATION: Загрузка пула БД, с которой формы отклоняются (0 - не проверять)
+        SHED_MAIL_QUEUE_SATURATION: Заполнение очереди писем, с которого формы отклоняются (0 - не проверять)
+        SHED_MAX_IN_FLIGHT: Максимум одновременно обрабатываемых форм (0 - без ограничения)
+    """
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "memory"
+    # Класс за одним NAT отправляет заявки с одного IP, поэтому лимит IP мягкий
+    RATE_LIMIT_IP_RATE: float = 0.5
+    RATE_LIMIT_IP_BURST: float = 20
+    RATE_LIMIT_EMAIL_RATE: float = 1 / 60
+    RATE_LIMIT_EMAIL_BURST: float = 3
+    RATE_LIMIT_MAX_KEYS: int = 100000
+    SHED_DB_POOL_SATURATION: float = 1.0
+    SHED_MAIL_QUEUE_SATURATION: float = 0.9
+    SHED_MAX_IN_FLIGHT: int = 0
+
+    # Конфигурация для загрузки настроек из .env файла
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+
+
+class TokenBuckets:
+    """
+    Token bucket корзины в памяти процесса.
+
+    Корзина пополняется на rate токенов в секунду до burst, каждый
+    запрос забирает один токен. Корзины лежат в OrderedDict в порядке
+    последнего обращения; при превышении max_keys вытесняются самые
+    давние. Давно не использованная корзина уже заполнена, поэтому
+    ее вытеснение не ослабляет лимит.
+    """
+
+    def __init__(self, rate: float, burst: float, max_keys: int):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    async def take(self, key: str) -> float:
+        """
+        Забирает токен из корзины.
+
+        Args:
+            key: Ключ корзины
+
+        Returns:
+            float: 0, если токен получен, иначе через сколько секунд появится токен
+        """
+        now = monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = [self.burst, now]
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        return _consume(bucket, self.rate)
+
+
+class SqlTokenBuckets:
+    """
+    Token bucket корзины в таблице rate_limit_buckets.
+
+    Строка корзины блокируется (SELECT ... FOR UPDATE) на время
+    пересчета, поэтому одновременные запросы из разных воркеров
+    не расходуют один токен дважды. Заполнившиеся корзины удаляются
+    раз в SQL_PURGE_EVERY обращений.
+    """
+
+    def __init__(self, rate: float, burst: float, max_keys: int = 0):
+        self.rate = rate
+        self.burst = burst
+        self._calls = 0
+
+    async def take(self, key: str) -> float:
+        now = time()
+        async with async_session() as db:
+            for _ in range(2):
+                row = (await db.execute(
+                    select(RateLimitBucketDB).where(RateLimitBucketDB.key == key).with_for_update()
+                )).scalar_one_or_none()
+                if row is None:
+                    bucket = [self.burst, now]
+                    wait = _consume(bucket, self.rate)
+                    db.add(RateLimitBucketDB(key=key, tokens=bucket[0], updated_at=now))
+                else:
+                    bucket = [min(self.burst, row.tokens + max(now - row.updated_at, 0.0) * self.rate), now]
+                    wait = _consume(bucket, self.rate)
+                    row.tokens, row.updated_at = bucket
+                try:
+                    await db.commit()
+                    break
+                except IntegrityError:
+                    # Корзину создал параллельный запрос, пересчитываем по ней
+                    await db.rollback()
+        self._calls += 1
+        if self._calls % SQL_PURGE_EVERY == 0:
+            await self.purge_full()
+        return wait
+
+    async def purge_full(self):
+        """
+        Удаляет корзины, которые за время простоя заполнились до burst.
+        """
+        idle = self.burst / self.rate if self.rate > 0 else math.inf
+        if math.isinf(idle):
+            return
+        async with async_session() as db:
+            await db.execute(delete(RateLimitBucketDB).where(RateLimitBucketDB.updated_at < time() - idle))
+            await db.commit()
+
+
+def _consume(bucket: List[float], rate: float) -> float:
+    """
+    Забирает токен из пересчитанной корзины [tokens, updated_at].
+    """
+    if bucket[0] >= 1:
+        bucket[0] -= 1
+        return 0.0
+    return (1 - bucket[0]) / rate if rate > 0 else math.inf
+
+
+class RateLimiter:
+    """
+    Лимиты отправки форм и сигналы перегрузки.
+    """
+
+    def __init__(self, settings: RateLimitSettings):
+        self.settings = settings
+        buckets = {"memory": TokenBuckets, "sql": SqlTokenBuckets}.get(settings.RATE_LIMIT_BACKEND)
+        if buckets is None:
+            raise ValueError(f"Неизвестное хранилище лимитов: {settings.RATE_LIMIT_BACKEND}")
+        self.ip_buckets = buckets(settings.RATE_LIMIT_IP_RATE, settings.RATE_LIMIT_IP_BURST, settings.RATE_LIMIT_MAX_KEYS)
+        self.email_buckets = buckets(
+            settings.RATE_LIMIT_EMAIL_RATE, settings.RATE_LIMIT_EMAIL_BURST, settings.RATE_LIMIT_MAX_KEYS,
+        )
+        self.in_flight = 0
+
+    async def _take(self, buckets, key: str) -> float:
+        try:
+            return await buckets.take(key)
+        except Exception:
+            # Недоступное общее хранилище не должно останавливать прием форм
+            logger.exception("Ошибка хранилища лимитов, запрос пропущен без проверки")
+            return 0.0
+
+    async def check_ip(self, ip: str) -> float:
+        """
+        Returns:
+            float: 0, если лимит IP не превышен, иначе секунды до следующей попытки
+        """
+        return await self._take(self.ip_buckets, f"ip:{ip}")
+
+    async def check_email(self, email: str):
+        """
+        Проверяет лимит отправок с одного email.
+
+        Raises:
+            HTTPException: 429 с заголовком Retry-After при превышении лимита
+        """
+        if not self.settings.RATE_LIMIT_ENABLED:
+            return
+        wait = await self._take(self.email_buckets, f"email:{email.strip().lower()}")
+        if wait:
+            REJECTED_TOTAL.labels("email").inc()
+            raise HTTPException(
+                status_code=429, detail="Too many requests", headers={"Retry-After": _retry_after(wait)},
+            )
+
+    def shed_reason(self) -> Optional[str]:
+        """
+        Проверяет, перегружено ли приложение.
+
+        Returns:
+            Optional[str]: Причина сброса нагрузки (db_pool, mail_queue, in_flight) или None
+        """
+        settings = self.settings
+        if settings.SHED_MAX_IN_FLIGHT and self.in_flight >= settings.SHED_MAX_IN_FLIGHT:
+            return "in_flight"
+        if settings.SHED_DB_POOL_SATURATION and async_pool_saturation() >= settings.SHED_DB_POOL_SATURATION:
+            return "db_pool"
+        if settings.SHED_MAIL_QUEUE_SATURATION and mail_dispatcher.running:
+            capacity = mail_dispatcher.settings.MAIL_QUEUE_SIZE
+            if capacity > 0 and mail_dispatcher.queue_size / capacity >= settings.SHED_MAIL_QUEUE_SATURATION:
+                return "mail_queue"
+        return None
+
+
+@lru_cache(maxsize=None)
+def get_rate_limiter() -> RateLimiter:
+    """
+    Возвращает лимиты приложения, создавая их при первом обращении.
+    """
+    return RateLimiter(RateLimitSettings())
+
+
+def _retry_after(wait: float) -> str:
+    return str(max(1, math.ceil(min(wait, 3600))))
+
+
+async def _reject(send, status_code: int, detail: str, retry_after: str):
+    body = ('{"detail":"%s"}' % detail).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", retry_after.encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware лимита по IP и сброса нагрузки для RATE_LIMITED_PATHS.
+
+    Проверки выполняются до чтения тела запроса: перегруженное
+    приложение отвечает 503, превышение лимита IP - 429, в обоих
+    случаях с заголовком Retry-After. IP берется из scope["client"];
+    за прокси uvicorn нужно запускать с --proxy-headers.
+    """
+
+    def __init__(self, app, limiter: Optional[RateLimiter] = None):
+        self.app = app
+        self._limiter = limiter
+
+    @property
+    def limiter(self) -> RateLimiter:
+        """Лимиты (по умолчанию лимиты приложения)."""
+        return self._limiter if self._limiter is not None else get_rate_limiter()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in RATE_LIMITED_PATHS:
+            await self.app(scope, receive, send)
+            return
+        limiter = self.limiter
+        if not limiter.settings.RATE_LIMIT_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        reason = limiter.shed_reason()
+        if reason is not None:
+            REJECTED_TOTAL.labels(reason).inc()
+            await _reject(send, 503, "Service overloaded", "1")
+            return
+
+        client = scope.get("client")
+        wait = await limiter.check_ip(client[0] if client else "unknown")
+        if wait:
+            REJECTED_TOTAL.labels("ip").inc()
+            await _reject(send, 429, "Too many requests", _retry_after(wait))
+            return
+
+        limiter.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.in_flight -= 1
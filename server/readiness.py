@@ -0,0 +1,61 @@
+"""
+Готовность приложения к приему трафика для Backend онлайн школы S2S.
+
+Этот модуль содержит класс Readiness, в котором lifespan отмечает
+компоненты, прошедшие инициализацию (каталог, база данных, почта).
+Проверка готовности балансировщика отвечает успехом только после
+того, как все компоненты готовы, и снова проваливается при остановке.
+"""
+
+from threading import Lock
+from typing import Dict
+
+
+# Компоненты, которые должны быть готовы до приема трафика
+COMPONENTS = ("catalog", "database", "mail")
+
+
+class Readiness:
+    """
+    Состояние готовности компонентов приложения.
+    """
+
+    def __init__(self):
+        self._components: Dict[str, bool] = dict.fromkeys(COMPONENTS, False)
+        self._lock = Lock()
+
+    def mark(self, component: str, ready: bool = True):
+        """
+        Отмечает компонент готовым (или неготовым).
+
+        Args:
+            component: Имя компонента из COMPONENTS
+            ready: Готов ли компонент
+        """
+        with self._lock:
+            self._components[component] = ready
+
+    def reset(self):
+        """
+        Сбрасывает готовность всех компонентов (при остановке приложения).
+        """
+        with self._lock:
+            for component in self._components:
+                self._components[component] = False
+
+    @property
+    def ready(self) -> bool:
+        """Готовы ли все компоненты."""
+        with self._lock:
+            return all(self._components.values())
+
+    def snapshot(self) -> Dict[str, bool]:
+        """
+        Возвращает готовность каждого компонента.
+        """
+        with self._lock:
+            return dict(self._components)
+
+
+# Единственный экземпляр состояния готовности
+readiness = Readiness()
@@ -0,0 +1,157 @@
+"""
+Предварительно сериализованные ответы для Backend онлайн школы S2S.
+
+Этот модуль содержит утилиты для однократного кодирования неизменяемых
+данных каталога в JSON и отдачи их с сильным ETag, чтобы повторные
+запросы не тратили CPU на валидацию и сериализацию. Тело можно один
+раз сжать (gzip и brotli), и тогда ответ отдается в сжатом виде
+по заголовку Accept-Encoding клиента.
+"""
+
+import gzip
+from dataclasses import dataclass, field, replace
+from hashlib import sha256
+from typing import Any, Dict, Optional
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+
+try:
+    import brotli
+except ImportError:  # без пакета Brotli ответы сжимаются только gzip
+    brotli = None
+
+
+# Сжатые варианты меньше этого размера не дают выигрыша
+MIN_COMPRESS_SIZE = 1024
+
+
+@dataclass(frozen=True)
+class CachedPayload:
+    """
+    Закодированное тело ответа вместе с его ETag.
+
+    Attributes:
+        body: JSON тело ответа в байтах
+        etag: Сильный ETag, вычисленный по содержимому тела
+        encoded: Сжатые варианты тела по Content-Encoding (br, gzip)
+    """
+    body: bytes
+    etag: str
+    encoded: Dict[str, bytes] = field(default_factory=dict)
+
+
+def encode_payload(adapter: TypeAdapter, data: Any) -> CachedPayload:
+    """
+    Кодирует данные в JSON один раз и вычисляет ETag.
+
+    Args:
+        adapter: TypeAdapter для модели ответа (например, List[Course])
+        data: Данные для сериализации
+
+    Returns:
+        CachedPayload: Готовое тело ответа и его ETag
+    """
+    # by_alias=True повторяет поведение FastAPI для response_model
+    body = adapter.dump_json(data, by_alias=True)
+    etag = '"' + sha256(body).hexdigest()[:32] + '"'
+    return CachedPayload(body=body, etag=etag)
+
+
+def compress_payload(payload: CachedPayload) -> CachedPayload:
+    """
+    Добавляет к закодированному ответу сжатые gzip и brotli варианты.
+
+    Сжатие выполняется один раз с максимальной степенью, поэтому
+    вызывать функцию нужно вне event loop (например, в warm каталога).
+
+    Args:
+        payload: Закодированное тело ответа
+
+    Returns:
+        CachedPayload: То же тело с вариантами, которые меньше исходного
+    """
+    if len(payload.body) < MIN_COMPRESS_SIZE:
+        return payload
+    encoded = {}
+    if brotli is not None:
+        encoded["br"] = brotli.compress(payload.body, mode=brotli.MODE_TEXT, quality=11)
+    # mtime=0 делает результат одинаковым на всех воркерах
+    encoded["gzip"] = gzip.compress(payload.body, compresslevel=9, mtime=0)
+    return replace(payload, encoded={k: v for k, v in encoded.items() if len(v) < len(payload.body)})
+
+
+def _choose_encoding(accept_encoding: str, available: Dict[str, bytes]) -> Optional[str]:
+    """
+    Выбирает сжатый вариант по заголовку Accept-Encoding.
+
+    Из вариантов с наибольшим q выбирается первый в порядке
+    available (brotli раньше gzip); q=0 запрещает кодировку.
+    """
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.lower().split(","):
+        coding, _, params = item.partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[coding.strip()] = q
+    best, best_q = None, 0.0
+    for coding in available:
+        q = weights.get(coding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    Проверяет заголовок If-None-Match на совпадение с ETag.
+
+    Для If-None-Match используется слабое сравнение (RFC 9110),
+    поэтому префикс W/ у клиентского значения игнорируется.
+    """
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def cached_json_response(request: Request, payload: CachedPayload) -> Response:
+    """
+    Формирует ответ из предварительно закодированного тела.
+
+    Если клиент прислал совпадающий If-None-Match, возвращает
+    304 Not Modified без тела. Если у ответа есть сжатые варианты,
+    отдается вариант, подходящий под Accept-Encoding, со своим ETag.
+
+    Args:
+        request: Входящий запрос
+        payload: Закодированное тело ответа и его ETag
+
+    Returns:
+        Response: 200 с JSON телом или 304 без тела
+    """
+    body, etag = payload.body, payload.etag
+    headers = {"Cache-Control": "no-cache"}
+    if payload.encoded:
+        headers["Vary"] = "Accept-Encoding"
+        coding = _choose_encoding(request.headers.get("accept-encoding", ""), payload.encoded)
+        if coding is not None:
+            # Разные представления должны иметь разные сильные ETag
+            body, etag = payload.encoded[coding], f'{etag[:-1]}-{coding}"'
+            headers["Content-Encoding"] = coding
+    headers["ETag"] = etag
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, etag):
+        headers.pop("Content-Encoding", None)
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
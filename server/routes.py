@@ -9,27 +9,89 @@ API маршруты для Backend онлайн школы S2S.
 - Контактными формами
 """
 
-from fastapi import APIRouter, HTTPException, status, BackgroundTasks, Depends
-from typing import List
-from uuid import UUID
+import hmac
+import logging
 
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException, status, Request, Query
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from typing import List, Literal, Optional
+from uuid import UUID
 
-from server.crud import create_contact_form
-from server.database import get_db
-from server.email_utils import send_contact_form_email
+from server.admin import admin_settings
+from server.crud import create_contact_form, list_contact_forms
+from server.database import async_session, get_pool_stats
+from server.responses import cached_json_response
 from server.schemas import (
+    Page, BatchRequest, BatchResult,
     InsertUser, User,
-    Course,
+    Course, CourseQueryResult,
     InsertApplication, Application,
+    BulkApplicationRequest, BulkApplicationItem, BulkApplicationResult,
     Teacher,
+    SearchResults, Suggestion, Landing,
     InsertContactForm, ContactForm,
 )
-from server.storage import storage
+from server.metrics import CONTENT_TYPE, REGISTRY, STORAGE_SECONDS
+from server.export import (
+    APPLICATION_FIELDS, CONTACT_FORM_FIELDS, MEDIA_TYPES,
+    application_chunks, contact_form_chunks, encode_stream,
+)
+from server.outbox import outbox_drainer
+from server.pagination import Keyset, decode_cursor, make_page
+from server.profiling import ProfilerBusyError, stack_sampler
+from server.rate_limit import get_rate_limiter
+from server.readiness import readiness
+from server.storage import get_storage, UsernameTakenError
+from server.write_behind import contact_form_buffer
 
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
+# Ограничения размера страницы для списков
+DEFAULT_PAGE_LIMIT = 50
+MAX_PAGE_LIMIT = 500
+
+
+def _parse_cursor(cursor: Optional[str]) -> Optional[Keyset]:
+    """
+    Декодирует курсор пагинации из query параметра.
+    
+    Raises:
+        HTTPException: Если курсор поврежден
+    """
+    if cursor is None:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _batch_result(ids: List[UUID], items: list) -> dict:
+    """
+    Дополняет найденные пакетом записи списком ненайденных ID.
+    """
+    found = {item.id for item in items}
+    return {"items": items, "missing": [i for i in ids if i not in found]}
+
+
+def _require_admin(x_admin_token: Optional[str] = Header(None)):
+    """
+    Проверяет токен администратора в заголовке X-Admin-Token.
+    
+    Raises:
+        HTTPException: 404, если ADMIN_TOKEN не задан (служебные endpoints
+            выключены), и 403 при неверном токене
+    """
+    expected = admin_settings.ADMIN_TOKEN
+    if not expected:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token.encode(), expected.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
 # Пользователи
 @router.post("/api/users", response_model=User)
 async def create_user(user: InsertUser):
@@ -45,10 +107,16 @@ async def create_user(user: InsertUser):
     Raises:
         HTTPException: Если имя пользователя уже занято
     """
-    existing = await storage.getUserByUsername(user.username)
+    with STORAGE_SECONDS.time("getUserByUsername"):
+        existing = await get_storage().getUserByUsername(user.username)
     if existing:
         raise HTTPException(status_code=400, detail="Username already taken")
-    new_user = await storage.createUser(user)
+    try:
+        with STORAGE_SECONDS.time("createUser"):
+            new_user = await get_storage().createUser(user)
+    except UsernameTakenError:
+        # Имя успели занять параллельным запросом
+        raise HTTPException(status_code=400, detail="Username already taken")
     return new_user
 
 @router.get("/api/users/{user_id}", response_model=User)
@@ -65,31 +133,94 @@ async def get_user(user_id: UUID):
     Raises:
         HTTPException: Если пользователь не найден
     """
-    user = await storage.getUser(str(user_id))
+    with STORAGE_SECONDS.time("getUser"):
+        user = await get_storage().getUser(str(user_id))
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
 
-@router.get("/api/users", response_model=List[User])
-async def list_users():
+@router.post("/api/users/batch", response_model=BatchResult[User])
+async def get_users_batch(batch: BatchRequest):
     """
-    Получает список всех пользователей.
+    Получает нескольких пользователей по списку ID одним запросом.
     
+    Ненайденные ID не приводят к ошибке, а возвращаются в missing.
+    
+    Args:
+        batch: ID пользователей (не более MAX_BATCH_SIZE)
+        
     Returns:
-        List[User]: Список всех пользователей
+        BatchResult[User]: Найденные пользователи и ненайденные ID
     """
-    return list(storage.users.values())
+    ids = list(dict.fromkeys(batch.ids))
+    with STORAGE_SECONDS.time("getUsersByIds"):
+        users = await get_storage().getUsersByIds(ids)
+    return _batch_result(ids, users)
+
+@router.get("/api/users", response_model=Page[User])
+async def list_users(
+    limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+    cursor: Optional[str] = None,
+):
+    """
+    Получает страницу пользователей в порядке создания.
+    
+    Args:
+        limit: Размер страницы
+        cursor: Курсор из next_cursor предыдущей страницы
+    
+    Returns:
+        Page[User]: Пользователи и курсор следующей страницы
+    """
+    with STORAGE_SECONDS.time("listUsers"):
+        users = await get_storage().listUsers(_parse_cursor(cursor), limit + 1)
+    items, next_cursor = make_page(users, limit, lambda u: (u.created_at, u.id))
+    return Page[User](items=items, next_cursor=next_cursor)
 
 # Курсы
 @router.get("/api/courses", response_model=List[Course])
-async def get_courses():
+async def get_courses(request: Request):
     """
     Получает список всех курсов.
     
+    Ответ кодируется один раз и отдается с ETag; при совпадении
+    If-None-Match возвращается 304.
+    
     Returns:
         List[Course]: Список всех курсов
     """
-    return await storage.getCourses()
+    return cached_json_response(request, await get_storage().getCoursesPayload())
+
+@router.get("/api/courses/query", response_model=CourseQueryResult)
+async def query_courses(
+    subject: List[str] = Query([]),
+    category: List[str] = Query([]),
+    grade: Optional[int] = Query(None, ge=1, le=11),
+    popular: Optional[bool] = None,
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    sort: Optional[Literal["price", "-price", "lessons", "-lessons"]] = None,
+):
+    """
+    Фильтрует курсы по нескольким полям сразу.
+    
+    Параметры subject и category можно повторять (курс подходит,
+    если совпадает любое значение). В ответе вместе с курсами
+    возвращается число курсов по предметам и категориям.
+    
+    Args:
+        subject: Предметы курсов
+        category: Категории курсов
+        grade: Класс ученика
+        popular: Фильтр по популярности
+        min_price: Минимальная текущая цена
+        max_price: Максимальная текущая цена
+        sort: Сортировка по цене или числу уроков (минус - по убыванию)
+        
+    Returns:
+        CourseQueryResult: Курсы, их число и фасеты
+    """
+    return await get_storage().queryCourses(subject, category, grade, popular, min_price, max_price, sort)
 
 @router.get("/api/courses/{course_id}", response_model=Course)
 async def get_course(course_id: UUID):
@@ -105,13 +236,27 @@ async def get_course(course_id: UUID):
     Raises:
         HTTPException: Если курс не найден
     """
-    course = await storage.getCourse(str(course_id))
+    course = await get_storage().getCourse(str(course_id))
     if not course:
         raise HTTPException(status_code=404, detail="Course not found")
     return course
 
+@router.post("/api/courses/batch", response_model=BatchResult[Course])
+async def get_courses_batch(batch: BatchRequest):
+    """
+    Получает несколько курсов по списку ID одним запросом.
+    
+    Args:
+        batch: ID курсов (не более MAX_BATCH_SIZE)
+        
+    Returns:
+        BatchResult[Course]: Найденные курсы и ненайденные ID
+    """
+    ids = list(dict.fromkeys(batch.ids))
+    return _batch_result(ids, await get_storage().getCoursesByIds(ids))
+
 @router.get("/api/courses/category/{category}", response_model=List[Course])
-async def get_courses_by_category(category: str):
+async def get_courses_by_category(category: str, request: Request):
     """
     Получает список курсов по категории.
     
@@ -121,10 +266,10 @@ async def get_courses_by_category(category: str):
     Returns:
         List[Course]: Список курсов указанной категории
     """
-    return await storage.getCoursesByCategory(category)
+    return cached_json_response(request, await get_storage().getCoursesByCategoryPayload(category))
 
 @router.get("/api/courses/subject/{subject}", response_model=List[Course])
-async def get_courses_by_subject(subject: str):
+async def get_courses_by_subject(subject: str, request: Request):
     """
     Получает список курсов по предмету.
     
@@ -134,18 +279,21 @@ async def get_courses_by_subject(subject: str):
     Returns:
         List[Course]: Список курсов указанного предмета
     """
-    return await storage.getCoursesBySubject(subject)
+    return cached_json_response(request, await get_storage().getCoursesBySubjectPayload(subject))
 
 # Учителя
 @router.get("/api/teachers", response_model=List[Teacher])
-async def get_teachers():
+async def get_teachers(request: Request):
     """
     Получает список всех преподавателей.
     
+    Ответ кодируется один раз и отдается с ETag; при совпадении
+    If-None-Match возвращается 304.
+    
     Returns:
         List[Teacher]: Список всех преподавателей
     """
-    return await storage.getTeachers()
+    return cached_json_response(request, await get_storage().getTeachersPayload())
 
 @router.get("/api/teachers/{teacher_id}", response_model=Teacher)
 async def get_teacher(teacher_id: UUID):
@@ -161,11 +309,81 @@ async def get_teacher(teacher_id: UUID):
     Raises:
         HTTPException: Если преподаватель не найден
     """
-    teacher = await storage.getTeacher(str(teacher_id))
+    teacher = await get_storage().getTeacher(str(teacher_id))
     if not teacher:
         raise HTTPException(status_code=404, detail="Teacher not found")
     return teacher
 
+@router.post("/api/teachers/batch", response_model=BatchResult[Teacher])
+async def get_teachers_batch(batch: BatchRequest):
+    """
+    Получает нескольких преподавателей по списку ID одним запросом.
+    
+    Args:
+        batch: ID преподавателей (не более MAX_BATCH_SIZE)
+        
+    Returns:
+        BatchResult[Teacher]: Найденные преподаватели и ненайденные ID
+    """
+    ids = list(dict.fromkeys(batch.ids))
+    return _batch_result(ids, await get_storage().getTeachersByIds(ids))
+
+# Главная страница
+@router.get("/api/landing", response_model=Landing)
+async def get_landing(request: Request):
+    """
+    Получает все данные главной страницы одним запросом.
+    
+    Ответ кодируется и сжимается (brotli, gzip) один раз при загрузке
+    каталога; вариант выбирается по Accept-Encoding, при совпадении
+    If-None-Match возвращается 304.
+    
+    Returns:
+        Landing: Курсы, преподаватели, ID популярных курсов и курсов по предметам
+    """
+    return cached_json_response(request, await get_storage().getLandingPayload())
+
+# Поиск
+@router.get("/api/search", response_model=SearchResults)
+async def search_catalog(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+):
+    """
+    Ищет курсы и преподавателей по тексту запроса.
+    
+    Поиск идет по инвертированному индексу, построенному при загрузке
+    каталога, и не зависит от регистра, ё/е и формы слова.
+    
+    Args:
+        q: Поисковый запрос
+        limit: Максимальное число результатов каждого типа
+        
+    Returns:
+        SearchResults: Курсы и преподаватели по убыванию релевантности
+    """
+    return await get_storage().searchCatalog(q, limit)
+
+@router.get("/api/autocomplete", response_model=List[Suggestion])
+async def autocomplete(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=10),
+):
+    """
+    Возвращает подсказки по началу названия курса или имени преподавателя.
+    
+    Последнее слово считается недописанным; опечатки допускаются
+    (одна для слов от 4 букв, две для слов от 8 букв).
+    
+    Args:
+        q: Введенный пользователем текст
+        limit: Максимальное число подсказок
+        
+    Returns:
+        List[Suggestion]: Подсказки по курсам и преподавателям
+    """
+    return await get_storage().getSuggestions(q, limit)
+
 # Заявки
 @router.post("/api/applications", response_model=Application, status_code=status.HTTP_201_CREATED)
 async def create_application(application: InsertApplication):
@@ -181,26 +399,93 @@ async def create_application(application: InsertApplication):
     Raises:
         HTTPException: Если пользователь или курс не существуют
     """
-    user = await storage.getUser(str(application.user_id))
+    with STORAGE_SECONDS.time("getUser"):
+        user = await get_storage().getUser(str(application.user_id))
     if not user:
         raise HTTPException(status_code=400, detail="User does not exist")
 
-    course = await storage.getCourse(str(application.course_id))
+    with STORAGE_SECONDS.time("getCourse"):
+        course = await get_storage().getCourse(str(application.course_id))
     if not course:
         raise HTTPException(status_code=400, detail="Course does not exist")
 
-    new_app = await storage.createApplication(application)
+    with STORAGE_SECONDS.time("createApplication"):
+        new_app = await get_storage().createApplication(application)
     return new_app
 
-@router.get("/api/applications", response_model=List[Application])
-async def get_applications():
+@router.post(
+    "/api/applications/bulk",
+    response_model=BulkApplicationResult,
+    status_code=status.HTTP_201_CREATED,
+    responses={400: {"model": BulkApplicationResult}},
+)
+async def create_applications_bulk(
+    bulk: BulkApplicationRequest,
+    mode: Literal["atomic", "partial"] = "atomic",
+):
+    """
+    Создает пакет заявок на курсы, например для всего класса.
+    
+    Пользователи и курсы всех заявок проверяются одним запросом
+    к хранилищу, а заявки создаются одной вставкой, поэтому
+    стоимость растет с размером пакета, а не с числом запросов.
+    
+    Args:
+        bulk: Заявки пакета (не более MAX_BATCH_SIZE)
+        mode: atomic - при любой ошибке не создается ни одна заявка
+            (ответ 400), partial - создаются все корректные заявки
+    
+    Returns:
+        BulkApplicationResult: Число созданных заявок и результат по каждой
+    """
+    storage = get_storage()
+    with STORAGE_SECONDS.time("getUsersByIds"):
+        users = await storage.getUsersByIds(list(dict.fromkeys(a.user_id for a in bulk.items)))
+    with STORAGE_SECONDS.time("getCoursesByIds"):
+        courses = await storage.getCoursesByIds(list(dict.fromkeys(a.course_id for a in bulk.items)))
+    user_ids = {u.id for u in users}
+    course_ids = {c.id for c in courses}
+
+    errors = [
+        "User does not exist" if a.user_id not in user_ids
+        else "Course does not exist" if a.course_id not in course_ids
+        else None
+        for a in bulk.items
+    ]
+    valid = [a for a, error in zip(bulk.items, errors) if error is None]
+    if mode == "atomic" and len(valid) < len(bulk.items):
+        result = BulkApplicationResult(
+            created=0, items=[BulkApplicationItem(index=i, error=error) for i, error in enumerate(errors)],
+        )
+        return JSONResponse(result.model_dump(mode="json"), status_code=status.HTTP_400_BAD_REQUEST)
+
+    with STORAGE_SECONDS.time("createApplications"):
+        created = iter(await storage.createApplications(valid))
+    items = [
+        BulkApplicationItem(index=i, error=error) if error else BulkApplicationItem(index=i, application=next(created))
+        for i, error in enumerate(errors)
+    ]
+    return BulkApplicationResult(created=len(valid), items=items)
+
+@router.get("/api/applications", response_model=Page[Application])
+async def get_applications(
+    limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+    cursor: Optional[str] = None,
+):
     """
-    Получает список всех заявок на курсы.
+    Получает страницу заявок на курсы в порядке создания.
+    
+    Args:
+        limit: Размер страницы
+        cursor: Курсор из next_cursor предыдущей страницы
     
     Returns:
-        List[Application]: Список всех заявок
+        Page[Application]: Заявки и курсор следующей страницы
     """
-    return await storage.getApplications()
+    with STORAGE_SECONDS.time("listApplications"):
+        applications = await get_storage().listApplications(_parse_cursor(cursor), limit + 1)
+    items, next_cursor = make_page(applications, limit, lambda a: (a.created_at, a.id))
+    return Page[Application](items=items, next_cursor=next_cursor)
 
 @router.get("/api/applications/{application_id}", response_model=Application)
 async def get_application(application_id: UUID):
@@ -216,7 +501,8 @@ async def get_application(application_id: UUID):
     Raises:
         HTTPException: Если заявка не найдена
     """
-    app = await storage.getApplication(str(application_id))
+    with STORAGE_SECONDS.time("getApplication"):
+        app = await get_storage().getApplication(str(application_id))
     if not app:
         raise HTTPException(status_code=404, detail="Application not found")
     return app
@@ -225,33 +511,203 @@ async def get_application(application_id: UUID):
 @router.post("/api/contact_form", response_model=ContactForm, status_code=status.HTTP_201_CREATED)
 async def create_contact_form_endpoint(
     form_data: InsertContactForm,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db)
 ):
     """
-    Создает новую контактную форму и отправляет email уведомление.
+    Создает новую контактную форму и ставит email уведомление в outbox.
+
+    Уведомление записывается в outbox в той же транзакции, что и форма,
+    и отправляется фоновым циклом, поэтому задержка SMTP не влияет
+    на ответ, а письмо не теряется при перезапуске.
+
+    При CONTACT_FORM_WRITE_BEHIND=True форма не записывается сразу,
+    а попадает в буфер пакетной записи; id возвращается немедленно.
 
     Args:
         form_data: Данные контактной формы
-        background_tasks: FastAPI background tasks для асинхронной отправки email
-        db: Сессия базы данных
 
     Returns:
         ContactForm: Созданная контактная форма
 
     Raises:
-        HTTPException: При ошибке сохранения в базу данных
+        HTTPException: 429, если с этого email недавно уже отправлялись формы;
+            500 при ошибке сохранения в базу данных
     """
+    await get_rate_limiter().check_email(form_data.email)
     try:
-        contact_record = create_contact_form(db, form_data)
-        # print('Пенис')
-    except Exception as e:
+        with STORAGE_SECONDS.time("createContactForm"):
+            if contact_form_buffer.running:
+                # Режим отложенной записи: форма попадет в БД со следующей пачкой
+                contact_record = await contact_form_buffer.submit(form_data)
+            else:
+                # Сессия открывается только здесь, чтобы в режиме буфера не занимать пул
+                async with async_session() as db:
+                    contact_record = await create_contact_form(db, form_data)
+    except Exception:
         # Логируем ошибку подключения/записи, но не даём падать приложению
-        print(f"Ошибка при сохранении контактной формы в БД: {e}")
+        logger.exception("Ошибка при сохранении контактной формы в БД")
         # Можем вернуть минимальный ответ или ошибку, но сайт продолжит работу
         raise HTTPException(status_code=500, detail="Ошибка сервера при сохранении данных")
 
-    # Отправка письма в фоне с обработкой ошибок внутри самой фоновой задачи
-    background_tasks.add_task(send_contact_form_email, form_data)
+    # Будим цикл разбора outbox, чтобы письмо ушло без ожидания опроса
+    outbox_drainer.notify()
 
     return contact_record
+
+
+@router.get("/api/contact_forms", response_model=Page[ContactForm], dependencies=[Depends(_require_admin)])
+async def get_contact_forms(
+    limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+    cursor: Optional[str] = None,
+):
+    """
+    Получает страницу контактных форм из базы данных в порядке создания.
+    
+    Формы содержат персональные данные, поэтому endpoint доступен
+    только с токеном администратора.
+    
+    Args:
+        limit: Размер страницы
+        cursor: Курсор из next_cursor предыдущей страницы
+    
+    Returns:
+        Page[ContactForm]: Контактные формы и курсор следующей страницы
+    """
+    after = _parse_cursor(cursor)
+    with STORAGE_SECONDS.time("listContactForms"):
+        async with async_session() as db:
+            rows = await list_contact_forms(db, after, limit + 1)
+    items, next_cursor = make_page(rows, limit, lambda f: (f.created_at, f.id))
+    return Page[ContactForm](
+        items=[ContactForm.model_validate(row, from_attributes=True) for row in items],
+        next_cursor=next_cursor,
+    )
+
+
+# Выгрузка
+ExportFormat = Literal["ndjson", "csv"]
+
+
+def _export_response(chunks, fmt: str, fields: List[str], name: str) -> StreamingResponse:
+    """
+    Формирует потоковый ответ с выгрузкой в виде файла.
+    """
+    return StreamingResponse(
+        encode_stream(chunks, fmt, fields),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{fmt}"'},
+    )
+
+
+@router.get("/api/export/contact_forms", dependencies=[Depends(_require_admin)])
+async def export_contact_forms(format: ExportFormat = "ndjson"):
+    """
+    Выгружает все контактные формы потоком в NDJSON или CSV.
+    
+    Строки читаются из базы данных серверным курсором порциями,
+    поэтому память не растет с числом форм.
+    
+    Args:
+        format: Формат выгрузки (ndjson или csv)
+    
+    Returns:
+        StreamingResponse: Файл выгрузки
+    """
+    return _export_response(contact_form_chunks(), format, CONTACT_FORM_FIELDS, "contact_forms")
+
+
+@router.get("/api/export/applications", dependencies=[Depends(_require_admin)])
+async def export_applications(format: ExportFormat = "ndjson"):
+    """
+    Выгружает все заявки потоком в NDJSON или CSV.
+    
+    Args:
+        format: Формат выгрузки (ndjson или csv)
+    
+    Returns:
+        StreamingResponse: Файл выгрузки
+    """
+    return _export_response(application_chunks(get_storage()), format, APPLICATION_FIELDS, "applications")
+
+
+# Служебные
+@router.get("/api/db/pool", dependencies=[Depends(_require_admin)])
+async def get_db_pool_stats():
+    """
+    Получает статистику пулов соединений с базой данных.
+    
+    Статистика собирается отдельно в каждом воркере, поэтому
+    в ответе указан PID процесса.
+    
+    Returns:
+        dict: Занятые соединения, overflow и время ожидания соединения
+    """
+    return get_pool_stats()
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """
+    Метрики текущего воркера в текстовом формате Prometheus.
+    
+    Returns:
+        Response: Время обработки запросов по маршрутам, число ответов
+            по статус-кодам, запросы в обработке, время операций
+            хранилища, фиксации транзакций и отправки писем
+    """
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+@router.get("/api/health/live")
+async def liveness():
+    """
+    Проверка живости: процесс запущен и обрабатывает запросы.
+    
+    Returns:
+        dict: Статус процесса
+    """
+    return {"status": "ok"}
+
+@router.get("/api/health/ready")
+async def readiness_check():
+    """
+    Проверка готовности: каталог загружен, схема БД создана, почта запущена.
+    
+    Пока приложение стартует или останавливается, возвращается 503,
+    чтобы балансировщик не направлял на воркер трафик.
+    
+    Returns:
+        dict: Общий статус и готовность каждого компонента
+    """
+    body = {"status": "ready" if readiness.ready else "starting", "components": readiness.snapshot()}
+    if not readiness.ready:
+        return JSONResponse(body, status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+    return body
+
+
+# Администрирование
+@router.post("/api/admin/profile", response_class=PlainTextResponse, dependencies=[Depends(_require_admin)])
+async def profile_worker(
+    seconds: float = Query(10.0, gt=0),
+    requests: Optional[int] = Query(None, ge=1),
+    all_threads: bool = False,
+):
+    """
+    Снимает профиль текущего воркера семплированием стеков.
+    
+    Ответ приходит после окончания профилирования: через seconds
+    секунд или после завершения requests запросов, если параметр
+    задан. Длительность ограничена PROFILE_MAX_SECONDS.
+    
+    Args:
+        seconds: Длительность профилирования
+        requests: Число запросов, после которого профилирование завершается
+        all_threads: Снимать стеки всех потоков, а не только event loop
+    
+    Returns:
+        PlainTextResponse: Стеки в collapsed формате для flamegraph
+        
+    Raises:
+        HTTPException: Если профилирование уже идет
+    """
+    try:
+        return await stack_sampler.profile(seconds, requests, all_threads)
+    except ProfilerBusyError:
+        raise HTTPException(status_code=409, detail="Profiling already in progress")
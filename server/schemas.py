@@ -6,11 +6,51 @@ Pydantic модели данных для Backend онлайн школы S2S.
 """
 
 from pydantic import BaseModel, Field, EmailStr
-from typing import List, Optional
+from typing import Dict, Generic, List, Literal, Optional, TypeVar
 from uuid import UUID
 from datetime import datetime
 
 
+T = TypeVar("T")
+
+# Максимальное число ID в одном пакетном запросе
+MAX_BATCH_SIZE = 500
+
+
+class Page(BaseModel, Generic[T]):
+    """
+    Страница списка с keyset пагинацией.
+    
+    Attributes:
+        items: Записи страницы
+        next_cursor: Курсор следующей страницы (None, если страница последняя)
+    """
+    items: List[T]
+    next_cursor: Optional[str] = None
+
+
+class BatchRequest(BaseModel):
+    """
+    Список ID для пакетного получения записей.
+    
+    Attributes:
+        ids: ID записей (повторы игнорируются)
+    """
+    ids: List[UUID] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+
+
+class BatchResult(BaseModel, Generic[T]):
+    """
+    Результат пакетного получения записей.
+    
+    Attributes:
+        items: Найденные записи в порядке запрошенных ID
+        missing: ID, для которых запись не найдена
+    """
+    items: List[T]
+    missing: List[UUID] = []
+
+
 class User(BaseModel):
     """
     Модель пользователя для ответов API.
@@ -19,10 +59,12 @@ class User(BaseModel):
         id: Уникальный идентификатор пользователя
         username: Имя пользователя (уникальное)
         full_name: Полное имя пользователя (опционально)
+        created_at: Дата и время создания пользователя
     """
     id: UUID
     username: str
     full_name: Optional[str]
+    created_at: datetime
 
 
 class InsertUser(BaseModel):
@@ -101,6 +143,77 @@ class Course(BaseModel):
     is_popular: bool
 
 
+class CourseFacets(BaseModel):
+    """
+    Число курсов по значениям фасетов.
+
+    Attributes:
+        subject: Число курсов по предметам
+        category: Число курсов по категориям
+    """
+    subject: Dict[str, int]
+    category: Dict[str, int]
+
+
+class CourseQueryResult(BaseModel):
+    """
+    Результат фильтрации курсов.
+
+    Attributes:
+        items: Найденные курсы в запрошенном порядке
+        total: Число найденных курсов
+        facets: Число курсов по предметам и категориям
+    """
+    items: List[Course]
+    total: int
+    facets: CourseFacets
+
+
+class SearchResults(BaseModel):
+    """
+    Результаты полнотекстового поиска по каталогу.
+
+    Attributes:
+        courses: Найденные курсы в порядке убывания релевантности
+        teachers: Найденные преподаватели в порядке убывания релевантности
+    """
+    courses: List[Course]
+    teachers: List[Teacher]
+
+
+class Landing(BaseModel):
+    """
+    Данные главной страницы одним ответом.
+
+    Курсы в списке популярных и в группах по предметам указаны
+    по ID, чтобы не повторять их в ответе.
+
+    Attributes:
+        courses: Все курсы
+        teachers: Все преподаватели
+        popular_course_ids: ID популярных курсов (is_popular)
+        course_ids_by_subject: ID курсов по предметам
+    """
+    courses: List[Course]
+    teachers: List[Teacher]
+    popular_course_ids: List[UUID]
+    course_ids_by_subject: Dict[str, List[UUID]]
+
+
+class Suggestion(BaseModel):
+    """
+    Подсказка автодополнения.
+
+    Attributes:
+        type: Тип объекта (course или teacher)
+        id: Идентификатор курса или преподавателя
+        text: Название курса или имя преподавателя
+    """
+    type: Literal["course", "teacher"]
+    id: UUID
+    text: str
+
+
 class Application(BaseModel):
     """
     Модель заявки на курс (ответ).
@@ -129,6 +242,42 @@ class InsertApplication(BaseModel):
     course_id: UUID
 
 
+class BulkApplicationRequest(BaseModel):
+    """
+    Пакет заявок на курсы (входные данные).
+    
+    Attributes:
+        items: Заявки пакета
+    """
+    items: List[InsertApplication] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+
+
+class BulkApplicationItem(BaseModel):
+    """
+    Результат обработки одной заявки пакета.
+    
+    Attributes:
+        index: Номер заявки в пакете
+        application: Созданная заявка (None, если заявка не создана)
+        error: Причина, по которой заявка отклонена
+    """
+    index: int
+    application: Optional[Application] = None
+    error: Optional[str] = None
+
+
+class BulkApplicationResult(BaseModel):
+    """
+    Результат создания пакета заявок.
+    
+    Attributes:
+        created: Число созданных заявок
+        items: Результаты по каждой заявке в порядке пакета
+    """
+    created: int
+    items: List[BulkApplicationItem]
+
+
 class ContactForm(BaseModel):
     """
     Модель контактной формы (ответ).
@@ -0,0 +1,155 @@
+"""
+Полнотекстовый поиск по каталогу для Backend онлайн школы S2S.
+
+Этот модуль содержит нормализацию русского текста (приведение регистра,
+замена ё на е, упрощенный стемминг) и инвертированный индекс по курсам
+и преподавателям. Индекс строится один раз при загрузке каталога,
+а веса термов вычисляются заранее, поэтому поиск сводится к сложению
+нескольких чисел и укладывается в доли миллисекунды.
+"""
+
+import math
+import re
+from collections import defaultdict
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from server.schemas import Course, Teacher
+
+
+_WORD_RE = re.compile(r"\w+")
+
+# Окончания русских слов, отсортированные по убыванию длины, чтобы
+# сначала отрезалось самое длинное подходящее окончание
+_ENDINGS = sorted(
+    [
+        "иями", "ями", "ами", "ией", "иях", "ость", "ости", "остей",
+        "ого", "его", "ому", "ему", "ыми", "ими", "ешь", "ете",
+        "ать", "ять", "еть", "ить", "ться", "ует", "уют",
+        "ая", "яя", "ое", "ее", "ые", "ие", "ой", "ей", "ий", "ый", "ым", "им",
+        "ом", "ем", "ам", "ям", "ах", "ях", "ов", "ев", "ию", "ия", "ью",
+        "а", "я", "о", "е", "ы", "и", "у", "ю", "ь", "й",
+    ],
+    key=len,
+    reverse=True,
+)
+
+# Минимальная длина основы после отсечения окончания
+_MIN_STEM = 3
+
+# Веса полей документа: совпадение в названии важнее совпадения в описании
+COURSE_FIELD_WEIGHTS = {"title": 3.0, "subject": 2.0, "category": 2.0, "description": 1.0, "features": 1.0}
+TEACHER_FIELD_WEIGHTS = {"name": 3.0, "subject": 2.0, "achievements": 1.0, "quote": 1.0}
+
+
+def normalize(text: str) -> str:
+    """
+    Приводит текст к нижнему регистру и заменяет ё на е.
+    """
+    return text.casefold().replace("ё", "е")
+
+
+def stem(word: str) -> str:
+    """
+    Отрезает типичное окончание русского слова.
+
+    Упрощенный стеммер: снимает одно самое длинное окончание из списка,
+    если после этого остается основа не короче трех букв. Слова
+    «математика», «математике» и «математики» дают одну основу.
+    """
+    for ending in _ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= _MIN_STEM:
+            return word[: -len(ending)]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Разбивает текст на нормализованные основы слов.
+    """
+    return [stem(word) for word in _WORD_RE.findall(normalize(text))]
+
+
+def _course_fields(course: Course) -> Dict[str, str]:
+    return {
+        "title": course.title,
+        "subject": course.subject,
+        "category": course.category,
+        "description": course.description,
+        "features": " ".join(course.features),
+    }
+
+
+def _teacher_fields(teacher: Teacher) -> Dict[str, str]:
+    return {
+        "name": teacher.name,
+        "subject": teacher.subject,
+        "achievements": " ".join(a.text for a in teacher.achievements),
+        "quote": teacher.quote,
+    }
+
+
+class SearchIndex:
+    """
+    Инвертированный индекс по курсам и преподавателям.
+
+    Для каждого терма хранится список документов с заранее вычисленным
+    весом: сумма весов полей, в которых встретился терм, умноженная
+    на IDF и нормированная по длине документа.
+    """
+
+    def __init__(self, courses: Sequence[Course], teachers: Sequence[Teacher]):
+        self.courses = list(courses)
+        self.teachers = list(teachers)
+        # Документ идентифицируется парой (тип, индекс в списке)
+        self.postings: Dict[str, Dict[Tuple[str, int], float]] = {}
+        self._build()
+
+    def _documents(self) -> Iterable[Tuple[Tuple[str, int], Dict[str, str], Dict[str, float]]]:
+        for i, course in enumerate(self.courses):
+            yield ("course", i), _course_fields(course), COURSE_FIELD_WEIGHTS
+        for i, teacher in enumerate(self.teachers):
+            yield ("teacher", i), _teacher_fields(teacher), TEACHER_FIELD_WEIGHTS
+
+    def _build(self):
+        raw: Dict[str, Dict[Tuple[str, int], float]] = defaultdict(lambda: defaultdict(float))
+        lengths: Dict[Tuple[str, int], int] = {}
+        for doc, fields, weights in self._documents():
+            length = 0
+            for name, text in fields.items():
+                tokens = tokenize(text)
+                length += len(tokens)
+                for token in tokens:
+                    raw[token][doc] += weights[name]
+            lengths[doc] = max(length, 1)
+
+        total = max(len(lengths), 1)
+        avg_length = sum(lengths.values()) / total
+        for term, docs in raw.items():
+            idf = math.log(1 + (total - len(docs) + 0.5) / (len(docs) + 0.5))
+            # Насыщение частоты и нормировка по длине как в BM25 (k1=1.2, b=0.75)
+            self.postings[term] = {
+                doc: idf * tf * 2.2 / (tf + 1.2 * (0.25 + 0.75 * lengths[doc] / avg_length))
+                for doc, tf in docs.items()
+            }
+
+    def search(self, query: str, limit: int = 20) -> Tuple[List[Course], List[Teacher]]:
+        """
+        Ищет курсы и преподавателей по запросу.
+
+        Args:
+            query: Поисковый запрос
+            limit: Максимальное число результатов каждого типа
+
+        Returns:
+            Tuple[List[Course], List[Teacher]]: Курсы и преподаватели
+            в порядке убывания релевантности
+        """
+        scores: Dict[Tuple[str, int], float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            for doc, weight in self.postings.get(term, {}).items():
+                scores[doc] += weight
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        courses = [self.courses[i] for (kind, i), _ in ranked if kind == "course"][:limit]
+        teachers = [self.teachers[i] for (kind, i), _ in ranked if kind == "teacher"][:limit]
+        return courses, teachers
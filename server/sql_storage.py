@@ -0,0 +1,267 @@
+"""
+Хранилище данных в базе данных для Backend онлайн школы S2S.
+
+Этот модуль предоставляет класс SqlStorage, который хранит пользователей,
+заявки и контактные формы в базе данных из DATABASE_URL. В отличие от
+MemStorage, данные видны всем воркерам uvicorn, поэтому приложение
+можно масштабировать на несколько процессов и серверов.
+"""
+
+from typing import List, Optional
+from uuid import UUID
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+
+from server.crud import after_key, create_contact_form
+from server.database import async_session
+from server.models import ApplicationDB, ContactFormDB, UserDB
+from server.pagination import Keyset
+from server.schemas import (
+    User, InsertUser,
+    Application, InsertApplication,
+    ContactForm, InsertContactForm,
+)
+from server.storage import BaseStorage, UsernameTakenError
+
+
+def _parse_uuid(value: str) -> Optional[UUID]:
+    """
+    Преобразует строку в UUID, возвращая None для некорректных значений.
+    """
+    try:
+        return UUID(value)
+    except Exception:
+        return None
+
+
+class SqlStorage(BaseStorage):
+    """
+    Хранилище пользователей, заявок и контактных форм в базе данных.
+
+    Курсы и преподаватели, как и в MemStorage, загружаются из JSON
+    файлов в память. Уникальность имени пользователя обеспечивается
+    уникальным индексом, поэтому одновременные запросы с одним
+    именем не создадут дубликат.
+    """
+
+    # Методы пользователей
+    async def getUser(self, user_id: str) -> Optional[User]:
+        """
+        Получает пользователя по ID.
+
+        Args:
+            user_id: Строковый ID пользователя
+
+        Returns:
+            Optional[User]: Пользователь или None, если не найден
+        """
+        uid = _parse_uuid(user_id)
+        if uid is None:
+            return None
+        async with async_session() as db:
+            row = await db.get(UserDB, uid)
+        return User.model_validate(row, from_attributes=True) if row else None
+
+    async def getUsersByIds(self, user_ids: List[UUID]) -> List[User]:
+        """
+        Получает пользователей по списку ID одним запросом с IN.
+
+        Args:
+            user_ids: ID пользователей
+
+        Returns:
+            List[User]: Найденные пользователи в порядке ID (ненайденные пропускаются)
+        """
+        if not user_ids:
+            return []
+        async with async_session() as db:
+            rows = (await db.execute(select(UserDB).where(UserDB.id.in_(user_ids)))).scalars().all()
+        by_id = {row.id: row for row in rows}
+        return [User.model_validate(by_id[uid], from_attributes=True) for uid in user_ids if uid in by_id]
+
+    async def getUserByUsername(self, username: str) -> Optional[User]:
+        """
+        Получает пользователя по имени пользователя.
+
+        Args:
+            username: Имя пользователя для поиска
+
+        Returns:
+            Optional[User]: Пользователь или None, если не найден
+        """
+        async with async_session() as db:
+            row = (await db.execute(select(UserDB).where(UserDB.username == username))).scalar_one_or_none()
+        return User.model_validate(row, from_attributes=True) if row else None
+
+    async def getUsers(self) -> List[User]:
+        """
+        Получает список всех пользователей.
+
+        Returns:
+            List[User]: Список всех пользователей
+        """
+        async with async_session() as db:
+            rows = (await db.execute(select(UserDB).order_by(UserDB.created_at, UserDB.id))).scalars().all()
+        return [User.model_validate(row, from_attributes=True) for row in rows]
+
+    async def listUsers(self, after: Optional[Keyset], limit: int) -> List[User]:
+        """
+        Получает страницу пользователей в порядке создания.
+
+        Запрос использует условие по (created_at, id) вместо OFFSET,
+        поэтому стоимость страницы не зависит от ее номера.
+
+        Args:
+            after: Ключ (created_at, id) последнего пользователя предыдущей страницы
+            limit: Максимальное число пользователей
+
+        Returns:
+            List[User]: Пользователи после ключа
+        """
+        stmt = (
+            select(UserDB)
+            .where(after_key(UserDB, after))
+            .order_by(UserDB.created_at, UserDB.id)
+            .limit(limit)
+        )
+        async with async_session() as db:
+            rows = (await db.execute(stmt)).scalars().all()
+        return [User.model_validate(row, from_attributes=True) for row in rows]
+
+    async def createUser(self, insert_user: InsertUser) -> User:
+        """
+        Создает нового пользователя.
+
+        Args:
+            insert_user: Данные для создания пользователя
+
+        Returns:
+            User: Созданный пользователь с новым UUID
+
+        Raises:
+            UsernameTakenError: Если имя пользователя уже занято
+        """
+        stmt = insert(UserDB).values(**insert_user.model_dump()).returning(UserDB)
+        async with async_session() as db:
+            try:
+                row = (await db.execute(stmt)).scalar_one()
+                await db.commit()
+            except IntegrityError:
+                await db.rollback()
+                raise UsernameTakenError(insert_user.username)
+        return User.model_validate(row, from_attributes=True)
+
+    # Методы заявок
+    async def createApplication(self, insert_application: InsertApplication) -> Application:
+        """
+        Создает новую заявку на курс.
+
+        Args:
+            insert_application: Данные для создания заявки
+
+        Returns:
+            Application: Созданная заявка с новым UUID и временной меткой
+        """
+        stmt = insert(ApplicationDB).values(**insert_application.model_dump()).returning(ApplicationDB)
+        async with async_session() as db:
+            row = (await db.execute(stmt)).scalar_one()
+            await db.commit()
+        return Application.model_validate(row, from_attributes=True)
+
+    async def createApplications(self, insert_applications: List[InsertApplication]) -> List[Application]:
+        """
+        Создает пакет заявок одним INSERT в одной транзакции.
+
+        Args:
+            insert_applications: Данные для создания заявок
+
+        Returns:
+            List[Application]: Созданные заявки в порядке пакета
+        """
+        if not insert_applications:
+            return []
+        stmt = insert(ApplicationDB).returning(ApplicationDB, sort_by_parameter_order=True)
+        async with async_session() as db:
+            rows = (await db.execute(stmt, [item.model_dump() for item in insert_applications])).scalars().all()
+            await db.commit()
+        return [Application.model_validate(row, from_attributes=True) for row in rows]
+
+    async def getApplications(self) -> List[Application]:
+        """
+        Получает список всех заявок.
+
+        Returns:
+            List[Application]: Список всех заявок
+        """
+        async with async_session() as db:
+            rows = (await db.execute(
+                select(ApplicationDB).order_by(ApplicationDB.created_at, ApplicationDB.id)
+            )).scalars().all()
+        return [Application.model_validate(row, from_attributes=True) for row in rows]
+
+    async def listApplications(self, after: Optional[Keyset], limit: int) -> List[Application]:
+        """
+        Получает страницу заявок в порядке создания.
+
+        Args:
+            after: Ключ (created_at, id) последней заявки предыдущей страницы
+            limit: Максимальное число заявок
+
+        Returns:
+            List[Application]: Заявки после ключа
+        """
+        stmt = (
+            select(ApplicationDB)
+            .where(after_key(ApplicationDB, after))
+            .order_by(ApplicationDB.created_at, ApplicationDB.id)
+            .limit(limit)
+        )
+        async with async_session() as db:
+            rows = (await db.execute(stmt)).scalars().all()
+        return [Application.model_validate(row, from_attributes=True) for row in rows]
+
+    async def getApplication(self, application_id: str) -> Optional[Application]:
+        """
+        Получает заявку по ID.
+
+        Args:
+            application_id: Строковый ID заявки
+
+        Returns:
+            Optional[Application]: Заявка или None, если не найдена
+        """
+        aid = _parse_uuid(application_id)
+        if aid is None:
+            return None
+        async with async_session() as db:
+            row = await db.get(ApplicationDB, aid)
+        return Application.model_validate(row, from_attributes=True) if row else None
+
+    # Методы контактной формы
+    async def createContactForm(self, insert_contact_form: InsertContactForm) -> ContactForm:
+        """
+        Создает новую контактную форму.
+
+        Args:
+            insert_contact_form: Данные контактной формы
+
+        Returns:
+            ContactForm: Созданная контактная форма с новым UUID
+        """
+        async with async_session() as db:
+            row = await create_contact_form(db, insert_contact_form)
+        return ContactForm.model_validate(row, from_attributes=True)
+
+    async def getContactForms(self) -> List[ContactForm]:
+        """
+        Получает список всех контактных форм.
+
+        Returns:
+            List[ContactForm]: Список всех контактных форм
+        """
+        async with async_session() as db:
+            rows = (await db.execute(
+                select(ContactFormDB).order_by(ContactFormDB.created_at, ContactFormDB.id)
+            )).scalars().all()
+        return [ContactForm.model_validate(row, from_attributes=True) for row in rows]
@@ -1,113 +1,124 @@
 """
-Хранилище данных в памяти для Backend онлайн школы S2S.
+Хранилище данных для Backend онлайн школы S2S.
 
-Этот модуль предоставляет класс MemStorage для хранения данных в памяти
-с загрузкой курсов и преподавателей из JSON файлов.
+Этот модуль предоставляет интерфейс хранилища BaseStorage, реализацию
+MemStorage для хранения данных в памяти, фабрику create_storage,
+которая выбирает реализацию по настройке STORAGE_BACKEND, и ленивый
+доступ к единственному экземпляру get_storage. Курсы
+и преподаватели во всех реализациях загружаются из JSON файлов.
 """
 
+import asyncio
+import logging
+from abc import ABC, abstractmethod
 from typing import List, Optional, Dict
 from uuid import UUID, uuid4
 from datetime import datetime, timezone
-import json
 from pathlib import Path
+from threading import Lock
 
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from server.catalog import Catalog
+from server.catalog_snapshot import load_startup_catalog
+from server.pagination import Keyset, KeysetIndex
+from server.persistence import StorageJournal
+from server.responses import CachedPayload
 from server.schemas import (
     User, InsertUser,
-    Teacher, Course,
+    Teacher, Course, CourseQueryResult, SearchResults, Suggestion,
     Application, InsertApplication,
     ContactForm, InsertContactForm
 )
 
 
-# Константы для путей к файлам данных
-DATA_DIR = Path(__file__).parent
-COURSES_FILE = DATA_DIR / "courses.json"
-TEACHERS_FILE = DATA_DIR / "teachers.json"
+logger = logging.getLogger(__name__)
 
 
-class MemStorage:
+class StorageSettings(BaseSettings):
     """
-    Хранилище данных в памяти для быстрого доступа к данным.
+    Настройки хранилища данных.
     
-    Загружает курсы и преподавателей из JSON файлов при инициализации
-    и хранит пользователей, заявки и контактные формы в памяти.
+    Attributes:
+        STORAGE_BACKEND: Реализация хранилища пользователей и заявок:
+            memory - в памяти процесса (только для одного воркера),
+            sql - в базе данных из DATABASE_URL (общая для всех воркеров)
+        STORAGE_PERSIST_DIR: Каталог журнала и снимков MemStorage
+            (если не задан, данные MemStorage не сохраняются)
+        STORAGE_FSYNC: Политика fsync журнала: always, interval или never
+        STORAGE_FSYNC_INTERVAL: Максимальный интервал между fsync (сек) для политики interval
+        STORAGE_SNAPSHOT_EVERY: Через сколько записей журнала делать снимок
+    """
+    STORAGE_BACKEND: str = "memory"
+    STORAGE_PERSIST_DIR: Optional[str] = None
+    STORAGE_FSYNC: str = "interval"
+    STORAGE_FSYNC_INTERVAL: float = 1.0
+    STORAGE_SNAPSHOT_EVERY: int = 10000
+
+    # Конфигурация для загрузки настроек из .env файла
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+
+
+class UsernameTakenError(ValueError):
+    """
+    Имя пользователя уже занято.
+    
+    Выбрасывается createUser, если пользователь с таким именем
+    уже существует (в том числе при гонке двух одновременных запросов).
+    """
+
+
+def _aware(key: Optional[Keyset]) -> Optional[Keyset]:
+    """
+    Приводит время в ключе курсора к UTC, если оно без часового пояса.
+    
+    В памяти время создания всегда хранится с часовым поясом,
+    а сравнение с "наивным" datetime вызвало бы TypeError.
+    """
+    if key is None or key[0].tzinfo is not None:
+        return key
+    return key[0].replace(tzinfo=timezone.utc), key[1]
+
+
+class BaseStorage(ABC):
+    """
+    Базовый класс хранилища данных.
+    
+    Держит текущий снимок каталога курсов и преподавателей (Catalog)
+    со всеми индексами. Методы каталога читают ссылку на снимок один раз,
+    поэтому его подмена при перезагрузке файлов безопасна для запросов.
+    Хранение пользователей, заявок и контактных форм реализуется
+    в подклассах.
     """
     
     def __init__(self):
         """
-        Инициализирует хранилище и загружает данные из JSON файлов.
+        Инициализирует хранилище и загружает каталог.
         
-        Создает словари для хранения данных в памяти и загружает
-        курсы и преподавателей из соответствующих JSON файлов.
+        Каталог берется из бинарного снимка, если он собран для текущих
+        JSON файлов, иначе загружается из JSON с полной валидацией.
         """
-        # Словари для хранения в памяти
-        self.users: Dict[UUID, User] = {}
-        self.applications: Dict[UUID, Application] = {}
-        self.courses: List[Course] = []
-        self.teachers: List[Teacher] = []
-        self.contact_forms: Dict[UUID, ContactForm] = {}
-        self._load_data()
+        self.catalog: Catalog = load_startup_catalog()
 
-    def _load_data(self):
-        """
-        Загружает данные курсов и преподавателей из JSON файлов.
-        
-        Читает файлы courses.json и teachers.json, парсит JSON
-        и создает объекты Pydantic моделей для валидации данных.
-        """
-        # Загрузка курсов из JSON
-        with open(COURSES_FILE, encoding="utf-8") as f:
-            courses_raw = json.load(f)
-        self.courses = [Course.model_validate(c) for c in courses_raw]
+    @property
+    def courses(self) -> List[Course]:
+        return self.catalog.courses
 
-        # Загрузка учителей из JSON
-        with open(TEACHERS_FILE, encoding="utf-8") as f:
-            teachers_raw = json.load(f)
-        self.teachers = [Teacher.model_validate(t) for t in teachers_raw]
+    @property
+    def teachers(self) -> List[Teacher]:
+        return self.catalog.teachers
 
-    # Методы пользователей
-    async def getUser(self, user_id: str) -> Optional[User]:
+    def swapCatalog(self, catalog: Catalog):
         """
-        Получает пользователя по ID.
-        
-        Args:
-            user_id: Строковый ID пользователя
-            
-        Returns:
-            Optional[User]: Пользователь или None, если не найден
-        """
-        try:
-            uid = UUID(user_id)
-        except Exception:
-            return None
-        return self.users.get(uid)
+        Подменяет снимок каталога.
 
-    async def getUserByUsername(self, username: str) -> Optional[User]:
-        """
-        Получает пользователя по имени пользователя.
-        
-        Args:
-            username: Имя пользователя для поиска
-            
-        Returns:
-            Optional[User]: Пользователь или None, если не найден
-        """
-        return next((u for u in self.users.values() if u.username == username), None)
+        Подмена - одно присваивание ссылки, поэтому каждый запрос видит
+        либо старый, либо новый каталог целиком, без смеси индексов.
 
-    async def createUser(self, insert_user: InsertUser) -> User:
-        """
-        Создает нового пользователя.
-        
         Args:
-            insert_user: Данные для создания пользователя
-            
-        Returns:
-            User: Созданный пользователь с новым UUID
+            catalog: Новый снимок каталога с построенными индексами
         """
-        user_id = uuid4()
-        user = User(id=user_id, **insert_user.model_dump())
-        self.users[user_id] = user
-        return user
+        self.catalog = catalog
 
     # Методы курсов
     async def getCourses(self) -> List[Course]:
@@ -117,7 +128,7 @@ class MemStorage:
         Returns:
             List[Course]: Список всех курсов
         """
-        return self.courses
+        return self.catalog.courses
 
     async def getCourse(self, course_id: str) -> Optional[Course]:
         """
@@ -133,7 +144,20 @@ class MemStorage:
             cid = UUID(course_id)
         except Exception:
             return None
-        return next((c for c in self.courses if c.id == cid), None)
+        return self.catalog.courses_by_id.get(cid)
+
+    async def getCoursesByIds(self, course_ids: List[UUID]) -> List[Course]:
+        """
+        Получает курсы по списку ID через индекс первичного ключа.
+        
+        Args:
+            course_ids: ID курсов
+            
+        Returns:
+            List[Course]: Найденные курсы в порядке ID (ненайденные пропускаются)
+        """
+        index = self.catalog.courses_by_id
+        return [index[cid] for cid in course_ids if cid in index]
 
     async def getCoursesByCategory(self, category: str) -> List[Course]:
         """
@@ -145,7 +169,7 @@ class MemStorage:
         Returns:
             List[Course]: Список курсов указанной категории
         """
-        return [c for c in self.courses if c.category == category]
+        return self.catalog.courses_by_category.get(category, [])
 
     async def getCoursesBySubject(self, subject: str) -> List[Course]:
         """
@@ -157,7 +181,69 @@ class MemStorage:
         Returns:
             List[Course]: Список курсов указанного предмета
         """
-        return [c for c in self.courses if c.subject == subject]
+        return self.catalog.courses_by_subject.get(subject, [])
+
+    async def getCoursesPayload(self) -> CachedPayload:
+        """
+        Получает закодированный список всех курсов.
+
+        Returns:
+            CachedPayload: JSON список курсов и его ETag
+        """
+        return self.catalog.courses_payload()
+
+    async def getCoursesByCategoryPayload(self, category: str) -> CachedPayload:
+        """
+        Получает закодированный список курсов категории.
+
+        Args:
+            category: Категория курсов
+
+        Returns:
+            CachedPayload: JSON список курсов и его ETag
+        """
+        return self.catalog.category_payload(category)
+
+    async def getCoursesBySubjectPayload(self, subject: str) -> CachedPayload:
+        """
+        Получает закодированный список курсов предмета.
+
+        Args:
+            subject: Предмет курсов
+
+        Returns:
+            CachedPayload: JSON список курсов и его ETag
+        """
+        return self.catalog.subject_payload(subject)
+
+    async def queryCourses(
+        self,
+        subjects: Optional[List[str]] = None,
+        categories: Optional[List[str]] = None,
+        grade: Optional[int] = None,
+        popular: Optional[bool] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        sort: Optional[str] = None,
+    ) -> CourseQueryResult:
+        """
+        Получает курсы по комбинации фильтров с сортировкой и фасетами.
+        
+        Args:
+            subjects: Предметы (любой из)
+            categories: Категории (любая из)
+            grade: Класс ученика
+            popular: Фильтр по популярности
+            min_price: Минимальная текущая цена
+            max_price: Максимальная текущая цена
+            sort: Порядок сортировки (price, -price, lessons, -lessons)
+            
+        Returns:
+            CourseQueryResult: Курсы, их число и фасеты по предметам и категориям
+        """
+        return self.catalog.course_query_index.query(
+            subjects, categories, grade, popular, min_price, max_price, sort,
+        )
 
     # Методы учителей
     async def getTeachers(self) -> List[Teacher]:
@@ -167,7 +253,26 @@ class MemStorage:
         Returns:
             List[Teacher]: Список всех преподавателей
         """
-        return self.teachers
+        return self.catalog.teachers
+
+    async def getTeachersPayload(self) -> CachedPayload:
+        """
+        Получает закодированный список всех преподавателей.
+
+        Returns:
+            CachedPayload: JSON список преподавателей и его ETag
+        """
+        return self.catalog.teachers_payload()
+
+    async def getLandingPayload(self) -> CachedPayload:
+        """
+        Получает закодированные и сжатые данные главной страницы.
+
+        Returns:
+            CachedPayload: JSON курсов, преподавателей, популярных курсов
+                и групп по предметам со сжатыми вариантами и ETag
+        """
+        return self.catalog.landing_payload()
 
     async def getTeacher(self, teacher_id: str) -> Optional[Teacher]:
         """
@@ -183,7 +288,358 @@ class MemStorage:
             tid = UUID(teacher_id)
         except Exception:
             return None
-        return next((t for t in self.teachers if t.id == tid), None)
+        return self.catalog.teachers_by_id.get(tid)
+
+    async def getTeachersByIds(self, teacher_ids: List[UUID]) -> List[Teacher]:
+        """
+        Получает преподавателей по списку ID через индекс первичного ключа.
+        
+        Args:
+            teacher_ids: ID преподавателей
+            
+        Returns:
+            List[Teacher]: Найденные преподаватели в порядке ID (ненайденные пропускаются)
+        """
+        index = self.catalog.teachers_by_id
+        return [index[tid] for tid in teacher_ids if tid in index]
+
+    async def searchCatalog(self, query: str, limit: int = 20) -> SearchResults:
+        """
+        Ищет курсы и преподавателей по тексту запроса.
+        
+        Args:
+            query: Поисковый запрос
+            limit: Максимальное число результатов каждого типа
+            
+        Returns:
+            SearchResults: Курсы и преподаватели по убыванию релевантности
+        """
+        courses, teachers = self.catalog.search_index.search(query, limit)
+        return SearchResults(courses=courses, teachers=teachers)
+
+    async def getSuggestions(self, query: str, limit: int = 10) -> List[Suggestion]:
+        """
+        Получает подсказки автодополнения по началу названия или имени.
+        
+        Args:
+            query: Введенный пользователем текст (возможно, с опечатками)
+            limit: Максимальное число подсказок
+            
+        Returns:
+            List[Suggestion]: Подсказки по курсам и преподавателям
+        """
+        return self.catalog.autocomplete_index.suggest(query, limit)
+
+    async def close(self):
+        """
+        Освобождает ресурсы хранилища при остановке приложения.
+        """
+
+    # Методы пользователей
+    @abstractmethod
+    async def getUser(self, user_id: str) -> Optional[User]:
+        """Получает пользователя по ID."""
+
+    @abstractmethod
+    async def getUsersByIds(self, user_ids: List[UUID]) -> List[User]:
+        """Получает найденных пользователей из списка ID в порядке ID."""
+
+    @abstractmethod
+    async def getUserByUsername(self, username: str) -> Optional[User]:
+        """Получает пользователя по имени пользователя."""
+
+    @abstractmethod
+    async def getUsers(self) -> List[User]:
+        """Получает список всех пользователей."""
+
+    @abstractmethod
+    async def listUsers(self, after: Optional[Keyset], limit: int) -> List[User]:
+        """Получает до limit пользователей после ключа (created_at, id)."""
+
+    @abstractmethod
+    async def createUser(self, insert_user: InsertUser) -> User:
+        """
+        Создает нового пользователя.
+        
+        Raises:
+            UsernameTakenError: Если имя пользователя уже занято
+        """
+
+    # Методы заявок
+    @abstractmethod
+    async def createApplication(self, insert_application: InsertApplication) -> Application:
+        """Создает новую заявку на курс."""
+
+    @abstractmethod
+    async def createApplications(self, insert_applications: List[InsertApplication]) -> List[Application]:
+        """Создает пакет заявок целиком (все или ни одной) в порядке пакета."""
+
+    @abstractmethod
+    async def getApplications(self) -> List[Application]:
+        """Получает список всех заявок."""
+
+    @abstractmethod
+    async def listApplications(self, after: Optional[Keyset], limit: int) -> List[Application]:
+        """Получает до limit заявок после ключа (created_at, id)."""
+
+    @abstractmethod
+    async def getApplication(self, application_id: str) -> Optional[Application]:
+        """Получает заявку по ID."""
+
+    # Методы контактной формы
+    @abstractmethod
+    async def createContactForm(self, insert_contact_form: InsertContactForm) -> ContactForm:
+        """Создает новую контактную форму."""
+
+    @abstractmethod
+    async def getContactForms(self) -> List[ContactForm]:
+        """Получает список всех контактных форм."""
+
+
+class MemStorage(BaseStorage):
+    """
+    Хранилище данных в памяти для быстрого доступа к данным.
+    
+    Загружает курсы и преподавателей из JSON файлов при инициализации
+    и хранит пользователей, заявки и контактные формы в памяти.
+    Данные видны только текущему процессу, поэтому при нескольких
+    воркерах uvicorn нужно использовать SqlStorage.
+    
+    Если передан журнал, каждое создание записи дописывается в него,
+    а при инициализации состояние восстанавливается из снимка и журнала.
+    """
+    
+    def __init__(self, journal: Optional[StorageJournal] = None):
+        """
+        Инициализирует хранилище и загружает данные из JSON файлов.
+        
+        Создает словари для хранения данных в памяти и загружает
+        курсы и преподавателей из соответствующих JSON файлов.
+        
+        Args:
+            journal: Журнал для сохранения данных между перезапусками
+        """
+        # Словари для хранения в памяти
+        self.users: Dict[UUID, User] = {}
+        self.applications: Dict[UUID, Application] = {}
+        self.contact_forms: Dict[UUID, ContactForm] = {}
+
+        # Индекс для поиска пользователя по имени за O(1)
+        self.users_by_username: Dict[str, User] = {}
+
+        # Отсортированные по (created_at, id) ключи для keyset пагинации
+        self.user_keys = KeysetIndex()
+        self.application_keys = KeysetIndex()
+        super().__init__()
+
+        self.journal = journal
+        # Фоновые задачи журнала: запись снимка и периодический fsync
+        self._snapshot_task: Optional[asyncio.Task] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        if journal is not None:
+            self._replay(journal)
+
+    def _store_user(self, user: User):
+        # Запись может встретиться дважды (в снимке и в отложенном журнале)
+        if user.id not in self.users:
+            self.user_keys.add((user.created_at, user.id))
+        self.users[user.id] = user
+        self.users_by_username[user.username] = user
+
+    def _store_application(self, application: Application):
+        if application.id not in self.applications:
+            self.application_keys.add((application.created_at, application.id))
+        self.applications[application.id] = application
+
+    def _store_contact_form(self, form: ContactForm):
+        self.contact_forms[form.id] = form
+
+    def _replay(self, journal: StorageJournal):
+        """
+        Восстанавливает пользователей, заявки и контактные формы из журнала.
+        """
+        loaders = {
+            "user": (User, self._store_user),
+            "application": (Application, self._store_application),
+            "contact_form": (ContactForm, self._store_contact_form),
+        }
+        for kind, data in journal.replay():
+            model, store = loaders[kind]
+            store(model.model_validate(data))
+
+    @staticmethod
+    def _journal_records(users: List[User], applications: List[Application], forms: List[ContactForm]):
+        """
+        Перечисляет записи хранилища для снимка.
+        """
+        for user in users:
+            yield "user", user.model_dump(mode="json")
+        for application in applications:
+            yield "application", application.model_dump(mode="json")
+        for form in forms:
+            yield "contact_form", form.model_dump(mode="json")
+
+    async def _persist(self, kind: str, record):
+        """
+        Дописывает созданную запись в журнал и при необходимости запускает снимок.
+
+        fsync (при политике always) выполняется в отдельном потоке,
+        и ответ возвращается только после него; снимок пишется
+        в фоне и не задерживает запрос.
+        """
+        if self.journal is None:
+            return
+        self.journal.append(kind, record.model_dump(mode="json"))
+        await self._after_append()
+
+    async def _after_append(self):
+        """
+        Запускает снимок и fsync по политике после записи в журнал.
+
+        Вызывается после того, как записи уже добавлены в память,
+        чтобы снимок их учитывал.
+        """
+        journal = self.journal
+        if journal.needs_snapshot:
+            self._start_snapshot()
+        if journal.fsync == "always":
+            await asyncio.to_thread(journal.sync)
+        elif journal.fsync == "interval" and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.create_task(self._flush_periodically())
+
+    def _start_snapshot(self):
+        """
+        Снимает состояние и запускает запись снимка в отдельном потоке.
+
+        Копируются только списки ссылок на (неизменяемые) записи,
+        а кодирование, запись и fsync снимка идут вне event loop.
+        """
+        if self._snapshot_task is not None and not self._snapshot_task.done():
+            return
+        records = self._journal_records(
+            list(self.users.values()), list(self.applications.values()), list(self.contact_forms.values()),
+        )
+        self.journal.rotate()
+        self._snapshot_task = asyncio.create_task(self._write_snapshot(records))
+
+    async def _write_snapshot(self, records):
+        try:
+            await asyncio.to_thread(self.journal.snapshot, records)
+        except Exception:
+            # Отложенный журнал остается на диске и будет учтен следующим снимком
+            logger.exception("Не удалось записать снимок хранилища")
+
+    async def _flush_periodically(self):
+        """
+        Сбрасывает хвост журнала на диск не реже раза в fsync_interval секунд.
+        """
+        journal = self.journal
+        while True:
+            await asyncio.sleep(journal.fsync_interval)
+            if journal.unsynced:
+                try:
+                    await asyncio.to_thread(journal.sync)
+                except Exception:
+                    logger.exception("Не удалось сбросить журнал хранилища на диск")
+
+    async def close(self):
+        """
+        Дожидается записи снимка и сбрасывает журнал на диск при остановке приложения.
+        """
+        if self.journal is None:
+            return
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        if self._snapshot_task is not None:
+            await self._snapshot_task
+            self._snapshot_task = None
+        await asyncio.to_thread(self.journal.close)
+
+    # Методы пользователей
+    async def getUser(self, user_id: str) -> Optional[User]:
+        """
+        Получает пользователя по ID.
+        
+        Args:
+            user_id: Строковый ID пользователя
+            
+        Returns:
+            Optional[User]: Пользователь или None, если не найден
+        """
+        try:
+            uid = UUID(user_id)
+        except Exception:
+            return None
+        return self.users.get(uid)
+
+    async def getUsersByIds(self, user_ids: List[UUID]) -> List[User]:
+        """
+        Получает пользователей по списку ID.
+        
+        Args:
+            user_ids: ID пользователей
+            
+        Returns:
+            List[User]: Найденные пользователи в порядке ID (ненайденные пропускаются)
+        """
+        users = self.users
+        return [users[uid] for uid in user_ids if uid in users]
+
+    async def getUserByUsername(self, username: str) -> Optional[User]:
+        """
+        Получает пользователя по имени пользователя.
+        
+        Args:
+            username: Имя пользователя для поиска
+            
+        Returns:
+            Optional[User]: Пользователь или None, если не найден
+        """
+        return self.users_by_username.get(username)
+
+    async def getUsers(self) -> List[User]:
+        """
+        Получает список всех пользователей.
+        
+        Returns:
+            List[User]: Список всех пользователей
+        """
+        return list(self.users.values())
+
+    async def listUsers(self, after: Optional[Keyset], limit: int) -> List[User]:
+        """
+        Получает страницу пользователей в порядке создания.
+        
+        Args:
+            after: Ключ (created_at, id) последнего пользователя предыдущей страницы
+            limit: Максимальное число пользователей
+            
+        Returns:
+            List[User]: Пользователи после ключа
+        """
+        return [self.users[uid] for _, uid in self.user_keys.after(_aware(after), limit)]
+
+    async def createUser(self, insert_user: InsertUser) -> User:
+        """
+        Создает нового пользователя.
+        
+        Args:
+            insert_user: Данные для создания пользователя
+            
+        Returns:
+            User: Созданный пользователь с новым UUID
+            
+        Raises:
+            UsernameTakenError: Если имя пользователя уже занято
+        """
+        if insert_user.username in self.users_by_username:
+            raise UsernameTakenError(insert_user.username)
+        user_id = uuid4()
+        user = User(id=user_id, created_at=datetime.now(timezone.utc), **insert_user.model_dump())
+        self._store_user(user)
+        await self._persist("user", user)
+        return user
 
     # Методы заявок
     async def createApplication(self, insert_application: InsertApplication) -> Application:
@@ -204,9 +660,39 @@ class MemStorage:
             course_id=insert_application.course_id,
             created_at=now,
         )
-        self.applications[application_id] = app_obj
+        self._store_application(app_obj)
+        await self._persist("application", app_obj)
         return app_obj
 
+    async def createApplications(self, insert_applications: List[InsertApplication]) -> List[Application]:
+        """
+        Создает пакет заявок на курсы.
+        
+        Все заявки пакета получают одну временную метку и добавляются
+        без переключения event loop, поэтому другие запросы видят либо
+        весь пакет, либо ни одной его заявки. В журнал пакет пишется
+        одной записью в файл с одним fsync.
+        
+        Args:
+            insert_applications: Данные для создания заявок
+            
+        Returns:
+            List[Application]: Созданные заявки в порядке пакета
+        """
+        now = datetime.now(timezone.utc)
+        applications = [
+            Application(id=uuid4(), user_id=item.user_id, course_id=item.course_id, created_at=now)
+            for item in insert_applications
+        ]
+        # Пачка пишется в журнал до изменения индексов: ошибка записи не оставит часть пакета
+        if self.journal is not None:
+            self.journal.append_many("application", [a.model_dump(mode="json") for a in applications])
+        for app_obj in applications:
+            self._store_application(app_obj)
+        if self.journal is not None:
+            await self._after_append()
+        return applications
+
     async def getApplications(self) -> List[Application]:
         """
         Получает список всех заявок.
@@ -216,6 +702,19 @@ class MemStorage:
         """
         return list(self.applications.values())
 
+    async def listApplications(self, after: Optional[Keyset], limit: int) -> List[Application]:
+        """
+        Получает страницу заявок в порядке создания.
+        
+        Args:
+            after: Ключ (created_at, id) последней заявки предыдущей страницы
+            limit: Максимальное число заявок
+            
+        Returns:
+            List[Application]: Заявки после ключа
+        """
+        return [self.applications[aid] for _, aid in self.application_keys.after(_aware(after), limit)]
+
     async def getApplication(self, application_id: str) -> Optional[Application]:
         """
         Получает заявку по ID.
@@ -245,7 +744,8 @@ class MemStorage:
         """
         form_id = uuid4()
         form_obj = ContactForm(id=form_id, **insert_contact_form.model_dump())
-        self.contact_forms[form_id] = form_obj
+        self._store_contact_form(form_obj)
+        await self._persist("contact_form", form_obj)
         return form_obj
 
     async def getContactForms(self) -> List[ContactForm]:
@@ -258,5 +758,54 @@ class MemStorage:
         return list(self.contact_forms.values())
 
 
-# Создаем единственный экземпляр хранилища для использования во всем приложении
-storage = MemStorage()
+def create_storage() -> BaseStorage:
+    """
+    Создает хранилище в соответствии с настройкой STORAGE_BACKEND.
+    
+    Returns:
+        BaseStorage: MemStorage или SqlStorage
+        
+    Raises:
+        ValueError: Если указана неизвестная реализация хранилища
+    """
+    settings = StorageSettings()
+    backend = settings.STORAGE_BACKEND.lower()
+    if backend == "memory":
+        journal = None
+        if settings.STORAGE_PERSIST_DIR:
+            journal = StorageJournal(
+                Path(settings.STORAGE_PERSIST_DIR),
+                fsync=settings.STORAGE_FSYNC,
+                fsync_interval=settings.STORAGE_FSYNC_INTERVAL,
+                snapshot_every=settings.STORAGE_SNAPSHOT_EVERY,
+            )
+        return MemStorage(journal=journal)
+    if backend == "sql":
+        # Импорт внутри функции, чтобы MemStorage не зависел от базы данных
+        from server.sql_storage import SqlStorage
+        return SqlStorage()
+    raise ValueError(f"Неизвестное хранилище STORAGE_BACKEND={backend}")
+
+
+# Единственный экземпляр хранилища, создается при первом обращении
+_storage: Optional[BaseStorage] = None
+_storage_lock = Lock()
+
+
+def get_storage() -> BaseStorage:
+    """
+    Возвращает хранилище приложения, создавая его при первом обращении.
+    
+    Обычно хранилище создается при старте в lifespan, поэтому импорт
+    модулей не загружает каталог. Блокировка защищает от создания
+    двух экземпляров, если запрос пришел во время старта.
+    
+    Returns:
+        BaseStorage: Хранилище данных
+    """
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                _storage = create_storage()
+    return _storage
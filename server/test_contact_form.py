@@ -1,9 +1,25 @@
 from uuid import UUID
+
+import pytest
 from fastapi.testclient import TestClient
 from main import app  # импорт вашего FastAPI приложения
+from server.admin import admin_settings
+from server.database import Base, get_engine, get_session_factory
+from server.models import ContactFormDB
+from server.rate_limit import TokenBuckets, get_rate_limiter
+from server.readiness import readiness
 
+# Клиент без lifespan: схема создается здесь, хранилище - при первом запросе
+Base.metadata.create_all(bind=get_engine())
 client = TestClient(app)
 
+
+@pytest.fixture
+def admin_headers(monkeypatch):
+    monkeypatch.setattr(admin_settings, "ADMIN_TOKEN", "secret")
+    return {"X-Admin-Token": "secret"}
+
+
 def test_create_contact_form():
     response = client.post(
         "/api/contact_form",
@@ -82,6 +98,50 @@ def test_get_course_not_found():
     response = client.get(f"/api/courses/{invalid_id}")
     assert response.status_code == 404
 
+def test_batch_endpoints_report_missing_ids():
+    courses = client.get("/api/courses").json()
+    teachers = client.get("/api/teachers").json()
+    user = client.post("/api/users", json={"username": "batch_user", "full_name": None}).json()
+    unknown = "00000000-0000-0000-0000-000000000000"
+
+    for path, records in (("courses", courses[:3]), ("teachers", teachers[:2]), ("users", [user])):
+        ids = [unknown] + [r["id"] for r in reversed(records)]
+        response = client.post(f"/api/{path}/batch", json={"ids": ids + ids[1:2]})
+        assert response.status_code == 200
+        body = response.json()
+        assert [r["id"] for r in body["items"]] == ids[1:]
+        assert body["missing"] == [unknown]
+
+    assert client.post("/api/courses/batch", json={"ids": []}).status_code == 422
+
+def test_bulk_applications_atomic_and_partial():
+    course_ids = [c["id"] for c in client.get("/api/courses").json()[:2]]
+    user = client.post("/api/users", json={"username": "bulk_user", "full_name": None}).json()
+    unknown = "00000000-0000-0000-0000-000000000000"
+    items = [
+        {"user_id": user["id"], "course_id": course_ids[0]},
+        {"user_id": unknown, "course_id": course_ids[0]},
+        {"user_id": user["id"], "course_id": unknown},
+        {"user_id": user["id"], "course_id": course_ids[1]},
+    ]
+
+    response = client.post("/api/applications/bulk", json={"items": items})
+    assert response.status_code == 400
+    body = response.json()
+    assert body["created"] == 0
+    assert [item["error"] for item in body["items"]] == [
+        None, "User does not exist", "Course does not exist", None,
+    ]
+
+    response = client.post("/api/applications/bulk", params={"mode": "partial"}, json={"items": items})
+    assert response.status_code == 201
+    body = response.json()
+    assert body["created"] == 2
+    created = [item["application"] for item in body["items"]]
+    assert [a and a["course_id"] for a in created] == [course_ids[0], None, None, course_ids[1]]
+    response = client.get(f"/api/applications/{created[3]['id']}")
+    assert response.json()["user_id"] == user["id"]
+
 def test_get_courses_by_category():
     # Здесь вы можете указать категорию, которая точно есть в данных, например "Олимпиады"
     category = "Олимпиада"
@@ -100,3 +160,253 @@ def test_get_courses_by_subject():
     courses = response.json()
     for course in courses:
         assert course["subject"] == subject
+
+def test_create_user_duplicate_username():
+    response = client.post("/api/users", json={"username": "dup_user", "full_name": None})
+    assert response.status_code == 200
+    user = response.json()
+    response = client.post("/api/users", json={"username": "dup_user", "full_name": None})
+    assert response.status_code == 400
+    response = client.get(f"/api/users/{user['id']}")
+    assert response.status_code == 200
+    assert response.json()["username"] == "dup_user"
+
+def test_get_courses_etag_not_modified():
+    response = client.get("/api/courses")
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    response = client.get("/api/courses", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    response = client.get("/api/teachers", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+
+def test_landing_bundle_precompressed():
+    plain = client.get("/api/landing", headers={"Accept-Encoding": "identity"})
+    assert plain.status_code == 200
+    assert "content-encoding" not in plain.headers
+    assert "Accept-Encoding" in plain.headers["vary"]
+    landing = plain.json()
+    courses = client.get("/api/courses").json()
+    assert landing["courses"] == courses
+    assert landing["teachers"] == client.get("/api/teachers").json()
+    assert landing["popular_course_ids"] == [c["id"] for c in courses if c["is_popular"]]
+    assert sum(len(ids) for ids in landing["course_ids_by_subject"].values()) == len(courses)
+
+    for coding in ("gzip", "br"):
+        response = client.get("/api/landing", headers={"Accept-Encoding": f"{coding}, deflate;q=0.5"})
+        assert response.headers["content-encoding"] == coding
+        assert response.json() == landing
+        etag = response.headers["etag"]
+        assert etag != plain.headers["etag"]
+        response = client.get("/api/landing", headers={"Accept-Encoding": coding, "If-None-Match": etag})
+        assert response.status_code == 304
+
+    response = client.get("/api/landing", headers={"Accept-Encoding": "gzip, br;q=0"})
+    assert response.headers["content-encoding"] == "gzip"
+
+def test_list_users_keyset_pagination():
+    created = set()
+    for i in range(5):
+        response = client.post("/api/users", json={"username": f"page_user_{i}", "full_name": None})
+        created.add(response.json()["id"])
+
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        page = client.get("/api/users", params=params).json()
+        assert len(page["items"]) <= 2
+        seen.extend(u["id"] for u in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert created <= set(seen)
+    assert len(seen) == len(set(seen))
+
+def test_list_users_invalid_cursor():
+    response = client.get("/api/users", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+def test_export_contact_forms_csv(admin_headers):
+    client.post(
+        "/api/contact_form",
+        json={
+            "full_name": "=Экспорт",
+            "phone": "+79001234567",
+            "email": "export@example.com",
+            "agreed_to_terms": True
+        },
+    )
+    assert client.get("/api/export/contact_forms").status_code == 403
+    response = client.get("/api/export/contact_forms", params={"format": "csv"}, headers=admin_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    lines = response.content.decode("utf-8-sig").splitlines()
+    assert lines[0] == "id,full_name,phone,email,agreed_to_terms,created_at"
+    assert any("'=Экспорт" in line and ",+79001234567," in line for line in lines[1:])
+
+def test_export_applications_ndjson(admin_headers):
+    assert client.get("/api/export/applications").status_code == 403
+    response = client.get("/api/export/applications", headers=admin_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+def test_search_catalog_russian_forms():
+    response = client.get("/api/search", params={"q": "ФИЗИКЕ егэ"})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["courses"]
+    assert data["courses"][0]["subject"] == "Физика"
+    assert "ЕГЭ" in data["courses"][0]["title"]
+
+def test_autocomplete_with_typo():
+    response = client.get("/api/autocomplete", params={"q": "инфрматика"})
+    assert response.status_code == 200
+    suggestions = response.json()
+    assert suggestions
+    assert all("информатике" in s["text"] for s in suggestions)
+    assert suggestions[0]["type"] == "course"
+
+def test_query_courses_with_facets():
+    response = client.get(
+        "/api/courses/query",
+        params={"subject": ["Математика", "Физика"], "max_price": 4000, "sort": "-lessons"},
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total"] == len(data["items"]) > 0
+    assert all(c["subject"] in ("Математика", "Физика") and c["current_price"] <= 4000 for c in data["items"])
+    lessons = [c["lessons"] for c in data["items"]]
+    assert lessons == sorted(lessons, reverse=True)
+    # Фасет предмета не учитывает собственный фильтр
+    assert "Информатика" in data["facets"]["subject"]
+    assert sum(data["facets"]["category"].values()) == data["total"]
+
+def test_readiness_reports_components():
+    response = client.get("/api/health/ready")
+    assert response.status_code == 503
+    assert response.json()["components"]["catalog"] is False
+    for component in ("catalog", "database", "mail"):
+        readiness.mark(component)
+    try:
+        assert client.get("/api/health/ready").json()["status"] == "ready"
+    finally:
+        readiness.reset()
+
+def test_metrics_group_requests_by_route_template():
+    client.get("/api/courses/00000000-0000-0000-0000-000000000000")
+    client.get("/no/such/path")
+    client.post("/api/contact_form", json={
+        "full_name": "Метрики", "phone": "+79001234567", "email": "metrics@example.com", "agreed_to_terms": True,
+    })
+    client.post("/api/applications", json={
+        "user_id": "00000000-0000-0000-0000-000000000000", "course_id": "00000000-0000-0000-0000-000000000000",
+    })
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    assert 'http_requests_total{method="GET",route="/api/courses/{course_id}",status="404"}' in text
+    assert 'route="unmatched",status="404"' in text
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/api/courses/{course_id}",le="+Inf"}' in text
+    assert 'storage_operation_duration_seconds_count{operation="createContactForm"}' in text
+    assert 'storage_operation_duration_seconds_count{operation="getUser"}' in text
+    assert "http_requests_in_flight 1.0" in text  # сам запрос /metrics
+
+def test_contact_forms_listing_requires_admin_token(admin_headers):
+    assert client.get("/api/contact_forms").status_code == 403
+    response = client.get("/api/contact_forms", params={"limit": 1}, headers=admin_headers)
+    assert response.status_code == 200
+    assert len(response.json()["items"]) <= 1
+
+def test_db_pool_stats_require_admin_token(admin_headers):
+    assert client.get("/api/db/pool").status_code == 403
+    response = client.get("/api/db/pool", headers=admin_headers)
+    assert response.status_code == 200
+    assert "pid" in response.json()
+
+def test_admin_profile_requires_token(monkeypatch):
+    assert client.post("/api/admin/profile").status_code == 404
+    monkeypatch.setattr(admin_settings, "ADMIN_TOKEN", "secret")
+    assert client.post("/api/admin/profile", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    response = client.post("/api/admin/profile?seconds=0.05", headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+
+def test_idempotency_rejects_oversized_body():
+    from server.idempotency import MAX_BODY_SIZE
+
+    body = b"x" * (MAX_BODY_SIZE + 1)
+    headers = {"Content-Type": "application/json"}
+    assert client.post("/api/contact_form", content=body, headers=headers).status_code == 413
+    # Без Content-Length размер проверяется по мере чтения тела
+    chunks = (body[i:i + 65536] for i in range(0, len(body), 65536))
+    assert client.post("/api/contact_form", content=chunks, headers=headers).status_code == 413
+
+def test_contact_form_idempotency_key_replays_response():
+    form = {
+        "full_name": "Повтор Повторов",
+        "phone": "+79001234567",
+        "email": "retry@example.com",
+        "agreed_to_terms": True,
+    }
+    headers = {"Idempotency-Key": "form-1"}
+    first = client.post("/api/contact_form", json=form, headers=headers)
+    retry = client.post("/api/contact_form", json=form, headers=headers)
+    assert first.status_code == retry.status_code == 201
+    assert retry.json()["id"] == first.json()["id"]
+    assert retry.headers["idempotent-replayed"] == "true"
+
+    # Тот же ключ с другим телом отклоняется
+    other = client.post("/api/contact_form", json={**form, "phone": "+79000000000"}, headers=headers)
+    assert other.status_code == 422
+
+    # Другой клиент с тем же ключом не получает чужой сохраненный ответ
+    stranger = client.post("/api/contact_form", json=form, headers={**headers, "User-Agent": "other-client"})
+    assert stranger.status_code == 201
+    assert "idempotent-replayed" not in stranger.headers
+    assert stranger.json()["id"] != first.json()["id"]
+
+    # Одинаковая форма без ключа в пределах окна распознается по хэшу тела
+    form["email"] = "double-click@example.com"
+    assert client.post("/api/contact_form", json=form).json()["id"] == \
+        client.post("/api/contact_form", json=form).json()["id"]
+
+    with get_session_factory()() as db:
+        emails = [row.email for row in db.query(ContactFormDB).filter(
+            ContactFormDB.email.in_(["retry@example.com", "double-click@example.com"])
+        )]
+    assert sorted(emails) == ["double-click@example.com", "retry@example.com", "retry@example.com"]
+
+def test_form_rate_limits_and_load_shedding(monkeypatch):
+    limiter = get_rate_limiter()
+    monkeypatch.setattr(limiter, "ip_buckets", TokenBuckets(rate=0.001, burst=4, max_keys=10))
+    monkeypatch.setattr(limiter, "email_buckets", TokenBuckets(rate=0.001, burst=1, max_keys=10))
+    form = {"full_name": "Бот", "phone": "+79001234567", "email": "bot@example.com", "agreed_to_terms": True}
+
+    assert client.post("/api/contact_form", json=form).status_code == 201
+    # Второй раз с того же email, но с другим телом (не повтор) - лимит email
+    retry = {**form, "phone": "+79007654321"}
+    response = client.post("/api/contact_form", json=retry, headers={"Idempotency-Key": "rate-limited"})
+    assert response.status_code == 429
+    assert int(response.headers["retry-after"]) >= 1
+    # Отказ по лимиту не сохраняется: после пополнения корзины повтор с тем же ключом проходит
+    monkeypatch.setattr(limiter, "email_buckets", TokenBuckets(rate=0.001, burst=1, max_keys=10))
+    response = client.post("/api/contact_form", json=retry, headers={"Idempotency-Key": "rate-limited"})
+    assert response.status_code == 201
+    assert "idempotent-replayed" not in response.headers
+
+    # Лимит IP срабатывает до разбора тела
+    assert client.post("/api/applications", content=b"not json").status_code == 422
+    response = client.post("/api/applications", content=b"not json")
+    assert response.status_code == 429
+
+    # При насыщенном пуле БД форма отклоняется сразу
+    monkeypatch.setattr(limiter, "ip_buckets", TokenBuckets(rate=1, burst=10, max_keys=10))
+    monkeypatch.setattr("server.rate_limit.async_pool_saturation", lambda: 1.0)
+    response = client.post("/api/contact_form", json={**form, "email": "late@example.com"})
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
@@ -0,0 +1,218 @@
+import asyncio
+from email import message_from_string, policy
+from uuid import UUID
+
+from server.mail_config import MailSettings
+from server.mail_dispatcher import MailDispatcher
+from server.schemas import InsertContactForm
+
+
+class StubSMTPServer:
+    """Минимальный локальный SMTP сервер для проверки диспетчера."""
+
+    def __init__(self):
+        self.connections = 0
+        self.messages = []
+        self.server = None
+
+    async def start(self) -> int:
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        writer.write(b"220 stub ESMTP\r\n")
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            command = line.decode().strip().upper()
+            if command.startswith("EHLO") or command.startswith("HELO"):
+                writer.write(b"250 stub\r\n")
+            elif command == "DATA":
+                writer.write(b"354 go ahead\r\n")
+                await writer.drain()
+                data = []
+                while (chunk := await reader.readline()) != b".\r\n":
+                    data.append(chunk)
+                self.messages.append(b"".join(data).decode())
+                writer.write(b"250 OK\r\n")
+            elif command == "QUIT":
+                writer.write(b"221 bye\r\n")
+                await writer.drain()
+                break
+            else:
+                writer.write(b"250 OK\r\n")
+            await writer.drain()
+        writer.close()
+
+
+def make_settings(port: int, **overrides) -> MailSettings:
+    values = dict(
+        MAIL_USERNAME="",
+        MAIL_PASSWORD="",
+        MAIL_FROM="admin@example.com",
+        MAIL_SERVER="127.0.0.1",
+        MAIL_PORT=port,
+        MAIL_STARTTLS=False,
+        MAIL_SSL_TLS=False,
+        MAIL_CONCURRENCY=1,
+        MAIL_DIGEST_THRESHOLD=0,
+    )
+    values.update(overrides)
+    return MailSettings(**values)
+
+
+def make_form(i: int) -> InsertContactForm:
+    return InsertContactForm(
+        full_name=f"Ученик {i}",
+        phone="+79001234567",
+        email=f"student{i}@example.com",
+        agreed_to_terms=True,
+    )
+
+
+def test_dispatcher_reuses_smtp_connection():
+    async def scenario():
+        smtp = StubSMTPServer()
+        port = await smtp.start()
+        dispatcher = MailDispatcher(make_settings(port))
+        await dispatcher.start()
+        futures = [await dispatcher.submit(make_form(i)) for i in range(5)]
+        await asyncio.gather(*futures)
+        await dispatcher.stop()
+        await smtp.stop()
+        return smtp
+
+    smtp = asyncio.run(scenario())
+    assert len(smtp.messages) == 5
+    assert smtp.connections == 1
+
+
+def test_dispatcher_sends_digest_on_burst():
+    async def scenario():
+        smtp = StubSMTPServer()
+        port = await smtp.start()
+        dispatcher = MailDispatcher(make_settings(port, MAIL_DIGEST_THRESHOLD=3))
+        await dispatcher.start()
+        # Очередь не заполнена, поэтому все заявки попадут в нее до первой отправки
+        futures = [await dispatcher.submit(make_form(i)) for i in range(6)]
+        await asyncio.gather(*futures)
+        await dispatcher.stop()
+        await smtp.stop()
+        return smtp
+
+    smtp = asyncio.run(scenario())
+    assert len(smtp.messages) == 1
+    body = message_from_string(smtp.messages[0], policy=policy.default).get_content()
+    assert body.count("Email: student") == 6
+
+
+def test_outbox_drain_delivers_pending_notifications():
+    from fastapi.testclient import TestClient
+    from sqlalchemy import select
+
+    from server.database import get_session_factory
+    from server.main import app
+    from server.models import EmailOutboxDB
+    from server.outbox import OutboxDrainer
+
+    client = TestClient(app)
+    response = client.post("/api/contact_form", json={
+        "full_name": "Outbox Test",
+        "phone": "+79001234567",
+        "email": "outbox@example.com",
+        "agreed_to_terms": True,
+    })
+    assert response.status_code == 201
+    form_id = response.json()["id"]
+
+    async def scenario():
+        smtp = StubSMTPServer()
+        port = await smtp.start()
+        settings = make_settings(port)
+        dispatcher = MailDispatcher(settings)
+        await dispatcher.start()
+        drainer = OutboxDrainer(settings, dispatcher)
+        while await drainer.drain_once():
+            pass
+        await dispatcher.stop()
+        await smtp.stop()
+        return smtp
+
+    smtp = asyncio.run(scenario())
+    assert smtp.messages
+
+    with get_session_factory()() as db:
+        row = db.execute(
+            select(EmailOutboxDB).where(EmailOutboxDB.contact_form_id == UUID(form_id))
+        ).scalar_one()
+        assert row.status == "sent"
+        assert row.attempts == 1
+
+
+def test_outbox_drain_fails_bad_payload_without_blocking_batch():
+    from sqlalchemy import select
+
+    from server.database import get_session_factory
+    from server.models import EmailOutboxDB
+    from server.outbox import OutboxDrainer
+
+    with get_session_factory()() as db:
+        bad = EmailOutboxDB(payload={"full_name": "Без почты"})
+        good = EmailOutboxDB(payload=make_form(42).model_dump())
+        db.add_all([bad, good])
+        db.commit()
+        bad_id, good_id = bad.id, good.id
+
+    async def scenario():
+        smtp = StubSMTPServer()
+        port = await smtp.start()
+        settings = make_settings(port)
+        dispatcher = MailDispatcher(settings)
+        await dispatcher.start()
+        drainer = OutboxDrainer(settings, dispatcher)
+        while await drainer.drain_once():
+            pass
+        await dispatcher.stop()
+        await smtp.stop()
+
+    asyncio.run(scenario())
+
+    with get_session_factory()() as db:
+        statuses = dict(db.execute(
+            select(EmailOutboxDB.id, EmailOutboxDB.status).where(EmailOutboxDB.id.in_((bad_id, good_id)))
+        ).all())
+    assert statuses == {bad_id: "failed", good_id: "sent"}
+
+
+def test_outbox_claim_stops_after_max_attempts():
+    from datetime import timedelta
+
+    from sqlalchemy import select
+
+    from server.crud import claim_outbox_batch
+    from server.database import async_session, get_session_factory
+    from server.models import EmailOutboxDB, utcnow
+
+    # Воркер упал во время отправки: аренда истекла, попытки исчерпаны
+    expired = utcnow() - timedelta(seconds=1)
+    with get_session_factory()() as db:
+        stuck = EmailOutboxDB(payload=make_form(7).model_dump(), status="processing", attempts=3, available_at=expired)
+        db.add(stuck)
+        db.commit()
+        stuck_id = stuck.id
+
+    async def scenario():
+        async with async_session() as db:
+            return await claim_outbox_batch(db, 100, 60, max_attempts=3)
+
+    assert stuck_id not in {row.id for row in asyncio.run(scenario())}
+    with get_session_factory()() as db:
+        row = db.execute(select(EmailOutboxDB).where(EmailOutboxDB.id == stuck_id)).scalar_one()
+        assert row.status == "failed"
+        assert row.attempts == 3
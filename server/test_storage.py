@@ -0,0 +1,320 @@
+import asyncio
+import json
+import os
+import time
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import select
+
+from server.catalog import COURSES_FILE, TEACHERS_FILE, file_signature
+from server.catalog_snapshot import build_snapshot, load_startup_catalog
+from server.catalog_watcher import CatalogSettings, CatalogWatcher
+from server.database import Base, async_session, get_engine
+from server.idempotency import (
+    IdempotencyInProgressError, IdempotencyKeyReusedError, IdempotencySettings,
+    MemoryIdempotencyStore, SqlIdempotencyStore, StoredResponse,
+)
+from server.models import ContactFormDB
+from server.persistence import StorageJournal
+from server.profiling import LoopLagMonitor, ProfilingSettings, StackSampler
+from server.rate_limit import SqlTokenBuckets, TokenBuckets
+from server.schemas import InsertApplication, InsertContactForm, InsertUser
+from server.sql_storage import SqlStorage
+from server.storage import MemStorage, UsernameTakenError
+from server.write_behind import ContactFormWriteBuffer
+
+
+@pytest.fixture(params=["memory", "sql"])
+def storage(request):
+    if request.param == "memory":
+        return MemStorage()
+    # Тесты запускаются на SQLite из DATABASE_URL
+    Base.metadata.create_all(bind=get_engine())
+    return SqlStorage()
+
+
+def test_users_and_applications_roundtrip(storage):
+    async def scenario():
+        username = f"student_{uuid4().hex}"
+        user = await storage.createUser(InsertUser(username=username, full_name="Ученик"))
+        assert (await storage.getUser(str(user.id))).username == username
+        assert (await storage.getUserByUsername(username)).id == user.id
+        assert user.id in {u.id for u in await storage.getUsers()}
+        missing = uuid4()
+        assert [u.id for u in await storage.getUsersByIds([missing, user.id])] == [user.id]
+
+        with pytest.raises(UsernameTakenError):
+            await storage.createUser(InsertUser(username=username, full_name=None))
+
+        course = storage.courses[0]
+        application = await storage.createApplication(
+            InsertApplication(user_id=user.id, course_id=course.id)
+        )
+        fetched = await storage.getApplication(str(application.id))
+        assert fetched.user_id == user.id
+        assert fetched.course_id == course.id
+        assert await storage.getApplication("not-a-uuid") is None
+
+        batch = await storage.createApplications([
+            InsertApplication(user_id=user.id, course_id=c.id) for c in storage.courses[:3]
+        ])
+        assert [a.course_id for a in batch] == [c.id for c in storage.courses[:3]]
+        assert (await storage.getApplication(str(batch[-1].id))).user_id == user.id
+
+    asyncio.run(scenario())
+
+
+def test_memstorage_replays_snapshot_and_journal(tmp_path):
+    async def fill(storage):
+        users = [await storage.createUser(InsertUser(username=f"u{i}", full_name=None)) for i in range(5)]
+        await storage.createApplication(InsertApplication(user_id=users[0].id, course_id=storage.courses[0].id))
+        await storage.createApplications([
+            InsertApplication(user_id=u.id, course_id=storage.courses[1].id) for u in users[1:]
+        ])
+        await storage.createContactForm(InsertContactForm(
+            full_name="Иван", phone="+79001234567", email="ivan@example.com", agreed_to_terms=True,
+        ))
+        await storage.close()
+
+    # Снимок делается после 3 записей, остальные остаются в хвосте журнала
+    first = MemStorage(journal=StorageJournal(tmp_path, fsync="always", snapshot_every=3))
+    asyncio.run(fill(first))
+
+    restored = MemStorage(journal=StorageJournal(tmp_path, fsync="never"))
+    assert restored.users == first.users
+    assert restored.applications == first.applications
+    assert restored.contact_forms == first.contact_forms
+    assert asyncio.run(restored.getUserByUsername("u3")).id == first.users_by_username["u3"].id
+    assert len(restored.applications) == 5
+
+    # Ошибка записи пакета в журнал не оставляет в памяти часть пакета
+    def broken_append(kind, items):
+        raise OSError("disk full")
+    restored.journal.append_many = broken_append
+    with pytest.raises(OSError):
+        asyncio.run(restored.createApplications([
+            InsertApplication(user_id=first.users_by_username["u0"].id, course_id=restored.courses[0].id)
+        ]))
+    assert len(restored.applications) == 5
+
+
+def test_journal_interval_flush_and_interrupted_snapshot(tmp_path):
+    async def scenario():
+        storage = MemStorage(journal=StorageJournal(tmp_path, fsync="interval", fsync_interval=0.01))
+        await storage.createUser(InsertUser(username="first", full_name=None))
+        assert storage.journal.unsynced
+        # Хвост журнала сбрасывается фоновой задачей без новых записей
+        await asyncio.sleep(0.1)
+        assert not storage.journal.unsynced
+
+        # Снимок прервался после rotate: записи остаются в отложенном журнале
+        storage.journal.rotate()
+        await storage.createUser(InsertUser(username="second", full_name=None))
+        await storage.close()
+
+    asyncio.run(scenario())
+    # Запись и в снимке, и в отложенном журнале восстанавливается один раз
+    (tmp_path / "snapshot.jsonl").write_text((tmp_path / "journal.rotated.jsonl").read_text())
+    restored = MemStorage(journal=StorageJournal(tmp_path))
+    users = asyncio.run(restored.listUsers(None, 10))
+    assert [u.username for u in users] == ["first", "second"]
+
+
+def test_journal_rotate_fsyncs_unsynced_tail(tmp_path, monkeypatch):
+    import server.persistence
+
+    journal = StorageJournal(tmp_path, fsync="interval", fsync_interval=60)
+    journal.append("user", {"id": "first"})
+    synced = []
+    real_fsync = os.fsync
+    monkeypatch.setattr(server.persistence.os, "fsync", lambda fd: synced.append(fd) or real_fsync(fd))
+    journal.rotate()
+    assert synced
+    assert not journal.unsynced
+    journal.close()
+
+
+def test_write_behind_stop_flushes_pending_forms():
+    async def scenario():
+        buffer = ContactFormWriteBuffer(batch_size=100, flush_interval=60)
+        await buffer.start()
+        assert buffer.running
+        forms = [
+            await buffer.submit(InsertContactForm(
+                full_name=f"Буфер {i}", phone="+79001234567", email="buffer@example.com", agreed_to_terms=True,
+            ))
+            for i in range(3)
+        ]
+        await buffer.stop()
+        assert not buffer.running
+        async with async_session() as db:
+            rows = (await db.execute(select(ContactFormDB.id).where(ContactFormDB.email == "buffer@example.com"))).all()
+        assert {row.id for row in rows} == {form.id for form in forms}
+
+    asyncio.run(scenario())
+
+
+def test_lifespan_stops_everything_when_a_stop_fails(monkeypatch):
+    from server import main
+
+    closed = []
+
+    async def failing_stop():
+        raise RuntimeError("database is unreachable")
+
+    async def close():
+        closed.append(True)
+
+    monkeypatch.setattr(main.contact_form_buffer, "stop", failing_stop)
+    storage = main.get_storage()
+    monkeypatch.setattr(storage, "close", close)
+
+    async def scenario():
+        async with main.lifespan(main.app):
+            assert main.outbox_drainer.running
+
+    with pytest.raises(RuntimeError, match="unreachable"):
+        asyncio.run(scenario())
+    assert closed == [True]
+    assert not main.outbox_drainer.running
+    assert not main.mail_dispatcher.running
+
+
+def test_catalog_watcher_swaps_and_rejects_bad_files(tmp_path):
+    courses_file = tmp_path / "courses.json"
+    teachers_file = tmp_path / "teachers.json"
+    courses = json.loads(COURSES_FILE.read_text(encoding="utf-8"))
+    courses_file.write_text(json.dumps(courses, ensure_ascii=False), encoding="utf-8")
+    teachers_file.write_text(TEACHERS_FILE.read_text(encoding="utf-8"), encoding="utf-8")
+
+    storage = MemStorage()
+    watcher = CatalogWatcher(storage, CatalogSettings(), courses_file, teachers_file)
+    assert asyncio.run(watcher.check_once())
+    assert not asyncio.run(watcher.check_once())
+
+    courses[0]["current_price"] = 1
+    courses_file.write_text(json.dumps(courses, ensure_ascii=False), encoding="utf-8")
+    os.utime(courses_file, ns=(1, 1))
+    assert asyncio.run(watcher.check_once())
+    assert storage.courses[0].current_price == 1
+    assert b'"current_price":1.0' in asyncio.run(storage.getCoursesPayload()).body
+
+    # Некорректный файл отклоняется, старый каталог продолжает работать
+    courses_file.write_text("[{\"id\": ", encoding="utf-8")
+    catalog = storage.catalog
+    assert not asyncio.run(watcher.check_once())
+    assert storage.catalog is catalog
+
+
+def test_catalog_snapshot_roundtrip_and_fallback(tmp_path):
+    courses_file = tmp_path / "courses.json"
+    teachers_file = tmp_path / "teachers.json"
+    snapshot_file = tmp_path / "catalog.snapshot"
+    courses_file.write_text(COURSES_FILE.read_text(encoding="utf-8"), encoding="utf-8")
+    teachers_file.write_text(TEACHERS_FILE.read_text(encoding="utf-8"), encoding="utf-8")
+
+    build_snapshot(snapshot_file, courses_file, teachers_file)
+    catalog = load_startup_catalog(snapshot_file, courses_file, teachers_file)
+    assert catalog.signature == file_signature(courses_file, teachers_file)
+    assert catalog.search_index.search("физика")[0]
+
+    # Изменение данных делает снимок устаревшим, каталог читается из JSON
+    courses = json.loads(courses_file.read_text(encoding="utf-8"))
+    courses[0]["title"] = "Новое название"
+    courses_file.write_text(json.dumps(courses, ensure_ascii=False), encoding="utf-8")
+    catalog = load_startup_catalog(snapshot_file, courses_file, teachers_file)
+    assert catalog.courses[0].title == "Новое название"
+
+
+def test_loop_lag_monitor_logs_blocking_stack(caplog):
+    def block_loop():
+        time.sleep(0.3)
+
+    async def scenario():
+        monitor = LoopLagMonitor(ProfilingSettings(LOOP_LAG_THRESHOLD=0.05))
+        await monitor.start()
+        await asyncio.sleep(0.05)
+        block_loop()
+        await asyncio.sleep(0.05)
+        await monitor.stop()
+
+    with caplog.at_level("WARNING", logger="server.profiling"):
+        asyncio.run(scenario())
+    messages = [r.getMessage() for r in caplog.records]
+    assert any("не отвечает" in m and "block_loop" in m for m in messages)
+    assert any("был заблокирован" in m for m in messages)
+
+
+def test_stack_sampler_stops_after_requests():
+    def busy():
+        started = time.perf_counter()
+        while time.perf_counter() - started < 0.05:
+            pass
+
+    async def scenario():
+        sampler = StackSampler(ProfilingSettings(PROFILE_SAMPLE_INTERVAL=0.001))
+        profile = asyncio.create_task(sampler.profile(seconds=30, requests=2))
+        await asyncio.sleep(0)
+        for _ in range(2):
+            busy()
+            sampler.request_done()
+            await asyncio.sleep(0)
+        return await asyncio.wait_for(profile, timeout=5)
+
+    dump = asyncio.run(scenario())
+    lines = dump.splitlines()
+    assert lines and all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert any("busy (test_storage.py" in line for line in lines)
+
+
+@pytest.mark.parametrize("backend", ["memory", "sql"])
+def test_idempotency_store_claims_replays_and_releases(backend):
+    Base.metadata.create_all(bind=get_engine())
+    settings = IdempotencySettings(IDEMPOTENCY_CACHE_SIZE=2)
+    store = MemoryIdempotencyStore(settings) if backend == "memory" else SqlIdempotencyStore(settings)
+    key = f"/api/applications:key:{uuid4()}"
+    response = StoredResponse(201, "application/json", b'{"id": 1}')
+
+    async def scenario():
+        assert await store.begin(key, "a") is None
+        with pytest.raises(IdempotencyInProgressError):
+            await store.begin(key, "a")
+        await store.complete(key, response, ttl=60)
+        assert await store.begin(key, "a") == response
+        with pytest.raises(IdempotencyKeyReusedError):
+            await store.begin(key, "b")
+
+        # Ключ запроса, завершившегося ошибкой сервера, освобождается
+        failed = f"{key}:failed"
+        assert await store.begin(failed, "a") is None
+        await store.release(failed)
+        assert await store.begin(failed, "a") is None
+
+        # Истекший ответ больше не воспроизводится
+        expired = f"{key}:expired"
+        await store.begin(expired, "a")
+        await store.complete(expired, response, ttl=-1)
+        assert await store.begin(expired, "a") is None
+
+    asyncio.run(scenario())
+    if backend == "memory":
+        assert len(store) == 2
+
+
+@pytest.mark.parametrize("backend", [TokenBuckets, SqlTokenBuckets])
+def test_token_buckets_limit_and_evict(backend):
+    Base.metadata.create_all(bind=get_engine())
+    buckets = backend(rate=0.5, burst=2, max_keys=2)
+    key = f"ip:{uuid4()}"
+
+    async def scenario():
+        waits = [await buckets.take(key) for _ in range(3)]
+        assert waits[:2] == [0.0, 0.0]
+        assert 1.5 < waits[2] <= 2.0
+        for i in range(3):
+            await buckets.take(f"{key}:{i}")
+
+    asyncio.run(scenario())
+    if backend is TokenBuckets:
+        assert len(buckets) == 2
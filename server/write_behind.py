@@ -0,0 +1,145 @@
+"""
+Отложенная пакетная запись контактных форм для Backend онлайн школы S2S.
+
+Этот модуль содержит буфер, который копит контактные формы в памяти
+и сбрасывает их в базу данных одним многострочным INSERT, когда
+набирается пачка нужного размера или истекает интервал ожидания.
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+from uuid import uuid4
+
+from server.crud import create_contact_forms
+from server.database import async_session, db_settings
+from server.schemas import ContactForm, InsertContactForm
+
+
+logger = logging.getLogger(__name__)
+
+
+class ContactFormWriteBuffer:
+    """
+    Буфер отложенной записи контактных форм.
+
+    id формы генерируется сразу при приеме, поэтому клиент получает
+    его в ответе, не дожидаясь записи в базу данных. Сброс выполняется
+    фоновой задачей при достижении batch_size или по истечении
+    flush_interval, а также при остановке приложения.
+
+    Attributes:
+        batch_size: Размер пачки, при котором сброс запускается сразу
+        flush_interval: Максимальное время (сек) хранения формы в буфере
+        max_pending: Предел числа форм в памяти; при его достижении
+            прием ждет завершения сброса
+    """
+
+    def __init__(self, batch_size: int = 100, flush_interval: float = 0.5, max_pending: Optional[int] = None):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending or batch_size * 10
+        self._pending: List[Dict[str, Any]] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    @property
+    def running(self) -> bool:
+        """Запущена ли фоновая задача сброса."""
+        return self._task is not None and not self._task.done()
+
+    @property
+    def pending(self) -> int:
+        """Число форм, ожидающих записи в базу данных."""
+        return len(self._pending)
+
+    async def start(self):
+        """
+        Запускает фоновую задачу сброса буфера.
+        """
+        if self.running:
+            return
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = asyncio.create_task(self._run(), name="contact-form-write-behind")
+
+    async def stop(self):
+        """
+        Останавливает фоновую задачу и сбрасывает оставшиеся формы.
+        """
+        if self._task is not None:
+            # Не отменяем задачу посреди сброса, иначе пачка может потеряться
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+            self._stopping = False
+        await self.flush()
+
+    async def submit(self, form_data: InsertContactForm) -> ContactForm:
+        """
+        Принимает контактную форму в буфер.
+
+        Args:
+            form_data: Данные контактной формы
+
+        Returns:
+            ContactForm: Контактная форма с уже сгенерированным id
+        """
+        if len(self._pending) >= self.max_pending:
+            # Не даем буферу расти без ограничений, если база не успевает
+            await self.flush()
+
+        row = {"id": uuid4(), **form_data.model_dump()}
+        self._pending.append(row)
+        if len(self._pending) >= self.batch_size and self._wakeup is not None:
+            self._wakeup.set()
+        return ContactForm(**row)
+
+    async def flush(self):
+        """
+        Записывает все накопленные формы одной транзакцией.
+
+        При ошибке записи формы возвращаются в начало буфера
+        и будут записаны при следующем сбросе.
+        """
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, []
+            try:
+                async with async_session() as db:
+                    await create_contact_forms(db, batch)
+            except Exception:
+                logger.exception("Ошибка пакетной записи %d контактных форм", len(batch))
+                self._pending[:0] = batch
+                raise
+
+    async def _run(self):
+        """
+        Цикл фоновой задачи: ждет заполнения пачки или таймаута и сбрасывает буфер.
+        """
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if self._stopping:
+                break
+            try:
+                await self.flush()
+            except Exception:
+                # Ошибка уже залогирована, формы остались в буфере до следующей попытки
+                await asyncio.sleep(self.flush_interval)
+
+
+# Буфер используется только при CONTACT_FORM_WRITE_BEHIND=True
+contact_form_buffer = ContactFormWriteBuffer(
+    batch_size=db_settings.CONTACT_FORM_BATCH_SIZE,
+    flush_interval=db_settings.CONTACT_FORM_FLUSH_INTERVAL,
+)